@@ -0,0 +1,4 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Benchmarks of the client against a local stand-in HERE server."""
@@ -0,0 +1,166 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Canned response payloads of the local stand-in server.
+
+The payloads are generated deterministically, so that benchmark results are comparable
+between runs.
+"""
+
+import math
+import random
+from typing import Dict, List, Tuple
+
+import flexpolyline as fp
+
+
+def _ring(lat: float, lng: float, radius: float, points: int) -> List[Tuple[float, float]]:
+    return [
+        (
+            lat + radius * math.sin(2 * math.pi * i / points),
+            lng + radius * math.cos(2 * math.pi * i / points),
+        )
+        for i in range(points)
+    ]
+
+
+def geocode(items: int = 5) -> Dict:
+    """Return a geocoding response with ``items`` results."""
+    return {
+        "items": [
+            {
+                "title": f"Invalidenstraße {116 + i}, 10115 Berlin, Deutschland",
+                "id": f"here:af:streetsection:{i}",
+                "resultType": "houseNumber",
+                "houseNumberType": "PA",
+                "address": {
+                    "label": f"Invalidenstraße {116 + i}, 10115 Berlin, Deutschland",
+                    "countryCode": "DEU",
+                    "countryName": "Deutschland",
+                    "city": "Berlin",
+                    "street": "Invalidenstraße",
+                    "postalCode": "10115",
+                    "houseNumber": str(116 + i),
+                },
+                "position": {"lat": 52.53041 + i * 1e-4, "lng": 13.38527},
+                "access": [{"lat": 52.53105, "lng": 13.38484}],
+                "mapView": {
+                    "west": 13.38379,
+                    "south": 52.5295,
+                    "east": 13.38675,
+                    "north": 52.5313,
+                },
+                "scoring": {"queryScore": 1.0, "fieldScore": {"streets": [1.0]}},
+            }
+            for i in range(items)
+        ]
+    }
+
+
+def routes(points: int = 20000) -> Dict:
+    """Return a routing response with a single section with a polyline of ``points``."""
+    rng = random.Random(1)
+    coords = []
+    lat, lng = 52.5, 13.4
+    for _ in range(points):
+        lat += rng.uniform(-1e-4, 2e-4)
+        lng += rng.uniform(-1e-4, 2e-4)
+        coords.append((lat, lng, rng.randint(20, 80)))
+    polyline = fp.encode(coords, precision=5, third_dim=fp.ALTITUDE, third_dim_precision=0)
+    return {
+        "routes": [
+            {
+                "id": "bfaed95c-e8ef-4d65-9e4b-7c7a6d5e0fbd",
+                "sections": [
+                    {
+                        "id": "section-0",
+                        "type": "vehicle",
+                        "departure": {"place": {"type": "place", "location": coords[0]}},
+                        "arrival": {"place": {"type": "place", "location": coords[-1]}},
+                        "summary": {"duration": points, "length": points * 10},
+                        "polyline": polyline,
+                        "transport": {"mode": "car"},
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def matrix(origins: int = 1000, destinations: int = 1000) -> Dict:
+    """Return a matrix routing response of ``origins`` x ``destinations`` cells."""
+    cells = origins * destinations
+    return {
+        "matrixId": "eba6a0e4-8c1d-4c2f-b5f6-6d1b1b3b1c2d",
+        "matrix": {
+            "numOrigins": origins,
+            "numDestinations": destinations,
+            "travelTimes": [(i * 7919) % 7200 for i in range(cells)],
+            "distances": [(i * 104729) % 150000 for i in range(cells)],
+        },
+        "regionDefinition": {"type": "world"},
+    }
+
+
+def isolines(bands: int = 5, points: int = 2000) -> Dict:
+    """Return an isoline response with ``bands`` ranges of polygons with ``points`` each."""
+    return {
+        "departure": {"place": {"location": {"lat": 52.5, "lng": 13.4}}},
+        "isolines": [
+            {
+                "range": {"type": "time", "value": 300 * (band + 1)},
+                "polygons": [{"outer": fp.encode(_ring(52.5, 13.4, 0.01 * (band + 1), points))}],
+            }
+            for band in range(bands)
+        ],
+    }
+
+
+def weather_alerts(alerts: int = 200) -> Dict:
+    """Return a weather alerts response with ``alerts`` features."""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [8.919 + i * 1e-3, 44.4074]},
+                "properties": {
+                    "severity": i % 5,
+                    "type": "highWind",
+                    "description": "Strong winds expected.",
+                    "validFromTimeLocal": "2021-06-01T10:00:00",
+                    "validUntilTimeLocal": "2021-06-01T18:00:00",
+                },
+            }
+            for i in range(alerts)
+        ],
+    }
+
+
+def tour_solution(tours: int = 200, stops: int = 50) -> Dict:
+    """Return a tour planning solution with ``tours`` tours of ``stops`` stops each."""
+    return {
+        "problemId": "7f3423c2-784a-4983-b472-e14107d5a54a",
+        "statistic": {"cost": 1000.0, "distance": 100000, "duration": 36000},
+        "tours": [
+            {
+                "vehicleId": f"vehicle_{t}",
+                "typeId": "car",
+                "stops": [
+                    {
+                        "location": {"lat": 52.5 + s * 1e-3, "lng": 13.4 + t * 1e-3},
+                        "time": {
+                            "arrival": "2020-07-04T10:00:00Z",
+                            "departure": "2020-07-04T10:05:00Z",
+                        },
+                        "load": [s % 10],
+                        "activities": [{"jobId": f"job_{t}_{s}", "type": "delivery"}],
+                    }
+                    for s in range(stops)
+                ],
+                "statistic": {"cost": 5.0, "distance": 500, "duration": 180},
+            }
+            for t in range(tours)
+        ],
+        "unassigned": [],
+    }
@@ -0,0 +1,329 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""Run the benchmarks against the local stand-in server and compare them to a baseline.
+
+Usage::
+
+    python -m benchmarks.run --save-baseline  # store the results as baseline
+    python -m benchmarks.run                  # compare against benchmarks/baseline.json
+
+Measured are the per-call client overhead compared to plain HTTP requests of the same
+payloads, the throughput of concurrent calls, the memory allocated per decoded response and
+the speed of converting responses, e.g. with ``to_geojson``. The process exits with status 1
+if a result is worse than the baseline by more than the tolerance. Baselines depend on the
+machine, so they are not committed but stored on the machine running the comparison, e.g.
+before making changes or by a CI job on the base branch.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from geojson import Point
+
+from benchmarks.server import MockServer
+from here_location_services import LS
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.config.tour_planning_config import (
+    VEHICLE_MODE,
+    Fleet,
+    Job,
+    JobPlaces,
+    Plan,
+    VehicleProfile,
+    VehicleType,
+)
+from here_location_services.transport import Transport
+
+#: Default path of the stored baseline.
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+#: Prefixes of results where higher values are better.
+HIGHER_IS_BETTER = ("throughput.",)
+
+#: Allowed absolute deviation of results with a zero baseline by prefix, in seconds for
+#: times and in bytes for memory.
+ABSOLUTE_TOLERANCE = {
+    "call.": 1e-3,
+    "convert.": 1e-3,
+    "overhead.": 1e-3,
+    "memory_peak.": 4096.0,
+    "memory_retained.": 4096.0,
+}
+
+Scenario = Tuple[str, str, str, Callable[[LS], object]]
+
+
+def _fleet() -> Fleet:
+    return Fleet(
+        vehicle_types=[
+            VehicleType(
+                id="09c77738-1dba-42f1-b00e-eb63da7147d6",
+                profile_name="normal_car",
+                costs_fixed=22,
+                costs_distance=0.0001,
+                costs_time=0.0048,
+                capacity=[100, 5],
+                amount=1,
+                shift_start={
+                    "time": "2020-07-04T09:00:00Z",
+                    "location": {"lat": 52.5256, "lng": 13.4542},
+                },
+            )
+        ],
+        vehicle_profiles=[VehicleProfile(name="normal_car", vehicle_mode=VEHICLE_MODE.car)],
+    )
+
+
+def _plan() -> Plan:
+    return Plan(
+        jobs=[
+            Job(
+                id="4bbc206d-1583-4266-bac9-d1580f412ac0",
+                deliveries=[
+                    JobPlaces(
+                        duration=300,
+                        demand=[10],
+                        location=(52.53088, 13.38471),
+                        times=[["2020-07-04T14:00:00Z", "2020-07-04T16:00:00Z"]],
+                    )
+                ],
+            )
+        ]
+    )
+
+
+def scenarios(matrix_size: int) -> List[Scenario]:
+    """
+    Return the benchmarked calls.
+
+    :param matrix_size: Number of origins and destinations of matrix requests.
+    :return: A list of tuples of name, HTTP method, path and a function calling ``LS``.
+    """
+    origins = [{"lat": 52.5, "lng": 13.4}] * matrix_size
+    fleet, plan = _fleet(), _plan()
+    return [
+        ("geocode", "GET", "/v1/geocode", lambda ls: ls.geocode("Invalidenstraße 116, Berlin")),
+        (
+            "routes",
+            "GET",
+            "/v8/routes",
+            lambda ls: ls.car_route(origin=[52.5, 13.4], destination=[52.6, 13.5]),
+        ),
+        (
+            "matrix",
+            "POST",
+            "/v8/matrix",
+            lambda ls: ls.matrix(origins=origins, region_definition=WorldRegion()),
+        ),
+        (
+            "isolines",
+            "GET",
+            "/v8/isolines",
+            lambda ls: ls.calculate_isoline(
+                range="300,600,900,1200,1500",
+                range_type="time",
+                transport_mode="car",
+                origin=[52.5, 13.4],
+            ),
+        ),
+        (
+            "weather_alerts",
+            "POST",
+            "/v3/alerts",
+            lambda ls: ls.get_weather_alerts(
+                geometry=Point(coordinates=[13.4, 52.5]), start_time=datetime(2021, 6, 1)
+            ),
+        ),
+        (
+            "tour_planning",
+            "POST",
+            "/v2/problems",
+            lambda ls: ls.solve_tour_planning(fleet=fleet, plan=plan),
+        ),
+    ]
+
+
+def _timed(fn: Callable[[], object], iterations: int) -> float:
+    """Return the median duration of ``iterations`` calls of ``fn`` in seconds."""
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def measure_overhead(
+    ls: LS, session: requests.Session, url: str, items: List[Scenario], iterations: int
+) -> Dict[str, float]:
+    """
+    Measure the median duration of calls and the overhead compared to plain HTTP requests.
+
+    :return: A dict with ``call.<name>`` and ``overhead.<name>`` in seconds.
+    """
+    results = {}
+    for name, method, path, call in items:
+        call(ls)
+        raw = _timed(lambda: session.request(method, url + path, json={}).json(), iterations)
+        total = _timed(lambda: call(ls), iterations)
+        results[f"call.{name}"] = total
+        results[f"overhead.{name}"] = max(total - raw, 0.0)
+    return results
+
+
+def measure_throughput(
+    ls: LS, call: Callable[[LS], object], concurrency: int, calls: int
+) -> float:
+    """
+    Measure the calls per second of ``concurrency`` threads sharing ``ls``.
+
+    :return: Calls per second.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda _: call(ls), range(calls)))
+        return calls / (time.perf_counter() - start)
+
+
+def measure_memory(ls: LS, items: List[Scenario]) -> Dict[str, float]:
+    """
+    Measure the memory allocated while calling and retained by the decoded response.
+
+    :return: A dict with ``memory_peak.<name>`` and ``memory_retained.<name>`` in bytes.
+    """
+    results = {}
+    for name, _, _, call in items:
+        tracemalloc.start()
+        try:
+            response = call(ls)
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del response
+        results[f"memory_peak.{name}"] = float(peak)
+        results[f"memory_retained.{name}"] = float(retained)
+    return results
+
+
+def measure_conversions(ls: LS, items: List[Scenario], iterations: int) -> Dict[str, float]:
+    """
+    Measure the median duration of converting responses to GeoJSON and DataFrames.
+
+    :return: A dict with ``convert.<name>`` in seconds.
+    """
+    calls = {name: call for name, _, _, call in items}
+    routes = calls["routes"](ls)
+    isolines = calls["isolines"](ls)
+    alerts = calls["weather_alerts"](ls)
+    matrix = calls["matrix"](ls)
+    return {
+        "convert.routes_geojson": _timed(routes.to_geojson, iterations),
+        "convert.isolines_geojson": _timed(isolines.to_geojson, iterations),
+        "convert.weather_alerts_geojson": _timed(alerts.to_geojson, iterations),
+        "convert.travel_times_matrix": _timed(matrix.to_travel_times_matrix, iterations),
+        "convert.distances_matrix": _timed(matrix.to_distnaces_matrix, iterations),
+    }
+
+
+def run(
+    matrix_size: int = 1000, iterations: int = 5, concurrency: int = 16, calls: int = 200
+) -> Dict[str, float]:
+    """
+    Run all benchmarks against a local stand-in server.
+
+    :param matrix_size: Number of origins and destinations of the matrix payload.
+    :param iterations: Number of repetitions of timed calls.
+    :param concurrency: Number of threads of the throughput benchmark.
+    :param calls: Number of calls of the throughput benchmark.
+    :return: A dict of results.
+    """
+    sizes = {"/v8/matrix": {"origins": matrix_size, "destinations": matrix_size}}
+    with MockServer(sizes=sizes) as server:
+        transport = Transport(pool_maxsize=concurrency, base_url=server.url)
+        ls = LS(api_key="dummy", transport=transport)
+        items = scenarios(matrix_size)
+        with requests.Session() as session:
+            results = measure_overhead(ls, session, server.url, items, iterations)
+        geocode = items[0][3]
+        results["throughput.geocode"] = measure_throughput(ls, geocode, concurrency, calls)
+        results.update(measure_memory(ls, items))
+        results.update(measure_conversions(ls, items, iterations))
+        transport.close()
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """
+    Return the results which regressed compared to ``baseline``.
+
+    :param results: A dict of results as returned by :func:`run`.
+    :param baseline: A dict of stored results.
+    :param tolerance: Allowed relative deviation, e.g. ``0.25`` for 25 %. Results with a
+        zero baseline may deviate by :data:`ABSOLUTE_TOLERANCE` instead.
+    :return: A list of messages, one per regression.
+    """
+    regressions = []
+    for key, value in sorted(results.items()):
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        if key.startswith(HIGHER_IS_BETTER):
+            regressed = value < expected * (1 - tolerance)
+        elif expected == 0:
+            absolute = (v for prefix, v in ABSOLUTE_TOLERANCE.items() if key.startswith(prefix))
+            regressed = value > next(absolute, 0.0)
+        else:
+            regressed = value > expected * (1 + tolerance)
+        if regressed:
+            regressions.append(f"{key}: {value:.6g} (baseline {expected:.6g})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matrix-size", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run(
+        matrix_size=args.matrix_size,
+        iterations=args.iterations,
+        concurrency=args.concurrency,
+        calls=args.calls,
+    )
+    for key, value in sorted(results.items()):
+        print(f"{key:40} {value:.6g}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, store one with --save-baseline.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""A local stand-in HTTP server answering requests with canned HERE API payloads.
+
+Together with :class:`Transport <here_location_services.transport.Transport>` and its
+``base_url`` all requests of an :class:`LS <here_location_services.ls.LS>` instance are sent
+to the server instead of the HERE APIs::
+
+    with MockServer() as server:
+        ls = LS(api_key="dummy", transport=Transport(base_url=server.url))
+        ls.geocode("Berlin")
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+from benchmarks import payloads
+
+#: Paths of the server and the payload generators answering them.
+ROUTES: Dict[str, Callable[..., Dict]] = {
+    "/v1/geocode": payloads.geocode,
+    "/v8/routes": payloads.routes,
+    "/v8/isolines": payloads.isolines,
+    "/v8/matrix": payloads.matrix,
+    "/v3/alerts": payloads.weather_alerts,
+    "/v2/problems": payloads.tour_solution,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        path, _, query = self.path.partition("?")
+        self.server.count()
+        if path == "/v8/matrix" and "async=true" in query:
+            status_url = f"{self.server.url}/v8/matrix/1/status"
+            return self._send(202, json.dumps({"statusUrl": status_url}).encode())
+        if path == "/v8/matrix/1/status":
+            result_url = f"{self.server.url}/v8/matrix/1"
+            return self._send(
+                303, json.dumps({"resultUrl": result_url}).encode(), {"Location": result_url}
+            )
+        if path == "/v8/matrix/1":
+            path = "/v8/matrix"
+        body = self.server.payload(path)
+        if body is None:
+            return self._send(404, json.dumps({"error": f"Unknown path {path}"}).encode())
+        self._send(200, body)
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, sizes: Dict[str, Dict]):
+        super().__init__(address, _Handler)
+        self.sizes = sizes
+        self.requests = 0
+        self._payloads: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def payload(self, path: str) -> Optional[bytes]:
+        if path not in ROUTES:
+            return None
+        with self._lock:
+            if path not in self._payloads:
+                data = ROUTES[path](**self.sizes.get(path, {}))
+                self._payloads[path] = json.dumps(data).encode()
+            return self._payloads[path]
+
+
+class MockServer:
+    """A local HTTP server answering with canned payloads, run in a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, sizes: Optional[Dict] = None):
+        """
+        Instantiate the server.
+
+        :param host: The host to bind to.
+        :param port: The port to bind to, by default a free port.
+        :param sizes: Optional keyword arguments of the payload generators per path, e.g.
+            ``{"/v8/matrix": {"origins": 100, "destinations": 100}}``.
+        """
+        self._server = _Server((host, port), sizes or {})
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        return self._server.url
+
+    @property
+    def requests(self) -> int:
+        """Return the number of requests answered by the server."""
+        return self._server.requests
+
+    def payload(self, path: str) -> Optional[bytes]:
+        """Return the serialized payload of ``path``."""
+        return self._server.payload(path)
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
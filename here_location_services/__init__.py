@@ -6,5 +6,7 @@ This module contains top level imports for ``here_location_services`` package.
 """
 
 from .__version__ import __version__  # noqa: F401
+from .accessor import HLSAccessor  # noqa: F401
+from .deadline import Deadline  # noqa: F401
 from .ls import LS  # noqa: F401
 from .platform.credentials import PlatformCredentials  # noqa: F401
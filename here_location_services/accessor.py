@@ -0,0 +1,195 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module registers the ``hls`` accessor of :class:`pandas.DataFrame` for vectorized
+geocoding of columns.
+
+The values of a column are deduplicated, the unique values are geocoded concurrently and
+the results are broadcast back to all rows as new typed columns. Only the fields needed
+for the columns are taken from the first item of each response. The reason of a failed
+request is kept in the ``error`` column.
+
+Example::
+
+    import here_location_services  # registers the accessor
+
+    ls = LS(api_key=api_key)
+    df = df.hls.geocode("address", ls=ls)
+    df = df.hls.reverse_geocode("lat", "lng", ls=ls, prefix="address_")
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from here_location_services.bulk_routing import REQUEST_ERRORS, error_message
+from here_location_services.ls import LS
+from here_location_services.utils import map_in_context
+
+#: Fields of the results and the dtypes of their columns, ``error`` is always added.
+DTYPES = {
+    "lat": "float64",
+    "lng": "float64",
+    "label": "string",
+    "resultType": "category",
+    "score": "float64",
+    "distance": "float64",
+    "error": "string",
+}
+
+#: Default fields of :meth:`HLSAccessor.geocode`.
+GEOCODE_FIELDS = ("lat", "lng", "label", "resultType", "score")
+
+#: Default fields of :meth:`HLSAccessor.reverse_geocode`, the position of the result is
+#: left out so that it does not replace the queried coordinates.
+REVERSE_GEOCODE_FIELDS = ("label", "resultType", "distance")
+
+
+def _fields(item: Dict[str, Any]) -> Dict[str, Any]:
+    position = item.get("position") or {}
+    return {
+        "lat": position.get("lat"),
+        "lng": position.get("lng"),
+        "label": (item.get("address") or {}).get("label", item.get("title")),
+        "resultType": item.get("resultType"),
+        "score": (item.get("scoring") or {}).get("queryScore"),
+        "distance": item.get("distance"),
+    }
+
+
+@pd.api.extensions.register_dataframe_accessor("hls")
+class HLSAccessor:
+    """The ``hls`` accessor of :class:`pandas.DataFrame` objects."""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self._df = df
+
+    def _broadcast(
+        self,
+        codes: np.ndarray,
+        keys: Sequence,
+        request: Callable[[Any], Optional[Dict[str, Any]]],
+        fields: Sequence[str],
+        prefix: str,
+        concurrency: int,
+        errors: str,
+    ) -> pd.DataFrame:
+        if errors not in ("raise", "coerce"):
+            raise ValueError("errors must be 'raise' or 'coerce'.")
+
+        def fetch(key) -> Optional[Dict[str, Any]]:
+            try:
+                return request(key)
+            except REQUEST_ERRORS as exc:
+                if errors == "raise":
+                    raise
+                return {"error": error_message(exc)}
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results: List[Optional[Dict[str, Any]]] = map_in_context(executor, fetch, keys)
+        df = self._df.copy()
+        rows = np.where(codes < 0, len(results), codes)
+        for field in dict.fromkeys([*fields, "error"]):
+            values = pd.Series(
+                [None if r is None else r.get(field) for r in results] + [None],
+                dtype=DTYPES[field],
+            )
+            df[f"{prefix}{field}"] = values.iloc[rows].set_axis(df.index)
+        return df
+
+    def geocode(
+        self,
+        column: str,
+        ls: Optional[LS] = None,
+        concurrency: int = 8,
+        fields: Sequence[str] = GEOCODE_FIELDS,
+        prefix: str = "",
+        lang: str = "en-US",
+        errors: str = "coerce",
+    ) -> pd.DataFrame:
+        """
+        Geocode the addresses of ``column``.
+
+        :param column: The name of the column holding the addresses.
+        :param ls: An :class:`LS <here_location_services.ls.LS>` instance, by default one
+            authenticated from the environment.
+        :param concurrency: Number of concurrent requests.
+        :param fields: The fields of the first result to add as columns, any of
+            :data:`DTYPES`.
+        :param prefix: A prefix of the names of the new columns.
+        :param lang: Language of the results.
+        :param errors: ``coerce`` to leave the columns of failed requests empty with the
+            reason in the ``error`` column, ``raise`` to raise the exception. Errors of API
+            responses, timeouts, deadlines and open circuits are kept per row.
+        :raises BatchLimitExceededException: If the estimated transactions exceed the
+            ``batch_limit`` of the ledger attached to ``ls``.
+        :return: A copy of the DataFrame with the new columns and the ``error`` column.
+        """
+        ls = ls or LS()
+        api = ls.geo_search_api
+        codes, uniques = pd.factorize(self._df[column])
+        if ls.ledger is not None:
+            queries = sum(1 for query in uniques if isinstance(query, str) and query.strip())
+            ls.ledger.check(ls.ledger.estimate("geocode", requests=queries))
+
+        def request(query):
+            if not isinstance(query, str) or not query.strip():
+                return None
+            items = api.get_geocoding(query, limit=1, lang=lang).json().get("items")
+            return _fields(items[0]) if items else None
+
+        return self._broadcast(codes, uniques, request, fields, prefix, concurrency, errors)
+
+    def reverse_geocode(
+        self,
+        lat: str,
+        lng: str,
+        ls: Optional[LS] = None,
+        concurrency: int = 8,
+        fields: Sequence[str] = REVERSE_GEOCODE_FIELDS,
+        prefix: str = "",
+        lang: str = "en-US",
+        errors: str = "coerce",
+    ) -> pd.DataFrame:
+        """
+        Reverse geocode the coordinates of the columns ``lat`` and ``lng``.
+
+        :param lat: The name of the column holding latitudes.
+        :param lng: The name of the column holding longitudes.
+        :param ls: An :class:`LS <here_location_services.ls.LS>` instance, by default one
+            authenticated from the environment.
+        :param concurrency: Number of concurrent requests.
+        :param fields: The fields of the first result to add as columns, any of
+            :data:`DTYPES`.
+        :param prefix: A prefix of the names of the new columns.
+        :param lang: Language of the results.
+        :param errors: ``coerce`` to leave the columns of failed requests empty with the
+            reason in the ``error`` column, ``raise`` to raise the exception. Errors of API
+            responses, timeouts, deadlines and open circuits are kept per row.
+        :raises BatchLimitExceededException: If the estimated transactions exceed the
+            ``batch_limit`` of the ledger attached to ``ls``.
+        :return: A copy of the DataFrame with the new columns and the ``error`` column.
+        """
+        ls = ls or LS()
+        api = ls.geo_search_api
+        coords = self._df[[lat, lng]].astype("float64")
+        codes, uniques = pd.MultiIndex.from_frame(coords).factorize()
+
+        def valid(key) -> bool:
+            return -90 <= key[0] <= 90 and -180 <= key[1] <= 180
+
+        if ls.ledger is not None:
+            queries = sum(1 for key in uniques if valid(key))
+            ls.ledger.check(ls.ledger.estimate("revgeocode", requests=queries))
+
+        def request(key):
+            if not valid(key):
+                return None
+            resp = api.get_reverse_geocoding(lat=key[0], lng=key[1], limit=1, lang=lang)
+            items = resp.json().get("items")
+            return _fields(items[0]) if items else None
+
+        return self._broadcast(codes, list(uniques), request, fields, prefix, concurrency, errors)
@@ -0,0 +1,273 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the :class:`Ledger` class to account for billable transactions.
+
+A ledger attached to an :class:`LS <here_location_services.ls.LS>` instance keeps running
+counts of billable transactions, requests and requested matrix cells per service, i.e. per
+endpoint like ``geocode``, ``routes`` or ``matrix``, and per caller supplied label. Calls
+saved by a cache are counted with :meth:`Ledger.record_cache_saved`.
+
+The bulk methods of an :class:`LS <here_location_services.ls.LS>` instance with an attached
+ledger, e.g. :meth:`route_many <here_location_services.ls.LS.route_many>` or
+:meth:`matrix_cube <here_location_services.ls.LS.matrix_cube>`, estimate their transactions
+with :meth:`Ledger.estimate` before sending any request and refuse batches above the
+``batch_limit`` of the ledger.
+
+Only successful requests to HERE API hosts count as transactions. Polling the status of an
+async job and downloading its result are not billable. The number of matrix cells per
+transaction depends on the contract and is configurable.
+
+Example::
+
+    ledger = Ledger(batch_limit=100000)
+    ledger.attach(ls)
+    with ledger.tag("nightly-import"):
+        ls.geocode("Berlin")
+        ls.route_many(pairs)
+    print(ledger.last_estimate)
+    print(ledger.estimate("matrix", origins=1000, destinations=1000))
+    ledger.write_csv("usage.csv")
+"""
+
+import csv
+import math
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from here_location_services.exceptions import BatchLimitExceededException
+from here_location_services.hooks import RequestEvent
+
+#: Label of transactions outside of a :meth:`Ledger.tag` block.
+DEFAULT_LABEL = "default"
+
+#: Hosts of billable APIs.
+BILLABLE_HOSTS = ("hereapi.com", "hereapi.cn", "api.here.com")
+
+#: Columns of a ledger report.
+COLUMNS = ("label", "service", "requests", "transactions", "matrix_cells", "cache_saved")
+
+_label: ContextVar[str] = ContextVar("here_location_services_ledger_label", default=DEFAULT_LABEL)
+
+
+def matrix_cells(body: Optional[Dict]) -> int:
+    """
+    Return the number of cells of the matrix requested with the JSON ``body``.
+
+    :param body: The JSON body of a matrix routing request.
+    :return: Number of origins times number of destinations, which default to the origins.
+    """
+    if not body or "origins" not in body:
+        return 0
+    origins = len(body["origins"])
+    destinations = body.get("destinations")
+    return origins * (len(destinations) if destinations is not None else origins)
+
+
+class Ledger:
+    """Running counts of billable transactions per service and label."""
+
+    def __init__(self, matrix_cells_per_transaction: int = 1, batch_limit: Optional[int] = None):
+        """
+        Instantiate the ledger.
+
+        :param matrix_cells_per_transaction: Number of matrix cells billed as one
+            transaction.
+        :param batch_limit: An optional maximum number of estimated transactions of a single
+            bulk call, see :meth:`check`.
+        """
+        self.matrix_cells_per_transaction = matrix_cells_per_transaction
+        self.batch_limit = batch_limit
+        #: The estimate of the last bulk call checked with :meth:`check`.
+        self.last_estimate: Optional[Dict] = None
+        self._rows: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        _ledgers.add(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        _ledgers.add(self)
+
+    def _after_fork(self):
+        # A lock held by another thread at the time of the fork is never released.
+        self._lock = threading.Lock()
+
+    def attach(self, ls):
+        """
+        Account for the requests of ``ls`` and check the estimates of its bulk calls.
+
+        :param ls: An :class:`LS <here_location_services.ls.LS>` instance.
+        """
+        ls.hooks.on_response(self.observe)
+        ls.ledger = self
+
+    @contextmanager
+    def tag(self, label: str) -> Iterator[None]:
+        """
+        Account all requests sent within the ``with`` block to ``label``.
+
+        :param label: A caller supplied label, e.g. the name of a job or team.
+        """
+        token = _label.set(label)
+        try:
+            yield
+        finally:
+            _label.reset(token)
+
+    def _add(self, service: str, label: Optional[str] = None, **counts: int):
+        key = (label or _label.get(), service)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = dict.fromkeys(COLUMNS[2:], 0)
+            for name, value in counts.items():
+                row[name] += value
+
+    def transactions(self, service: str, cells: int = 0) -> int:
+        """
+        Return the number of transactions billed for one request.
+
+        :param service: The name of the endpoint, e.g. ``matrix``.
+        :param cells: Number of requested matrix cells.
+        :return: An int.
+        """
+        if cells:
+            return math.ceil(cells / self.matrix_cells_per_transaction)
+        return 1
+
+    def observe(self, event: RequestEvent):
+        """Account for an ``on_response`` event if the request is billable."""
+        if event.status_code is None or not 200 <= event.status_code < 300:
+            return
+        if not urlsplit(event.url).netloc.endswith(BILLABLE_HOSTS):
+            return
+        if event.method == "GET" and "{id}" in event.url_template:
+            return
+        cells = matrix_cells(event.body) if event.endpoint == "matrix" else 0
+        self._add(
+            event.endpoint,
+            requests=1,
+            transactions=self.transactions(event.endpoint, cells),
+            matrix_cells=cells,
+        )
+
+    def record_cache_saved(self, service: str, count: int = 1, label: Optional[str] = None):
+        """
+        Count calls to ``service`` which were served from a cache instead.
+
+        :param service: The name of the endpoint, e.g. ``geocode``.
+        :param count: Number of saved calls.
+        :param label: The label, defaults to the label of the active :meth:`tag` block.
+        """
+        self._add(service, label=label, cache_saved=count)
+
+    def estimate(
+        self,
+        service: str,
+        requests: int = 1,
+        origins: int = 0,
+        destinations: Optional[int] = None,
+        price_per_transaction: Optional[float] = None,
+    ) -> Dict:
+        """
+        Predict the transactions of a batch before sending it.
+
+        :param service: The name of the endpoint, e.g. ``geocode`` or ``matrix``.
+        :param requests: Number of requests of the batch.
+        :param origins: Number of origins of each matrix request.
+        :param destinations: Number of destinations of each matrix request, defaults to
+            ``origins``.
+        :param price_per_transaction: Optional price of a transaction to estimate the cost.
+        :return: A dict with ``requests``, ``transactions``, ``matrix_cells`` and ``cost``,
+            which is None without ``price_per_transaction``.
+        """
+        cells = origins * (destinations if destinations is not None else origins)
+        transactions = requests * self.transactions(service, cells)
+        return {
+            "service": service,
+            "requests": requests,
+            "transactions": transactions,
+            "matrix_cells": requests * cells,
+            "cost": (
+                None if price_per_transaction is None else transactions * price_per_transaction
+            ),
+        }
+
+    def check(self, *estimates: Dict) -> Dict:
+        """
+        Check the estimates of the requests of a bulk call against the ``batch_limit``.
+
+        :param estimates: Estimates of :meth:`estimate` of a single service.
+        :return: The sum of the estimates, also kept as :attr:`last_estimate`.
+        :raises BatchLimitExceededException: If the estimated transactions exceed the
+            ``batch_limit``.
+        """
+        total = {"service": estimates[0]["service"], "cost": None}
+        for name in ("requests", "transactions", "matrix_cells"):
+            total[name] = sum(estimate[name] for estimate in estimates)
+        if all(estimate["cost"] is not None for estimate in estimates):
+            total["cost"] = sum(estimate["cost"] for estimate in estimates)
+        self.last_estimate = total
+        if self.batch_limit is not None and total["transactions"] > self.batch_limit:
+            raise BatchLimitExceededException(total["transactions"], self.batch_limit)
+        return total
+
+    def report(self) -> List[Dict]:
+        """
+        Return the counts of the ledger.
+
+        :return: A list of dicts with the :data:`COLUMNS` as keys, one per label and service.
+        """
+        with self._lock:
+            return [
+                dict(label=label, service=service, **row)
+                for (label, service), row in sorted(self._rows.items())
+            ]
+
+    def totals(self) -> Dict[str, int]:
+        """Return the counts of the ledger summed over all labels and services."""
+        totals = dict.fromkeys(COLUMNS[2:], 0)
+        for row in self.report():
+            for name in totals:
+                totals[name] += row[name]
+        return totals
+
+    def write_csv(self, path: str):
+        """
+        Write the report of the ledger to a CSV file.
+
+        :param path: The path of the file.
+        """
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.report())
+
+    def reset(self):
+        """Remove all counts."""
+        with self._lock:
+            self._rows.clear()
+
+
+_ledgers: "weakref.WeakSet[Ledger]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for ledger in list(_ledgers):
+        ledger._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
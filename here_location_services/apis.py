@@ -11,8 +11,23 @@ from typing import Dict, Optional
 
 import requests
 
+from here_location_services.circuit_breaker import CircuitBreaker
 from here_location_services.config.url_config import conf
+from here_location_services.deadline import (
+    DEFAULT_TIMEOUT,
+    UNSET,
+    Timeout,
+    TimeoutArg,
+    current_deadline,
+    resolve_timeout,
+)
+from here_location_services.exceptions import DeadlineExceededException
+from here_location_services.hedging import HedgingPolicy
+from here_location_services.hooks import Hooks, RequestEvent, url_template
 from here_location_services.platform.auth import Auth
+from here_location_services.singleflight import SingleFlight, request_key
+from here_location_services.tracing import current_span, span
+from here_location_services.transport import Transport
 
 
 class Api:
@@ -24,6 +39,8 @@ class Api:
         auth: Optional[Auth] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
         self.auth = auth
         self.credentials = dict(
@@ -32,6 +49,20 @@ class Api:
         self.proxies = proxies or urllib.request.getproxies()
         self.headers: Dict[str, str] = {}
         self.country = country
+        self.timeout = timeout
+        self.transport = transport or Transport()
+        #: An optional :class:`SingleFlight <here_location_services.singleflight.SingleFlight>`
+        #: group to coalesce identical concurrent requests.
+        self.single_flight: Optional[SingleFlight] = None
+        #: An optional :class:`HedgingPolicy <here_location_services.hedging.HedgingPolicy>`
+        #: for GET requests.
+        self.hedging: Optional[HedgingPolicy] = None
+        #: An optional
+        #: :class:`CircuitBreaker <here_location_services.circuit_breaker.CircuitBreaker>` to
+        #: fail fast on degraded hosts.
+        self.circuit_breaker: Optional[CircuitBreaker] = None
+        #: Lifecycle hooks of the requests of this API, see :mod:`here_location_services.hooks`.
+        self.hooks = Hooks()
 
     def _get_url_string(self) -> str:
         """
@@ -51,50 +82,195 @@ class Api:
                 f"api_key: {self.credentials['api_key']} is not present in credentials."
             )
 
-    def __add_api_key_in_params(self, params: Dict) -> Dict:
+    def _build_params(self, params: Optional[Dict] = None) -> Dict:
         """
-        Add api_key in query params dictionary.
+        Return a new query params dictionary with ``apiKey`` added if applicable.
 
-        :param params: A dictionary.
+        :param params: An optional dict for query params. It is not modified.
         :return: Dict.
         """
-        params.update({"apiKey": self.credentials["api_key"]})
-        return params
+        q_params = dict(params) if params is not None else {}
+        if self.credentials["api_key"]:
+            q_params["apiKey"] = self.credentials["api_key"]
+        return q_params
+
+    def _build_headers(self, content_type: Optional[str] = None) -> Dict[str, str]:
+        """
+        Return a new headers dictionary for a single request.
+
+        The headers are built from scratch for every request, so that requests sent
+        concurrently from several threads never share mutable state.
+
+        :param content_type: An optional value for the ``Content-Type`` header.
+        :return: Dict.
+        """
+        headers = dict(self.headers)
+        if content_type:
+            headers["Content-Type"] = content_type
+        if not self.credentials["api_key"] and self.auth:
+            headers["Authorization"] = f"Bearer {self.auth.token}"
+        elif not self.credentials["api_key"] and self.credentials["access_token"]:
+            headers["Authorization"] = f"Bearer {self.credentials['access_token']}"
+        return headers
+
+    def _send(self, method: str, url: str, timeout: TimeoutArg = UNSET, **kwargs):
+        """
+        Send HTTP request, coalesced with identical requests in flight if enabled.
+
+        Streamed requests are never coalesced as their content can only be read once.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param timeout: Connect and read timeouts, defaults to the timeout of the instance.
+        :param kwargs: An optional extra arguments.
+        :return: :class:`requests.Response` object.
+        """
+        if self.single_flight is None or kwargs.get("stream"):
+            return self._hedge(method, url, timeout=timeout, **kwargs)
+        key = request_key(
+            method, url, kwargs.get("params"), kwargs.get("json"), kwargs.get("headers")
+        )
+        return self.single_flight.do(
+            key, lambda: self._hedge(method, url, timeout=timeout, **kwargs)
+        )
+
+    def _hedge(self, method: str, url: str, timeout: TimeoutArg = UNSET, **kwargs):
+        """
+        Send HTTP request, hedged according to the hedging policy for GET requests.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param timeout: Connect and read timeouts, defaults to the timeout of the instance.
+        :param kwargs: An optional extra arguments.
+        :return: :class:`requests.Response` object.
+        """
+        if self.hedging is None or method != "GET" or kwargs.get("stream"):
+            return self._request(method, url, timeout=timeout, **kwargs)
 
-    def get(self, url: str, params: Optional[Dict] = None, **kwargs):
+        def on_hedge():
+            if self.hooks.active:
+                self.hooks.emit("on_retry", RequestEvent(method, url))
+
+        return self.hedging.run(
+            lambda: self._request(method, url, timeout=timeout, **kwargs), on_hedge=on_hedge
+        )
+
+    def _request(self, method: str, url: str, timeout: TimeoutArg = UNSET, **kwargs):
+        """
+        Send HTTP request, within a tracing span if a span is active.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param timeout: Connect and read timeouts, defaults to the timeout of the instance.
+        :param kwargs: An optional extra arguments.
+        :return: :class:`requests.Response` object.
+        """
+        if current_span() is None:
+            return self._attempt(method, url, timeout=timeout, **kwargs)
+        attributes = {"http.method": method, "http.url": url_template(url)}
+        with span(f"HTTP {method}", **attributes) as attempt:
+            resp = self._attempt(method, url, timeout=timeout, **kwargs)
+            attempt.set_attribute("http.status_code", resp.status_code)  # type: ignore
+            return resp
+
+    def _attempt(self, method: str, url: str, timeout: TimeoutArg = UNSET, **kwargs):
+        """
+        Send HTTP request with timeouts capped by the active deadline.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param timeout: Connect and read timeouts, defaults to the timeout of the instance.
+        :param kwargs: An optional extra arguments.
+        :return: :class:`requests.Response` object.
+        :raises DeadlineExceededException: If the active deadline expires.
+        :raises CircuitOpenException: If the circuit of the host is open.
+        """
+        timeout = resolve_timeout(timeout, self.timeout)
+        event = None
+        if self.hooks.active:
+            event = RequestEvent(method, url, body=kwargs.get("json"))
+            self.hooks.emit("on_request", event)
+        breaker = self.circuit_breaker
+        host = breaker.host(url) if breaker is not None else ""
+        try:
+            if breaker is not None:
+                breaker.before_request(host)
+            try:
+                resp = self.transport.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as exc:
+                if breaker is not None:
+                    breaker.record(host, success=False)
+                deadline = current_deadline()
+                if isinstance(exc, requests.Timeout) and deadline is not None and deadline.expired:
+                    raise DeadlineExceededException(deadline.seconds) from exc
+                raise
+            except BaseException:
+                if breaker is not None:
+                    breaker.release(host)
+                raise
+        except Exception as exc:
+            if event is not None:
+                event._record_error(exc)
+                self.hooks.emit("on_error", event)
+            raise
+        if breaker is not None:
+            breaker.record(host, success=resp.status_code < 500)
+        if event is not None:
+            event._record_response(resp)
+            self.hooks.emit_response(event)
+        return resp
+
+    def get(self, url: str, params: Optional[Dict] = None, timeout: TimeoutArg = UNSET, **kwargs):
         """Send HTTP GET request.
 
         :param url: A string to represent URL.
         :param params: An optional dict for query params.
+        :param timeout: Connect and read timeouts for this request, either a float or a tuple
+            of two floats, or None to disable them. Defaults to the timeout of the active
+            :func:`request_timeout <here_location_services.deadline.request_timeout>` block
+            or of the instance.
         :param kwargs: An optional extra arguments.
         :return: :class:`requests.Response` object.
         """
-        q_params = params if params is not None else {}
-        if self.credentials["api_key"]:
-            q_params = self.__add_api_key_in_params(q_params)
-        elif self.credentials["access_token"]:
-            auth_token = {"Authorization": f"Bearer {self.credentials['access_token']}"}
-            self.headers.update(auth_token)
-        resp = requests.get(url, params=q_params, headers=self.headers, **kwargs)
+        resp = self._send(
+            "GET",
+            url,
+            timeout=timeout,
+            params=self._build_params(params),
+            headers=self._build_headers(),
+            **kwargs,
+        )
         return resp
 
-    def post(self, url: str, data: Dict, params: Optional[Dict] = None):
+    def post(
+        self,
+        url: str,
+        data: Dict,
+        params: Optional[Dict] = None,
+        timeout: TimeoutArg = UNSET,
+        **kwargs,
+    ):
         """
         Send HTTP POST request.
 
         :param url: A string to represent URL.
         :param data: A dictionary to represent the post data
         :param params: An optional dict for query params.
+        :param timeout: Connect and read timeouts for this request, either a float or a tuple
+            of two floats, or None to disable them. Defaults to the timeout of the active
+            :func:`request_timeout <here_location_services.deadline.request_timeout>` block
+            or of the instance.
+        :param kwargs: An optional extra arguments.
         :return: :class:`requests.Response` object.
         """
-        self.headers.update({"Content-Type": "application/json"})
-        q_params = params if params is not None else {}
-        if self.credentials["api_key"]:
-            q_params = self.__add_api_key_in_params(q_params)
-        elif self.credentials["access_token"]:
-            auth_token = {"Authorization": f"Bearer {self.credentials['access_token']}"}
-            self.headers.update(auth_token)
-        resp = requests.post(
-            url, params=q_params, json=data, proxies=self.proxies, headers=self.headers
+        resp = self._send(
+            "POST",
+            url,
+            timeout=timeout,
+            params=self._build_params(params),
+            json=data,
+            proxies=self.proxies,
+            headers=self._build_headers(content_type="application/json"),
+            **kwargs,
         )
         return resp
@@ -10,7 +10,9 @@ from here_location_services.config.autosuggest_config import SearchCircle
 from here_location_services.platform.auth import Auth
 
 from .apis import Api
+from .deadline import DEFAULT_TIMEOUT, Timeout
 from .exceptions import ApiError
+from .transport import Transport
 
 
 class AutosuggestApi(Api):
@@ -22,8 +24,17 @@ class AutosuggestApi(Api):
         auth: Optional[Auth] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
-        super().__init__(api_key, auth=auth, proxies=proxies, country=country)
+        super().__init__(
+            api_key,
+            auth=auth,
+            proxies=proxies,
+            country=country,
+            timeout=timeout,
+            transport=transport,
+        )
         self._base_url = f"https://autosuggest.search.{self._get_url_string()}"
 
     def get_autosuggest(
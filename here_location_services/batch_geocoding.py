@@ -0,0 +1,506 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains a streaming pipeline to geocode large files of addresses.
+
+Addresses are read lazily from CSV or NDJSON files, geocoded with a
+:class:`GeocodingSearchApi <here_location_services.geocoding_search_api.GeocodingSearchApi>`
+by a bounded number of concurrent requests and written incrementally and in input order to
+NDJSON, CSV or Parquet. Only a bounded number of rows is held in memory at any time,
+regardless of the size of the input.
+
+Throttled requests, server errors and connection errors are retried with exponential
+backoff, honouring the ``Retry-After`` header of the response. Once a request has failed
+``max_attempts`` times, the run stops.
+
+With a checkpoint file, the progress is recorded every ``checkpoint_every`` rows after the
+output has been flushed to disk. A crashed run started again with the same arguments drops
+output written after the last checkpoint and resumes from there.
+
+Parquet output is a directory of part files, one per checkpoint, and requires ``pyarrow``,
+installed with ``pip install here-location-services[arrow]``.
+
+Example::
+
+    ls = LS(api_key=api_key)
+    geocode_file(
+        ls.geo_search_api, "addresses.csv", "results.ndjson", column="address",
+        checkpoint_path="results.ckpt",
+    )
+
+or from the command line::
+
+    python -m here_location_services.batch_geocoding addresses.csv results.ndjson \\
+        --column address --checkpoint results.ckpt --concurrency 16
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from here_location_services.accounting import Ledger
+from here_location_services.deadline import wait
+from here_location_services.exceptions import ApiError, BatchLimitExceededException
+from here_location_services.geocoding_search_api import GeocodingSearchApi
+from here_location_services.transport import Transport
+from here_location_services.utils import submit_in_context
+
+#: Columns of the output, ``id`` is only written if an id column is given.
+FIELDS = ("row", "id", "query", "lat", "lng", "label", "resultType", "score", "error")
+
+#: File formats by file extension.
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+
+Row = Tuple[int, Any, str]
+
+#: Default number of attempts of a request before the run stops.
+MAX_ATTEMPTS = 5
+
+#: Seconds to wait before the first retry, doubled for every further retry.
+BACKOFF = 1.0
+
+#: Maximum number of seconds to wait before a retry.
+MAX_BACKOFF = 60.0
+
+
+def file_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Return the format of the file ``path``.
+
+    :param path: The path of the file.
+    :param fmt: An optional explicit format, ``csv``, ``ndjson`` or ``parquet``.
+    :return: A string.
+    :raises ValueError: If the format is unknown.
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None or fmt not in FORMATS.values():
+        raise ValueError(f"Unknown file format of {path}, use one of csv, ndjson, parquet.")
+    return fmt
+
+
+def read_rows(
+    path: str, column: str, id_column: Optional[str] = None, fmt: Optional[str] = None
+) -> Iterator[Row]:
+    """
+    Lazily read the addresses of a CSV or NDJSON file.
+
+    :param path: The path of the file.
+    :param column: The column or field holding the address.
+    :param id_column: An optional column or field holding an id passed to the output.
+    :param fmt: An optional explicit format, ``csv`` or ``ndjson``.
+    :return: An iterator of tuples of row number, id and address.
+    """
+    fmt = file_format(path, fmt)
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            records: Iterable[Dict] = csv.DictReader(f)
+        elif fmt == "ndjson":
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            raise ValueError("Addresses can only be read from CSV or NDJSON files.")
+        for row, record in enumerate(records):
+            yield row, record.get(id_column) if id_column else None, record.get(column) or ""
+
+
+def retry_after(resp: requests.Response) -> Optional[float]:
+    """
+    Return the seconds to wait before retrying as requested by the ``Retry-After`` header.
+
+    :param resp: A response.
+    :return: A float or None if the header is missing or invalid.
+    """
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.now(retry_at.tzinfo)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+def _retryable(exc: Exception) -> bool:
+    if isinstance(exc, ApiError):
+        resp = exc.args[0]
+        return resp.status_code == 429 or resp.status_code >= 500
+    return isinstance(exc, requests.RequestException)
+
+
+def _get_items(
+    api: GeocodingSearchApi, query: str, lang: str, max_attempts: int
+) -> Optional[List[Dict]]:
+    attempt = 1
+    while True:
+        try:
+            return api.get_geocoding(query, limit=1, lang=lang).json().get("items")
+        except (ApiError, requests.RequestException) as exc:
+            if not _retryable(exc) or attempt >= max_attempts:
+                raise
+            delay = retry_after(exc.args[0]) if isinstance(exc, ApiError) else None
+            if delay is None:
+                delay = BACKOFF * 2 ** (attempt - 1)
+            wait(min(delay, MAX_BACKOFF))
+            attempt += 1
+
+
+def _geocode(
+    api: GeocodingSearchApi, query: str, lang: str, max_attempts: int = MAX_ATTEMPTS
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = dict.fromkeys(FIELDS[3:])
+    if not query or query.isspace():
+        result["error"] = "Empty query"
+        return result
+    try:
+        items = _get_items(api, query, lang, max_attempts)
+    except ApiError as exc:
+        if _retryable(exc):
+            raise
+        resp = exc.args[0]
+        result["error"] = f"{resp.status_code} {resp.reason}"
+        return result
+    if not items:
+        result["error"] = "No result"
+        return result
+    item = items[0]
+    position = item.get("position") or {}
+    result.update(
+        lat=position.get("lat"),
+        lng=position.get("lng"),
+        label=item.get("address", {}).get("label", item.get("title")),
+        resultType=item.get("resultType"),
+        score=item.get("scoring", {}).get("queryScore"),
+    )
+    return result
+
+
+def geocode_rows(
+    api: GeocodingSearchApi,
+    rows: Iterable[Row],
+    concurrency: int = 8,
+    lang: str = "en-US",
+    max_attempts: int = MAX_ATTEMPTS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Geocode rows concurrently and yield the results in input order.
+
+    At most ``2 * concurrency`` rows are in flight, so memory stays bounded.
+
+    :param api: A :class:`GeocodingSearchApi` instance.
+    :param rows: An iterable of tuples of row number, id and address.
+    :param concurrency: Number of concurrent requests.
+    :param lang: Language of the results.
+    :param max_attempts: Number of attempts of a throttled or failed request.
+    :return: An iterator of dicts with the :data:`FIELDS` as keys. Rows which cannot be
+        geocoded have an ``error`` instead of a position.
+    :raises ApiError: If a request is still throttled or fails with a server error after
+        ``max_attempts`` attempts.
+    :raises requests.RequestException: If a request still fails without response after
+        ``max_attempts`` attempts.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending: Deque = deque()
+        for row, id_, query in rows:
+            future = submit_in_context(executor, _geocode, api, query, lang, max_attempts)
+            pending.append((row, id_, query, future))
+            while len(pending) >= 2 * concurrency:
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+
+
+def _result(row, id_, query, future) -> Dict[str, Any]:
+    return dict(row=row, id=id_, query=query, **future.result())
+
+
+class _Writer:
+    """Base class of incremental writers resuming at a position recorded by :meth:`commit`."""
+
+    def __init__(self, path: str, fields: List[str]):
+        self.path = path
+        self.fields = fields
+
+    def write(self, result: Dict[str, Any]):
+        raise NotImplementedError
+
+    def commit(self) -> int:
+        """Flush written rows to disk and return the position to resume from."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class _FileWriter(_Writer):
+    """A writer of UTF-8 text files, opened in binary mode so positions are byte offsets."""
+
+    def __init__(self, path: str, fields: List[str], position: Optional[int] = None):
+        super().__init__(path, fields)
+        if position is None:
+            self.file: IO[bytes] = open(path, "wb")
+        else:
+            self.file = open(path, "r+b")
+            self.file.truncate(position)
+            self.file.seek(position)
+
+    def write_text(self, text: str):
+        self.file.write(text.encode("utf-8"))
+
+    def commit(self) -> int:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class _NdjsonWriter(_FileWriter):
+    def write(self, result: Dict[str, Any]):
+        data = {field: result[field] for field in self.fields}
+        self.write_text(json.dumps(data, ensure_ascii=False) + "\n")
+
+
+class _CsvWriter(_FileWriter):
+    def __init__(self, path: str, fields: List[str], position: Optional[int] = None):
+        super().__init__(path, fields, position)
+        self.buffer = io.StringIO(newline="")
+        self.writer = csv.DictWriter(self.buffer, fieldnames=fields, extrasaction="ignore")
+        if position is None:
+            self.writer.writeheader()
+            self.flush_buffer()
+
+    def write(self, result: Dict[str, Any]):
+        self.writer.writerow(result)
+        self.flush_buffer()
+
+    def flush_buffer(self):
+        self.write_text(self.buffer.getvalue())
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+
+class _ParquetWriter(_Writer):
+    def __init__(self, path: str, fields: List[str], position: Optional[int] = None):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "Parquet output requires pyarrow, pip install here-location-services[arrow]."
+            )
+        super().__init__(path, fields)
+        self.part = position or 0
+        self.rows: List[Dict[str, Any]] = []
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= self.part:
+                os.remove(os.path.join(path, name))
+
+    def write(self, result: Dict[str, Any]):
+        row = {field: result[field] for field in self.fields}
+        if row.get("id") is not None:
+            row["id"] = str(row["id"])
+        self.rows.append(row)
+
+    def commit(self) -> int:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.rows:
+            table = pa.Table.from_pylist(self.rows, schema=self.schema)
+            pq.write_table(table, os.path.join(self.path, f"part-{self.part:05d}.parquet"))
+            self.part += 1
+            self.rows = []
+        return self.part
+
+    @property
+    def schema(self):
+        import pyarrow as pa
+
+        types = {
+            "row": pa.int64(),
+            "id": pa.string(),
+            "lat": pa.float64(),
+            "lng": pa.float64(),
+            "score": pa.float64(),
+        }
+        return pa.schema([(field, types.get(field, pa.string())) for field in self.fields])
+
+
+_WRITERS = {"ndjson": _NdjsonWriter, "csv": _CsvWriter, "parquet": _ParquetWriter}
+
+
+def _load_checkpoint(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: Optional[str], checkpoint: Dict[str, Any]):
+    if path is None:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def geocode_file(
+    api: GeocodingSearchApi,
+    input_path: str,
+    output_path: str,
+    column: str = "address",
+    id_column: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+    concurrency: int = 8,
+    lang: str = "en-US",
+    checkpoint_every: int = 1000,
+    input_format: Optional[str] = None,
+    output_format: Optional[str] = None,
+    ledger: Optional[Ledger] = None,
+    max_attempts: int = MAX_ATTEMPTS,
+) -> int:
+    """
+    Geocode the addresses of a file and write the results to another file.
+
+    :param api: A :class:`GeocodingSearchApi` instance.
+    :param input_path: The path of a CSV or NDJSON file.
+    :param output_path: The path of an NDJSON or CSV file, or of a directory of Parquet
+        files.
+    :param column: The column or field holding the address.
+    :param id_column: An optional column or field holding an id passed to the output.
+    :param checkpoint_path: An optional path of a checkpoint file to resume from.
+    :param concurrency: Number of concurrent requests.
+    :param lang: Language of the results.
+    :param checkpoint_every: Number of rows between checkpoints.
+    :param input_format: An optional explicit format of the input.
+    :param output_format: An optional explicit format of the output.
+    :param ledger: An optional :class:`Ledger <here_location_services.accounting.Ledger>`
+        to check the estimated transactions of the remaining rows against before sending
+        any request.
+    :param max_attempts: Number of attempts of a throttled or failed request before the
+        run stops.
+    :return: The number of rows in the output.
+    :raises ApiError: If a request is still throttled or fails with a server error after
+        ``max_attempts`` attempts. The rows geocoded before are checkpointed, so that the
+        run can be resumed.
+    :raises requests.RequestException: If a request still fails without response after
+        ``max_attempts`` attempts. The rows are checkpointed as well.
+    :raises BatchLimitExceededException: If the estimated transactions exceed the
+        ``batch_limit`` of ``ledger``.
+    """
+    fields = [f for f in FIELDS if f != "id" or id_column]
+    checkpoint = _load_checkpoint(checkpoint_path) or {"rows": 0, "position": None}
+    if checkpoint.get("done"):
+        return checkpoint["rows"]
+    if ledger is not None:
+        rows = itertools.islice(
+            read_rows(input_path, column, id_column, input_format), checkpoint["rows"], None
+        )
+        queries = sum(1 for _, _, query in rows if query and not query.isspace())
+        ledger.check(ledger.estimate("geocode", requests=queries))
+    writer_class = _WRITERS[file_format(output_path, output_format)]
+    writer = writer_class(output_path, fields, checkpoint["position"])
+    done = checkpoint["rows"]
+    try:
+        rows = itertools.islice(read_rows(input_path, column, id_column, input_format), done, None)
+        results = geocode_rows(
+            api, rows, concurrency=concurrency, lang=lang, max_attempts=max_attempts
+        )
+        for result in results:
+            writer.write(result)
+            done += 1
+            if done % checkpoint_every == 0:
+                _save_checkpoint(checkpoint_path, {"rows": done, "position": writer.commit()})
+    except BaseException:
+        _save_checkpoint(checkpoint_path, {"rows": done, "position": writer.commit()})
+        raise
+    else:
+        _save_checkpoint(
+            checkpoint_path, {"rows": done, "position": writer.commit(), "done": True}
+        )
+    finally:
+        writer.close()
+    return done
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Geocode a file from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m here_location_services.batch_geocoding",
+        description="Geocode the addresses of a CSV or NDJSON file.",
+    )
+    parser.add_argument("input", help="CSV or NDJSON file of addresses.")
+    parser.add_argument("output", help="NDJSON, CSV or Parquet output path.")
+    parser.add_argument("--column", default="address", help="Column holding the address.")
+    parser.add_argument("--id-column", help="Column holding an id passed to the output.")
+    parser.add_argument("--checkpoint", help="Checkpoint file to resume a crashed run.")
+    parser.add_argument("--checkpoint-every", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--lang", default="en-US")
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=MAX_ATTEMPTS,
+        help="Attempts of a throttled or failed request before stopping.",
+    )
+    parser.add_argument("--input-format", choices=("csv", "ndjson"))
+    parser.add_argument("--output-format", choices=("csv", "ndjson", "parquet"))
+    parser.add_argument(
+        "--batch-limit", type=int, help="Stop before sending if more transactions are estimated."
+    )
+    parser.add_argument("--api-key", help="API key, defaults to the env var LS_API_KEY.")
+    parser.add_argument("--base-url", help="Send all requests to this URL instead.")
+    args = parser.parse_args(argv)
+
+    transport = Transport(pool_maxsize=max(args.concurrency, 10), base_url=args.base_url)
+    api = GeocodingSearchApi(
+        api_key=args.api_key or os.environ.get("LS_API_KEY"), transport=transport
+    )
+    try:
+        rows = geocode_file(
+            api,
+            args.input,
+            args.output,
+            column=args.column,
+            id_column=args.id_column,
+            checkpoint_path=args.checkpoint,
+            concurrency=args.concurrency,
+            lang=args.lang,
+            checkpoint_every=args.checkpoint_every,
+            input_format=args.input_format,
+            output_format=args.output_format,
+            ledger=None if args.batch_limit is None else Ledger(batch_limit=args.batch_limit),
+            max_attempts=args.max_attempts,
+        )
+    except BatchLimitExceededException as exc:
+        print(f"Stopped: {exc}")
+        return 1
+    except (ApiError, requests.RequestException) as exc:
+        print(f"Stopped: {exc}. Run again with the same arguments to resume.")
+        return 1
+    finally:
+        transport.close()
+    print(f"Geocoded {rows} rows to {args.output}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains helpers of :meth:`LS.route_many <here_location_services.ls.LS.route_many>`
+to route many origin-destination pairs.
+
+Each routing response is reduced to a compact summary of the first route. Geometries are
+kept as encoded flexible polylines in :class:`LazyGeometry` objects, which are only decoded
+when their coordinates are accessed.
+
+A :class:`RouteSweep` of :meth:`LS.route_sweep <here_location_services.ls.LS.route_sweep>`
+holds the durations and lengths of routes of many pairs at many departure times as dense
+arrays of shape ``(pairs, times)``.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import flexpolyline as fp
+import numpy as np
+import pandas as pd
+import requests
+
+from here_location_services.exceptions import (
+    ApiError,
+    CircuitOpenException,
+    DeadlineExceededException,
+    TooManyRequestsException,
+)
+
+#: Columns of the origin and destination coordinates of a DataFrame of pairs.
+PAIR_COLUMNS = ("origin_lat", "origin_lng", "destination_lat", "destination_lng")
+
+#: Columns of the summary table, with their dtypes.
+SUMMARY_DTYPES = {
+    "duration": "float64",
+    "base_duration": "float64",
+    "length": "float64",
+    "tolls": "float64",
+    "sections": "Int64",
+    "error": "string",
+}
+
+
+class LazyGeometry:
+    """The line of a route, decoded from its flexible polylines on first access."""
+
+    def __init__(self, polylines: List[str]) -> None:
+        """
+        Instantiate the geometry.
+
+        :param polylines: The encoded flexible polylines of the sections of a route.
+        """
+        self.polylines = polylines
+        self._coordinates: Optional[List[Tuple[float, float]]] = None
+
+    def __repr__(self):
+        state = "decoded" if self._coordinates is not None else "encoded"
+        return f"LazyGeometry({len(self.polylines)} sections, {state})"
+
+    @property
+    def coordinates(self) -> List[Tuple[float, float]]:
+        """Return the ``(lng, lat)`` coordinates of the route."""
+        if self._coordinates is None:
+            coordinates: List[Tuple[float, float]] = []
+            for polyline in self.polylines:
+                points = [(p[1], p[0]) for p in fp.decode(polyline)]
+                if coordinates and points and coordinates[-1] == points[0]:
+                    points = points[1:]
+                coordinates.extend(points)
+            self._coordinates = coordinates
+        return self._coordinates
+
+    @property
+    def __geo_interface__(self) -> Dict[str, Any]:
+        return {"type": "LineString", "coordinates": self.coordinates}
+
+
+class RouteSweep:
+    """Durations and lengths of routes of pairs at departure times."""
+
+    def __init__(
+        self,
+        departures: List[datetime],
+        durations: np.ndarray,
+        lengths: np.ndarray,
+        errors: Dict[Tuple[int, int], str],
+        index: pd.Index,
+    ) -> None:
+        """
+        Instantiate the sweep.
+
+        :param departures: The departure times, the axis of the columns.
+        :param durations: A float64 array of shape ``(pairs, times)`` of durations in
+            seconds, NaN where the route failed.
+        :param lengths: A float64 array of the same shape of lengths in meters.
+        :param errors: The reasons of failed routes by ``(pair, time)`` position.
+        :param index: The index of the pairs, the axis of the rows.
+        """
+        self.departures = departures
+        self.durations = durations
+        self.lengths = lengths
+        self.errors = errors
+        self.index = index
+
+    def __repr__(self):
+        pairs, times = self.durations.shape
+        return f"RouteSweep({pairs} pairs, {times} departures, {len(self.errors)} errors)"
+
+    def to_frame(self, values: str = "durations") -> pd.DataFrame:
+        """
+        Return the ``durations`` or ``lengths`` as a DataFrame of pairs and departures.
+
+        :param values: ``durations`` or ``lengths``.
+        :return: A DataFrame with the pairs as rows and the departure times as columns.
+        """
+        return pd.DataFrame(getattr(self, values), index=self.index, columns=self.departures)
+
+
+def departure_range(
+    start: datetime, end: datetime, interval: timedelta = timedelta(minutes=15)
+) -> List[datetime]:
+    """
+    Return departure times from ``start`` until before ``end``.
+
+    :param start: The first departure time.
+    :param end: The end of the range, excluded.
+    :param interval: The time between departures, by default 15 minutes, i.e. 96 departures
+        per day.
+    :return: A list of :class:`datetime.datetime` objects.
+    :raises ValueError: If ``interval`` is not positive.
+    """
+    if interval <= timedelta(0):
+        raise ValueError("interval must be positive.")
+    departures = []
+    departure = start
+    while departure < end:
+        departures.append(departure)
+        departure += interval
+    return departures
+
+
+#: Exceptions of a single request, kept as the error of its pair instead of aborting a batch.
+REQUEST_ERRORS = (
+    ApiError,
+    CircuitOpenException,
+    DeadlineExceededException,
+    TooManyRequestsException,
+    requests.RequestException,
+)
+
+
+def error_message(exc: Exception) -> str:
+    """Return the reason of a failed route, the status of the response of an ``ApiError``."""
+    resp = exc.args[0] if exc.args else None
+    if isinstance(resp, requests.Response):
+        return f"{resp.status_code} {resp.reason}"
+    return f"{type(exc).__name__}: {exc}"
+
+
+def pair_array(
+    pairs: Any = None,
+    origins: Optional[Sequence] = None,
+    destinations: Optional[Sequence] = None,
+) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Return origin and destination coordinates as an array of shape ``(n, 4)``.
+
+    :param pairs: A DataFrame with the :data:`PAIR_COLUMNS`, or a sequence of pairs of
+        ``[lat, lng]`` origins and destinations.
+    :param origins: A sequence or array of ``[lat, lng]`` origins, used with
+        ``destinations`` instead of ``pairs``.
+    :param destinations: A sequence or array of ``[lat, lng]`` destinations.
+    :return: A tuple of the array and the index of the result table.
+    :raises ValueError: If the input is missing or has an invalid shape.
+    """
+    if isinstance(pairs, pd.DataFrame):
+        return pairs[list(PAIR_COLUMNS)].to_numpy(dtype="float64"), pairs.index
+    if pairs is not None:
+        array = np.asarray(pairs, dtype="float64").reshape(-1, 4)
+    elif origins is not None and destinations is not None:
+        origin_array = np.asarray(origins, dtype="float64").reshape(-1, 2)
+        destination_array = np.asarray(destinations, dtype="float64").reshape(-1, 2)
+        if len(origin_array) != len(destination_array):
+            raise ValueError("origins and destinations must have the same length.")
+        array = np.hstack([origin_array, destination_array])
+    else:
+        raise ValueError("Either pairs or origins and destinations are required.")
+    return array, pd.RangeIndex(len(array))
+
+
+def route_summary(data: Dict[str, Any], geometry: bool = False) -> Dict[str, Any]:
+    """
+    Return the summary of the first route of a routing response.
+
+    :param data: The JSON of a routing response.
+    :param geometry: If True, the summary has a :class:`LazyGeometry` ``geometry``.
+    :return: A dict with the keys of :data:`SUMMARY_DTYPES`.
+    """
+    summary: Dict[str, Any] = dict.fromkeys(SUMMARY_DTYPES)
+    routes = data.get("routes") or []
+    if not routes:
+        notices = data.get("notices") or [{}]
+        summary["error"] = notices[0].get("title", "No route found")
+        return summary
+    sections = routes[0].get("sections") or []
+    duration = base_duration = length = 0.0
+    tolls: Optional[float] = None
+    for section in sections:
+        section_summary = section.get("travelSummary") or section.get("summary") or {}
+        duration += section_summary.get("duration", 0)
+        base_duration += section_summary.get("baseDuration", section_summary.get("duration", 0))
+        length += section_summary.get("length", 0)
+        for toll in section.get("tolls") or []:
+            fares = toll.get("fares") or []
+            if fares:
+                tolls = (tolls or 0.0) + fares[0].get("price", {}).get("value", 0.0)
+    summary.update(
+        duration=duration,
+        base_duration=base_duration,
+        length=length,
+        tolls=tolls,
+        sections=len(sections),
+    )
+    if geometry:
+        summary["geometry"] = LazyGeometry(
+            [section["polyline"] for section in sections if "polyline" in section]
+        )
+    return summary
+
+
+def summary_frame(
+    summaries: List[Optional[Dict[str, Any]]], codes: np.ndarray, index: pd.Index, geometry: bool
+) -> pd.DataFrame:
+    """
+    Broadcast the summaries of unique pairs to a typed table of all pairs.
+
+    :param summaries: The summaries of the unique pairs.
+    :param codes: The position of the unique pair of each row.
+    :param index: The index of the table.
+    :param geometry: If True, the table has a ``geometry`` column.
+    :return: A DataFrame.
+    """
+    rows = [s or {} for s in summaries] + [{}]
+    positions = np.where(codes < 0, len(summaries), codes)
+    frame = pd.DataFrame(
+        {
+            name: pd.Series([row.get(name) for row in rows], dtype=dtype)
+            .take(positions)
+            .to_numpy()
+            for name, dtype in SUMMARY_DTYPES.items()
+        },
+        index=index,
+    ).astype(SUMMARY_DTYPES)
+    if geometry:
+        frame["geometry"] = pd.Series(
+            [rows[position].get("geometry") for position in positions], index=index, dtype=object
+        )
+    return frame
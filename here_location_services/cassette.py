@@ -0,0 +1,323 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains transports to record and replay HTTP traffic.
+
+A :class:`RecordingTransport` sends requests like a :class:`Transport
+<here_location_services.transport.Transport>` and captures every request and response pair
+in a :class:`Cassette`. A :class:`ReplayTransport` answers requests from a cassette without
+any network access, optionally with the recorded or a fixed latency. Both can be passed to
+:class:`LS <here_location_services.ls.LS>`, so that offline runs, CI jobs and capacity tests
+see exactly the traffic recorded in production.
+
+Cassettes are stored as JSON lines, compressed with gzip if the path ends with ``.gz``.
+Request headers, including the ``Authorization`` header, are not recorded. API keys and
+tokens in URLs and tokens and secrets in responses, e.g. the ``access_token`` of the HERE
+OAuth token response, are not recorded either.
+
+Example::
+
+    transport = RecordingTransport("traffic.jsonl.gz")
+    ls = LS(api_key=api_key, transport=transport)
+    ls.geocode("Berlin")
+    transport.close()
+
+    ls = LS(api_key="dummy", transport=ReplayTransport("traffic.jsonl.gz", latency="recorded"))
+    ls.geocode("Berlin")
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import re
+import time
+from datetime import timedelta
+from typing import IO, Any, Dict, List, Optional, Tuple, Union, cast
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from here_location_services.exceptions import CassetteMissException
+from here_location_services.transport import DEFAULT_POOL_MAXSIZE, Transport
+
+#: Query parameters which are not recorded, compared case-insensitively.
+SECRET_PARAMS = ("apikey",)
+
+#: Pattern of the names of query parameters and of response fields at any depth which
+#: hold secrets, e.g. ``access_token``, ``refresh_token`` or ``client_secret``.
+SECRET_NAMES = re.compile(r"(token|secret)$", re.IGNORECASE)
+
+#: Response headers which are recorded.
+RECORDED_HEADERS = ("Content-Type", "Location", "Retry-After")
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return cast(IO[str], gzip.open(path, mode + "t", encoding="utf-8"))
+    return open(path, mode, encoding="utf-8")
+
+
+def normalize_url(url: str, params: Optional[Dict] = None) -> str:
+    """
+    Return ``url`` with ``params`` merged into a sorted query without secrets.
+
+    :param url: A string to represent URL.
+    :param params: An optional dict for query params.
+    :return: A string.
+    """
+    url = requests.Request("GET", url, params=params).prepare().url or url
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if not _is_secret_param(k))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _is_secret_param(name: str) -> bool:
+    return name.lower() in SECRET_PARAMS or SECRET_NAMES.search(name) is not None
+
+
+def redact(data: Any) -> Tuple[Any, bool]:
+    """
+    Return ``data`` with the values of secret fields replaced by ``redacted``.
+
+    :param data: A decoded JSON document.
+    :return: A tuple of the redacted document and whether anything was redacted.
+    """
+    if isinstance(data, dict):
+        result, changed = {}, False
+        for key, value in data.items():
+            if isinstance(key, str) and SECRET_NAMES.search(key) and isinstance(value, str):
+                result[key], changed = "redacted", True
+            else:
+                result[key], redacted = redact(value)
+                changed = changed or redacted
+        return result, changed
+    if isinstance(data, list):
+        items = [redact(item) for item in data]
+        return [item for item, _ in items], any(redacted for _, redacted in items)
+    return data, False
+
+
+def body_digest(kwargs: Dict) -> Optional[str]:
+    """
+    Return a digest of the body of a request sent with ``kwargs``.
+
+    :param kwargs: Arguments that :meth:`requests.Session.request` takes.
+    :return: A hex string or None if the request has no body.
+    """
+    if kwargs.get("json") is not None:
+        body = json.dumps(kwargs["json"], sort_keys=True, default=str).encode()
+    elif kwargs.get("data") is not None:
+        data = kwargs["data"]
+        body = data if isinstance(data, bytes) else str(data).encode()
+    else:
+        return None
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+class Cassette:
+    """Recorded request and response pairs."""
+
+    def __init__(self, interactions: Optional[List[Dict]] = None) -> None:
+        """
+        Instantiate the cassette.
+
+        :param interactions: Optional recorded interactions, dicts as created by
+            :meth:`interaction`.
+        """
+        self.interactions: List[Dict] = list(interactions or [])
+
+    def __len__(self):
+        return len(self.interactions)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """
+        Load a cassette from a file.
+
+        :param path: The path of the file.
+        :return: :class:`Cassette` object.
+        """
+        with _open(path, "r") as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def save(self, path: str):
+        """
+        Write the cassette to a file.
+
+        :param path: The path of the file, compressed with gzip if it ends with ``.gz``.
+        """
+        with _open(path, "w") as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+
+    @staticmethod
+    def interaction(method: str, url: str, kwargs: Dict, resp: requests.Response) -> Dict:
+        """
+        Return a recordable interaction of a request and its response.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param kwargs: Arguments that :meth:`requests.Session.request` takes.
+        :param resp: The response of the request.
+        :return: A dict.
+        """
+        content = resp.content or b""
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        data, redacted = redact(data)
+        if redacted:
+            content = json.dumps(data).encode()
+        interaction = {
+            "method": method,
+            "url": normalize_url(url, kwargs.get("params")),
+            "body": body_digest(kwargs),
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "headers": {k: resp.headers[k] for k in RECORDED_HEADERS if k in resp.headers},
+            "elapsed": resp.elapsed.total_seconds(),
+        }
+        try:
+            interaction["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction["base64"] = base64.b64encode(content).decode()
+        return interaction
+
+    @staticmethod
+    def response(interaction: Dict) -> requests.Response:
+        """
+        Return a response built from a recorded interaction.
+
+        :param interaction: A dict as created by :meth:`interaction`.
+        :return: :class:`requests.Response` object.
+        """
+        resp = requests.Response()
+        resp.status_code = interaction["status"]
+        resp.reason = interaction.get("reason") or ""
+        resp.url = interaction["url"]
+        resp.headers = CaseInsensitiveDict(interaction.get("headers") or {})
+        resp.elapsed = timedelta(seconds=interaction.get("elapsed") or 0.0)
+        if "base64" in interaction:
+            resp._content = base64.b64decode(interaction["base64"])
+        else:
+            resp._content = interaction.get("text", "").encode("utf-8")
+        resp._content_consumed = True  # type: ignore[attr-defined]
+        resp.encoding = "utf-8"
+        return resp
+
+
+class RecordingTransport(Transport):
+    """A transport recording all request and response pairs to a cassette file."""
+
+    def __init__(
+        self,
+        path: str,
+        pool_connections: int = 10,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        base_url: Optional[str] = None,
+    ):
+        """
+        Instantiate the transport.
+
+        :param path: The path of the cassette file, written by :meth:`save` and :meth:`close`.
+        :param pool_connections: Number of hosts to keep connection pools for.
+        :param pool_maxsize: Maximum number of connections kept open per host.
+        :param base_url: An optional URL replacing scheme and host of all request URLs.
+        """
+        super().__init__(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, base_url=base_url
+        )
+        self.path = path
+        self.cassette = Cassette()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send HTTP request and record it with its response.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param kwargs: Optional arguments that :meth:`requests.Session.request` takes.
+        :return: :class:`requests.Response` object.
+        """
+        resp = super().request(method, url, **kwargs)
+        interaction = Cassette.interaction(method, url, kwargs, resp)
+        with self._lock:
+            self.cassette.interactions.append(interaction)
+        return resp
+
+    def save(self):
+        """Write the recorded interactions to the cassette file."""
+        with self._lock:
+            cassette = Cassette(self.cassette.interactions)
+        cassette.save(self.path)
+
+    def close(self):
+        """Write the cassette file and close all pooled connections."""
+        self.save()
+        super().close()
+
+
+class ReplayTransport(Transport):
+    """A transport answering requests from a cassette without network access.
+
+    Requests are matched by method, URL with query and body. Repeated identical requests are
+    answered with the recorded responses in order, starting over after the last one, e.g.
+    to replay the polling of an async job again and again.
+    """
+
+    def __init__(
+        self,
+        cassette: Union[str, Cassette],
+        latency: Union[float, str] = 0.0,
+        speed: float = 1.0,
+    ):
+        """
+        Instantiate the transport.
+
+        :param cassette: A :class:`Cassette` or the path of a cassette file.
+        :param latency: Seconds to wait before answering each request, or ``recorded`` to
+            wait as long as the recorded request took.
+        :param speed: Factor dividing the latency, e.g. ``2.0`` to replay twice as fast.
+        :raises ValueError: If ``latency`` is neither a number nor ``recorded``.
+        """
+        super().__init__()
+        if not isinstance(latency, (int, float)) and latency != "recorded":
+            raise ValueError("latency must be a number of seconds or 'recorded'.")
+        self.cassette = Cassette.load(cassette) if isinstance(cassette, str) else cassette
+        self.latency = latency
+        self.speed = speed
+        self._responses: Dict[Tuple[str, str, Optional[str]], List[Dict]] = {}
+        for interaction in self.cassette.interactions:
+            key = (interaction["method"], interaction["url"], interaction["body"])
+            self._responses.setdefault(key, []).append(interaction)
+        self._served: Dict[Tuple[str, str, Optional[str]], int] = {}
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Answer HTTP request with the next recorded response.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param kwargs: Optional arguments that :meth:`requests.Session.request` takes.
+        :return: :class:`requests.Response` object.
+        :raises CassetteMissException: If no response of the request was recorded.
+        """
+        key = (method, normalize_url(url, kwargs.get("params")), body_digest(kwargs))
+        recorded = self._responses.get(key)
+        if not recorded:
+            raise CassetteMissException(method, key[1])
+        with self._lock:
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        interaction = recorded[served % len(recorded)]
+        if self.latency == "recorded":
+            delay = interaction.get("elapsed") or 0.0
+        else:
+            delay = float(self.latency)
+        if delay > 0:
+            time.sleep(delay / self.speed)
+        return Cassette.response(interaction)
@@ -0,0 +1,221 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the :class:`CircuitBreaker` class to fail fast on degraded endpoints.
+
+A circuit is kept per host, e.g. ``router.hereapi.com`` or ``isoline.router.hereapi.com``.
+A circuit opens when the ratio of failed requests within a time window reaches a threshold.
+Requests to a host with an open circuit fail immediately with
+:class:`CircuitOpenException <here_location_services.exceptions.CircuitOpenException>`.
+After ``reset_timeout`` seconds the circuit is half-open and lets a limited number of probe
+requests through: it closes if they succeed and opens again if they fail.
+
+Connection errors, timeouts and responses with a status code of 500 or above are failures.
+"""
+
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Deque, Dict, Tuple
+from urllib.parse import urlsplit
+
+from here_location_services.exceptions import CircuitOpenException
+
+#: State of a circuit letting all requests through.
+CLOSED = "closed"
+#: State of a circuit failing all requests fast.
+OPEN = "open"
+#: State of a circuit letting probe requests through.
+HALF_OPEN = "half_open"
+
+
+class _Circuit:
+    """The state of the circuit of a single host."""
+
+    def __init__(self) -> None:
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        self.outcomes: Deque[Tuple[float, bool]] = deque()
+        self.opened = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """A per host circuit breaker shared by all APIs of an :class:`LS` instance."""
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_requests: int = 20,
+        window: float = 60,
+        reset_timeout: float = 30,
+        half_open_probes: int = 1,
+    ):
+        """
+        Instantiate the circuit breaker.
+
+        :param failure_rate: The ratio of failed requests within ``window`` which opens a
+            circuit.
+        :param min_requests: Minimum number of requests within ``window`` before a circuit
+            can open.
+        :param window: The time window in seconds over which failures are counted.
+        :param reset_timeout: Seconds an open circuit fails fast before it gets half-open.
+        :param half_open_probes: Maximum number of concurrent probe requests of a half-open
+            circuit.
+        """
+        if not 0 < failure_rate <= 1:
+            raise ValueError("failure_rate must be in range 0 to 1.")
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+        _breakers.add(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_circuits={}, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        _breakers.add(self)
+
+    def _after_fork(self):
+        # The probes in flight of other threads do not exist in a forked child process.
+        self._lock = threading.Lock()
+        for circuit in self._circuits.values():
+            circuit.probes = 0
+
+    @staticmethod
+    def host(url: str) -> str:
+        """Return the host of ``url`` whose circuit is used for the request."""
+        return urlsplit(url).netloc
+
+    def _circuit(self, host: str) -> _Circuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit()
+        return circuit
+
+    def _update(self, circuit: _Circuit, now: float):
+        if circuit.state == OPEN and now - circuit.opened_at >= self.reset_timeout:
+            circuit.state = HALF_OPEN
+            circuit.probes = 0
+        while circuit.outcomes and circuit.outcomes[0][0] < now - self.window:
+            circuit.outcomes.popleft()
+
+    def _open(self, circuit: _Circuit, now: float):
+        circuit.state = OPEN
+        circuit.opened_at = now
+        circuit.opened += 1
+        circuit.outcomes.clear()
+
+    def before_request(self, host: str):
+        """
+        Check whether a request to ``host`` may be sent.
+
+        :param host: The host of the request.
+        :raises CircuitOpenException: If the circuit of ``host`` is open or all probes of
+            the half-open circuit are in flight.
+        """
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(host)
+            self._update(circuit, now)
+            if circuit.state == CLOSED:
+                return
+            if circuit.state == HALF_OPEN and circuit.probes < self.half_open_probes:
+                circuit.probes += 1
+                return
+            circuit.rejected += 1
+            retry_after = max(0.0, circuit.opened_at + self.reset_timeout - now)
+        raise CircuitOpenException(host, retry_after)
+
+    def release(self, host: str):
+        """
+        Release the probe of a half-open circuit without recording an outcome.
+
+        Called when a request allowed by :meth:`before_request` failed for a reason other
+        than the host, e.g. a hook or a missing cassette, so that the probe can be retried.
+
+        :param host: The host of the request.
+        """
+        with self._lock:
+            circuit = self._circuit(host)
+            if circuit.state == HALF_OPEN and circuit.probes > 0:
+                circuit.probes -= 1
+
+    def record(self, host: str, success: bool):
+        """
+        Record the outcome of a request to ``host``.
+
+        :param host: The host of the request.
+        :param success: False if the request failed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(host)
+            self._update(circuit, now)
+            if circuit.state == HALF_OPEN:
+                if success:
+                    circuit.state = CLOSED
+                else:
+                    self._open(circuit, now)
+                return
+            if circuit.state == OPEN:
+                return
+            circuit.outcomes.append((now, success))
+            total = len(circuit.outcomes)
+            failures = sum(1 for _, ok in circuit.outcomes if not ok)
+            if total >= self.min_requests and failures >= self.failure_rate * total:
+                self._open(circuit, now)
+
+    def state(self, host: str) -> str:
+        """Return the state of the circuit of ``host``, one of ``closed``, ``open`` or
+        ``half_open``."""
+        with self._lock:
+            circuit = self._circuit(host)
+            self._update(circuit, time.monotonic())
+            return circuit.state
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Return the state of the circuits of all hosts for monitoring.
+
+        :return: A dict mapping hosts to dicts with the ``state``, the numbers of
+            ``requests`` and ``failures`` within the window and the total numbers of times
+            the circuit ``opened`` and of ``rejected`` requests.
+        """
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for host, circuit in self._circuits.items():
+                self._update(circuit, now)
+                result[host] = {
+                    "state": circuit.state,
+                    "requests": len(circuit.outcomes),
+                    "failures": sum(1 for _, ok in circuit.outcomes if not ok),
+                    "opened": circuit.opened,
+                    "rejected": circuit.rejected,
+                }
+        return result
+
+
+_breakers: "weakref.WeakSet[CircuitBreaker]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for breaker in list(_breakers):
+        breaker._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
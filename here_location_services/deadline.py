@@ -0,0 +1,194 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the :class:`Deadline` class to bound the total time spent in API calls.
+
+A deadline is activated with a ``with`` statement. Every HTTP request sent within the block,
+including async job polling of :meth:`LS.matrix <here_location_services.ls.LS.matrix>` and
+:meth:`LS.solve_tour_planning <here_location_services.ls.LS.solve_tour_planning>`, gets its
+connect and read timeouts capped by the remaining time of the deadline and fails with
+:class:`DeadlineExceededException <here_location_services.exceptions.DeadlineExceededException>`
+once the deadline has expired.
+
+The deadline is held in a context variable. The bulk methods of
+:class:`LS <here_location_services.ls.LS>` run their requests in copies of the caller's
+context, so the deadline also bounds the requests sent from their worker threads. Every
+method of :class:`LS <here_location_services.ls.LS>` sending requests also accepts a
+``deadline`` keyword argument in seconds, a shorthand for a deadline around the call, and a
+``timeout`` keyword argument overriding the connect and read timeouts of its requests, like
+a :func:`request_timeout` block. A timeout of ``None`` disables the timeouts.
+
+Example::
+
+    with Deadline(5):
+        ls.geocode(query="200 S Mathilda Sunnyvale CA")
+
+    ls.route_many(pairs, deadline=600, timeout=(3.05, 30))
+
+    with request_timeout(None):
+        ls.routing_api.route(...)
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple, Union
+
+from here_location_services.exceptions import DeadlineExceededException
+
+#: Type of the ``timeout`` argument, either a single value for connect and read timeouts or a
+#: tuple of connect and read timeouts in seconds, as accepted by :mod:`requests`.
+Timeout = Optional[Union[float, Tuple[Optional[float], Optional[float]]]]
+
+#: Default connect and read timeouts in seconds of all requests.
+DEFAULT_TIMEOUT: Timeout = (10.0, 120.0)
+
+
+class _Unset:
+    """Type of :data:`UNSET`."""
+
+    def __repr__(self):
+        return "UNSET"
+
+
+#: Default of ``timeout`` arguments of single requests, to use the timeout of the active
+#: :func:`request_timeout` block or of the instance, as ``None`` disables the timeouts.
+UNSET = _Unset()
+
+#: Type of ``timeout`` arguments of single requests.
+TimeoutArg = Union[Timeout, _Unset]
+
+_current_timeout: ContextVar[TimeoutArg] = ContextVar(
+    "here_location_services_timeout", default=UNSET
+)
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar(
+    "here_location_services_deadline", default=None
+)
+
+
+class Deadline:
+    """An end-to-end time budget for all requests sent within a ``with`` block.
+
+    Deadlines can be nested, the earliest of the nested deadlines is effective.
+    """
+
+    def __init__(self, seconds: float):
+        """
+        Instantiate a deadline which expires ``seconds`` from now.
+
+        :param seconds: The time budget in seconds.
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._parent: Optional[Deadline] = None
+        self._tokens: List = []
+
+    def remaining(self) -> float:
+        """Return the remaining time in seconds, ``0`` if the deadline has expired."""
+        remaining = max(0.0, self.expires_at - time.monotonic())
+        if self._parent is not None:
+            remaining = min(remaining, self._parent.remaining())
+        return remaining
+
+    @property
+    def expired(self) -> bool:
+        """Return True if the deadline has expired."""
+        return self.remaining() <= 0
+
+    def check(self):
+        """
+        Raise if the deadline has expired.
+
+        :raises DeadlineExceededException: If the deadline has expired.
+        """
+        if self.expired:
+            raise DeadlineExceededException(self.seconds)
+
+    def cap(self, timeout: Timeout) -> Timeout:
+        """Return ``timeout`` with connect and read timeouts capped by the remaining time.
+
+        :param timeout: A timeout as accepted by :mod:`requests`.
+        :return: The capped timeout.
+        """
+        remaining = self.remaining()
+        if timeout is None:
+            return (remaining, remaining)
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return (
+                remaining if connect is None else min(connect, remaining),
+                remaining if read is None else min(read, remaining),
+            )
+        return min(timeout, remaining)
+
+    def __enter__(self) -> "Deadline":
+        parent = _current_deadline.get()
+        self._parent = parent if parent is not self else None
+        self._tokens.append(_current_deadline.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current_deadline.reset(self._tokens.pop())
+        self._parent = None
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline active in the current context, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def request_timeout(timeout: TimeoutArg) -> Iterator[None]:
+    """Override the connect and read timeouts of all requests sent within a ``with`` block.
+
+    Like deadlines, the timeout also applies to the requests sent from the worker threads of
+    bulk methods.
+
+    :param timeout: Connect and read timeouts in seconds, either a float or a tuple of two
+        floats, None to disable the timeouts or :data:`UNSET` to keep the current timeouts.
+    """
+    if isinstance(timeout, _Unset):
+        yield
+        return
+    token = _current_timeout.set(timeout)
+    try:
+        yield
+    finally:
+        _current_timeout.reset(token)
+
+
+def resolve_timeout(timeout: TimeoutArg, default: Timeout) -> Timeout:
+    """Return the timeout for a request, capped by the active deadline.
+
+    :param timeout: The timeout of the request, :data:`UNSET` to use the timeout of the
+        active :func:`request_timeout` block or ``default``.
+    :param default: The configured timeout of the instance.
+    :return: The timeout to pass to :mod:`requests`.
+    :raises DeadlineExceededException: If the active deadline has expired.
+    """
+    if isinstance(timeout, _Unset):
+        timeout = _current_timeout.get()
+    if isinstance(timeout, _Unset):
+        timeout = default
+    deadline = current_deadline()
+    if deadline is None:
+        return timeout
+    deadline.check()
+    return deadline.cap(timeout)
+
+
+def wait(seconds: float):
+    """Sleep for ``seconds`` but not beyond the active deadline.
+
+    :param seconds: Time to sleep in seconds.
+    :raises DeadlineExceededException: If the active deadline expires.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        time.sleep(seconds)
+        return
+    deadline.check()
+    time.sleep(min(seconds, deadline.remaining()))
+    deadline.check()
@@ -13,7 +13,9 @@ from geojson import Feature, FeatureCollection, LineString, Point
 from here_location_services.platform.auth import Auth
 
 from .apis import Api
+from .deadline import DEFAULT_TIMEOUT, Timeout
 from .exceptions import ApiError
+from .transport import Transport
 
 
 class DestinationWeatherApi(Api):
@@ -25,8 +27,17 @@ class DestinationWeatherApi(Api):
         auth: Optional[Auth] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
-        super().__init__(api_key, auth=auth, proxies=proxies, country=country)
+        super().__init__(
+            api_key,
+            auth=auth,
+            proxies=proxies,
+            country=country,
+            timeout=timeout,
+            transport=transport,
+        )
         self._base_url = f"https://weather.{self._get_url_string()}"
 
     def get_dest_weather(
@@ -89,3 +89,72 @@ class TooManyRequestsException(Exception):
             reason=self.resp.reason,
             body=self.resp.text,
         )
+
+
+class DeadlineExceededException(Exception):
+    """
+    This ``DeadlineExceededException`` is raised when the time budget of a
+    :class:`Deadline <here_location_services.deadline.Deadline>` is exhausted.
+    """
+
+    def __str__(self) -> str:
+        """
+        Return the message to be raised for this exception.
+
+        :return: error message
+        """
+        return f"Deadline of {self.args[0]} seconds exceeded."
+
+
+class CircuitOpenException(Exception):
+    """
+    This ``CircuitOpenException`` is raised without sending a request when the
+    :class:`CircuitBreaker <here_location_services.circuit_breaker.CircuitBreaker>`
+    of the requested host is open.
+
+    The exception values are the host and the number of seconds until the next probe.
+    """
+
+    def __str__(self) -> str:
+        """
+        Return the message to be raised for this exception.
+
+        :return: error message
+        """
+        return f"Circuit for {self.args[0]} is open, retry in {self.args[1]:.1f} seconds."
+
+
+class CassetteMissException(Exception):
+    """
+    This ``CassetteMissException`` is raised by a
+    :class:`ReplayTransport <here_location_services.cassette.ReplayTransport>` for requests
+    without a recorded response.
+
+    The exception values are the HTTP method and the normalized URL of the request.
+    """
+
+    def __str__(self) -> str:
+        """
+        Return the message to be raised for this exception.
+
+        :return: error message
+        """
+        return f"No recorded response for {self.args[0]} {self.args[1]}."
+
+
+class BatchLimitExceededException(Exception):
+    """
+    This ``BatchLimitExceededException`` is raised without sending a request when the
+    estimated transactions of a bulk call exceed the ``batch_limit`` of the
+    :class:`Ledger <here_location_services.accounting.Ledger>` attached to the client.
+
+    The exception values are the estimated transactions and the limit.
+    """
+
+    def __str__(self) -> str:
+        """
+        Return the message to be raised for this exception.
+
+        :return: error message
+        """
+        return f"Estimated {self.args[0]} transactions exceed the batch limit of {self.args[1]}."
@@ -11,7 +11,9 @@ import requests
 from here_location_services.platform.auth import Auth
 
 from .apis import Api
+from .deadline import DEFAULT_TIMEOUT, Timeout
 from .exceptions import ApiError
+from .transport import Transport
 
 
 class GeocodingSearchApi(Api):
@@ -23,8 +25,17 @@ class GeocodingSearchApi(Api):
         auth: Optional[Auth] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
-        super().__init__(api_key, auth=auth, proxies=proxies, country=country)
+        super().__init__(
+            api_key,
+            auth=auth,
+            proxies=proxies,
+            country=country,
+            timeout=timeout,
+            transport=transport,
+        )
         self._base_url = "https://{0}.search.{1}"
 
     def get_geocoding(self, query: str, limit: int = 20, lang: str = "en-US") -> requests.Response:
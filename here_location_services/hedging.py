@@ -0,0 +1,196 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the :class:`HedgingPolicy` class to send hedged GET requests.
+
+If a GET request has not completed after a delay, a duplicate request is sent from a thread
+pool and the response arriving first is used. The delay is either fixed or derived from a
+percentile of the observed latencies. A budget caps the share of duplicate requests, so
+hedging never adds more than a configured percentage of extra traffic.
+
+The delay counts from the moment the original request starts, so requests waiting for a
+thread of a saturated pool are not hedged for that reason. Requests can not be aborted once
+sent, the response of the losing request is closed as soon as it arrives to release its
+connection.
+
+Example::
+
+    ls = LS(api_key=api_key, hedging=HedgingPolicy(percentile=95, budget=0.05))
+    ls.autosuggest(query="res", limit=5, at=["-13.163068,-72.545128"])
+"""
+
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Optional
+
+import requests
+
+from here_location_services.utils import submit_in_context
+
+
+class HedgingPolicy:
+    """An opt-in policy to hedge slow GET requests."""
+
+    def __init__(
+        self,
+        delay: Optional[float] = None,
+        percentile: float = 95,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        window: int = 500,
+        max_workers: int = 32,
+    ):
+        """
+        Instantiate the policy.
+
+        :param delay: A fixed delay in seconds after which a duplicate request is sent. If
+            None, the delay is the ``percentile`` of the latencies of recent requests.
+        :param percentile: The percentile of latencies used as delay if no ``delay`` is given.
+        :param budget: The maximum ratio of duplicate requests to all requests, e.g. ``0.05``
+            for at most 5% extra traffic.
+        :param min_samples: Minimum number of observed latencies before hedging with a delay
+            derived from the ``percentile``.
+        :param window: Number of recent latencies to derive the delay from.
+        :param max_workers: Maximum number of threads sending hedged requests.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be in range 0 to 100.")
+        if budget < 0:
+            raise ValueError("budget must not be negative.")
+        self.fixed_delay = delay
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._latencies: Deque[float] = deque(maxlen=window)
+        #: Number of requests sent through the policy.
+        self.requests = 0
+        #: Number of duplicate requests sent.
+        self.hedged = 0
+        #: Number of duplicate requests which completed first.
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        _policies.add(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_lock=None, _executor=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        _policies.add(self)
+
+    def _after_fork(self):
+        # The threads of the executor do not exist in a forked child process.
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def delay(self) -> Optional[float]:
+        """Return the current hedging delay in seconds, None if there are too few samples."""
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))]
+
+    def _observe(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _acquire_hedge(self) -> bool:
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def _submit(self, fn: Callable[[], Any]) -> Future:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="hls-hedge"
+                    )
+        # Each attempt runs in a copy of the caller's context to keep its deadline.
+        return submit_in_context(self._executor, fn)
+
+    def _timed(self, fn: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        result = fn()
+        self._observe(time.monotonic() - start)
+        return result
+
+    def run(self, fn: Callable[[], Any], on_hedge: Optional[Callable[[], None]] = None) -> Any:
+        """
+        Call ``fn`` and call it a second time if it has not completed after the delay.
+
+        Both calls run in the thread pool of the policy and the first successful result is
+        returned. The delay counts from the start of the original call, so time spent
+        waiting for a thread of a saturated pool does not trigger a duplicate call.
+
+        :param fn: A function sending a request and returning a :class:`requests.Response`.
+        :param on_hedge: An optional function called before ``fn`` is called a second time.
+        :return: The first successful result, or the error of the original request if
+            all requests failed.
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.delay
+        if delay is None:
+            return self._timed(fn)
+        started = threading.Event()
+
+        def original():
+            started.set()
+            return self._timed(fn)
+
+        primary = self._submit(original)
+        started.wait()
+        if wait([primary], timeout=delay).done or not self._acquire_hedge():
+            return primary.result()
+        if on_hedge is not None:
+            on_hedge()
+        hedge = self._submit(lambda: self._timed(fn))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is not None:
+                for loser in (done | pending) - {winner}:
+                    loser.cancel()
+                    loser.add_done_callback(_close_response)
+                if winner is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return winner.result()
+        return primary.result()
+
+
+def _close_response(future: Future):
+    if not future.cancelled() and future.exception() is None:
+        resp = future.result()
+        if isinstance(resp, requests.Response):
+            resp.close()
+
+
+_policies: "weakref.WeakSet[HedgingPolicy]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for policy in list(_policies):
+        policy._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,455 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the request lifecycle hooks of the Location Services API clients.
+
+Callbacks can be registered for four events on :attr:`LS.hooks <here_location_services.ls.LS>`
+to observe the requests of all APIs, or on the ``hooks`` of a single API, e.g.
+``ls.routing_api.hooks``:
+
+* ``on_request``: Before a request is sent.
+* ``on_response``: After a response has been received. For requests sent by methods of
+  :class:`LS <here_location_services.ls.LS>` the event is emitted once the method has parsed
+  the JSON body and built the response object, so that their timings are included. Responses
+  which are not decoded are emitted when the next request of the same thread is sent or when
+  the method returns, whatever comes first.
+* ``on_retry``: When a request is sent again, e.g. a duplicate request sent by a
+  :class:`HedgingPolicy <here_location_services.hedging.HedgingPolicy>`.
+* ``on_error``: When a request failed without response, e.g. on a connection error.
+
+Each callback is called with a :class:`RequestEvent`. Exceptions raised by callbacks
+propagate to the caller.
+
+Example::
+
+    ls = LS(api_key=api_key, latency_histograms=True)
+
+    @ls.hooks.on_response
+    def log(event):
+        print(event.operation, event.endpoint, event.status_code, event.timings["total"])
+
+    ls.geocode("Berlin")
+    ls.histograms.summary()["geocode"]["total"]["p95"]
+"""
+
+import bisect
+import functools
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from here_location_services.deadline import UNSET, Deadline, TimeoutArg, request_timeout
+
+#: Names of the events callbacks can be registered for.
+EVENTS = ("on_request", "on_response", "on_retry", "on_error")
+
+#: Names of the timing phases of a request. ``dns``, ``connect`` and ``tls`` are ``None``
+#: as they are not exposed by :mod:`requests`, they are included in ``ttfb``.
+PHASES = ("dns", "connect", "tls", "ttfb", "download", "json_parse", "build", "total")
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{16,})$")
+_VERSION_SEGMENT = re.compile(r"^v\d+$")
+
+
+def url_template(url: str) -> str:
+    """
+    Return ``url`` without query and with identifiers in the path replaced by ``{id}``.
+
+    :param url: A string to represent URL.
+    :return: A string, e.g. ``https://matrix.router.hereapi.com/v8/matrix/{id}/status``.
+    """
+    parts = urlsplit(url)
+    segments = ["{id}" if _ID_SEGMENT.match(s) else s for s in parts.path.split("/")]
+    return f"{parts.scheme}://{parts.netloc}{'/'.join(segments)}"
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Return the name of the endpoint of ``url`` from the segments of its path.
+
+    :param url: A string to represent URL.
+    :return: A string, e.g. ``geocode`` or ``matrix.status``.
+    """
+    segments = [
+        s
+        for s in urlsplit(url).path.split("/")
+        if s and not _ID_SEGMENT.match(s) and not _VERSION_SEGMENT.match(s)
+    ]
+    return ".".join(segments) or urlsplit(url).netloc
+
+
+class RequestEvent:
+    """The lifecycle event of a single HTTP request."""
+
+    def __init__(
+        self, method: str, url: str, endpoint: Optional[str] = None, body: Optional[Dict] = None
+    ):
+        """
+        Instantiate the event.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: The URL of the request without query params.
+        :param endpoint: The name of the endpoint, derived from ``url`` if not given.
+        :param body: The optional JSON body of the request. It must not be modified.
+        """
+        self.method = method
+        self.url = url
+        self.body = body
+        self.url_template = url_template(url)
+        self.endpoint = endpoint or endpoint_name(url)
+        op = _operation.get()
+        #: Name of the :class:`LS <here_location_services.ls.LS>` method sending the request,
+        #: None for requests sent directly through an API.
+        self.operation = op.name if op is not None else None
+        self.status_code: Optional[int] = None
+        self.bytes_sent = 0
+        self.bytes_received: Optional[int] = None
+        self.error: Optional[BaseException] = None
+        #: Duration in seconds of each of the :data:`PHASES`, None if not measured.
+        self.timings: Dict[str, Optional[float]] = dict.fromkeys(PHASES)
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+
+    def __repr__(self):
+        return (
+            f"RequestEvent({self.method} {self.url_template}, endpoint={self.endpoint!r}, "
+            f"status_code={self.status_code}, total={self.timings['total']})"
+        )
+
+    def _record_response(self, resp: requests.Response):
+        """Record status, sizes and network timings of ``resp``."""
+        elapsed = time.perf_counter() - self._start
+        self.status_code = resp.status_code
+        request = getattr(resp, "request", None)
+        body = getattr(request, "body", None)
+        self.bytes_sent = len(body) if body else 0
+        if getattr(resp, "_content_consumed", False) and resp._content is not None:
+            self.bytes_received = len(resp._content)
+        elif "Content-Length" in getattr(resp, "headers", {}):
+            self.bytes_received = int(resp.headers["Content-Length"])
+        ttfb = resp.elapsed.total_seconds() if hasattr(resp, "elapsed") else elapsed
+        self.timings["ttfb"] = min(ttfb, elapsed)
+        self.timings["download"] = max(0.0, elapsed - ttfb)
+        self.timings["total"] = elapsed
+
+    def _record_error(self, error: BaseException):
+        self.error = error
+        self.timings["total"] = time.perf_counter() - self._start
+
+    def _record_decoding(self, json_parse: Optional[float], build: float):
+        self.timings["json_parse"] = json_parse
+        self.timings["build"] = build
+        self.timings["total"] = (self.timings["total"] or 0.0) + (json_parse or 0.0) + build
+
+
+class Hooks:
+    """A registry of callbacks for the request lifecycle events.
+
+    Events emitted on hooks with a ``parent`` are passed to the callbacks of the parent, too.
+    """
+
+    def __init__(self, parent: Optional["Hooks"] = None):
+        """
+        Instantiate the registry.
+
+        :param parent: Optional hooks also receiving all events.
+        """
+        self.parent = parent
+        self._callbacks: Dict[str, List[Callable[[RequestEvent], None]]] = {
+            name: [] for name in EVENTS
+        }
+
+    @property
+    def active(self) -> bool:
+        """Return True if any callback is registered here or on a parent."""
+        return any(self._callbacks.values()) or (self.parent is not None and self.parent.active)
+
+    def register(self, name: str, callback: Callable[[RequestEvent], None]):
+        """
+        Register ``callback`` for the event ``name``.
+
+        :param name: One of :data:`EVENTS`.
+        :param callback: A callable taking a :class:`RequestEvent`.
+        :return: ``callback``, so that this method can be used as a decorator.
+        :raises ValueError: If ``name`` is not a known event.
+        """
+        if name not in self._callbacks:
+            raise ValueError(f"Unknown event {name}, must be one of {', '.join(EVENTS)}.")
+        self._callbacks[name].append(callback)
+        return callback
+
+    def unregister(self, name: str, callback: Callable[[RequestEvent], None]):
+        """Remove ``callback`` registered for the event ``name``."""
+        self._callbacks[name].remove(callback)
+
+    def on_request(self, callback: Callable[[RequestEvent], None]):
+        """Register ``callback`` for the ``on_request`` event."""
+        return self.register("on_request", callback)
+
+    def on_response(self, callback: Callable[[RequestEvent], None]):
+        """Register ``callback`` for the ``on_response`` event."""
+        return self.register("on_response", callback)
+
+    def on_retry(self, callback: Callable[[RequestEvent], None]):
+        """Register ``callback`` for the ``on_retry`` event."""
+        return self.register("on_retry", callback)
+
+    def on_error(self, callback: Callable[[RequestEvent], None]):
+        """Register ``callback`` for the ``on_error`` event."""
+        return self.register("on_error", callback)
+
+    def emit(self, name: str, event: RequestEvent):
+        """
+        Call the callbacks registered for the event ``name`` here and on the parents.
+
+        :param name: One of :data:`EVENTS`.
+        :param event: The event passed to the callbacks.
+        """
+        for callback in list(self._callbacks[name]):
+            callback(event)
+        if self.parent is not None:
+            self.parent.emit(name, event)
+
+    def emit_response(self, event: RequestEvent):
+        """
+        Emit ``on_response``, within an active :func:`operation` once the response has been
+        decoded with :func:`record_decoding`.
+        """
+        op = _operation.get()
+        if op is None:
+            self.emit("on_response", event)
+            return
+        previous = op.hold(self, event)
+        if previous is not None:
+            previous[0].emit("on_response", previous[1])
+
+
+class _Operation:
+    """A call of an :class:`LS <here_location_services.ls.LS>` method."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        # The last response event of each thread, waiting for its decoding timings. Requests
+        # of one operation may run concurrently in worker threads.
+        self._pending: Dict[int, Tuple[Hooks, RequestEvent]] = {}
+
+    def hold(self, hooks: Hooks, event: RequestEvent) -> Optional[Tuple[Hooks, RequestEvent]]:
+        """Hold the event of the current thread and return the one it replaces."""
+        with self._lock:
+            previous = self._pending.pop(threading.get_ident(), None)
+            self._pending[threading.get_ident()] = (hooks, event)
+        return previous
+
+    def release(self) -> Optional[Tuple[Hooks, RequestEvent]]:
+        """Return and forget the held event of the current thread."""
+        with self._lock:
+            return self._pending.pop(threading.get_ident(), None)
+
+    def release_all(self) -> List[Tuple[Hooks, RequestEvent]]:
+        """Return and forget the held events of all threads."""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        return pending
+
+
+_operation: ContextVar[Optional[_Operation]] = ContextVar(
+    "here_location_services_operation", default=None
+)
+
+
+def operation(func: Callable) -> Callable:
+    """
+    Decorate a method of :class:`LS <here_location_services.ls.LS>` sending requests.
+
+    The ``on_response`` event of a request is emitted once its response has been decoded, with
+    the timings of :func:`record_decoding` included, at the latest when the method returns. If
+    the instance has a ``tracer``, the call is traced in a root span named after the method.
+
+    The decorated method accepts the optional keyword arguments ``deadline``, a time budget in
+    seconds for the whole call as a :class:`Deadline <here_location_services.deadline.Deadline>`,
+    and ``timeout``, the connect and read timeouts of its requests as in a
+    :func:`request_timeout <here_location_services.deadline.request_timeout>` block, None to
+    disable them. Both also apply to the requests of bulk methods sent from worker threads.
+    """
+
+    @functools.wraps(func)
+    def wrapper(
+        self, *args, deadline: Optional[float] = None, timeout: TimeoutArg = UNSET, **kwargs
+    ):
+        tracer = getattr(self, "tracer", None)
+        with tracer.start_span(f"LS.{func.__name__}") if tracer else nullcontext(), (
+            Deadline(deadline) if deadline is not None else nullcontext()
+        ), request_timeout(timeout):
+            if _operation.get() is not None:
+                return func(self, *args, **kwargs)
+            op = _Operation(func.__name__)
+            token = _operation.set(op)
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                _operation.reset(token)
+                for hooks, event in op.release_all():
+                    hooks.emit("on_response", event)
+
+    return wrapper
+
+
+def record_decoding(json_parse: Optional[float], build: float):
+    """
+    Record the time spent to parse and build the response of the last request of the
+    current thread within the active :func:`operation` and emit its ``on_response`` event.
+
+    :param json_parse: Seconds spent to parse the JSON body, None if not parsed.
+    :param build: Seconds spent to build the response object.
+    """
+    op = _operation.get()
+    pending = op.release() if op is not None else None
+    if pending is not None:
+        hooks, event = pending
+        event._record_decoding(json_parse, build)
+        hooks.emit("on_response", event)
+
+
+#: Default upper bounds in seconds of the buckets of :class:`LatencyHistograms`.
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    """A histogram of durations with fixed buckets."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Instantiate the histogram.
+
+        :param buckets: Sorted upper bounds of the buckets in seconds.
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Add ``value`` to the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Return the upper bound of the bucket containing the quantile ``q``.
+
+        :param q: A float in range 0 to 1.
+        :return: The estimated quantile, infinity if beyond the last bucket, None if empty.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class LatencyHistograms:
+    """Histograms of the timing phases of requests per endpoint.
+
+    Register :meth:`observe` as ``on_response`` callback, this is done by
+    ``LS(latency_histograms=True)``.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Instantiate the histograms.
+
+        :param buckets: Sorted upper bounds of the buckets in seconds.
+        """
+        self.buckets = buckets
+        self.histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+        _latency_histograms.add(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        _latency_histograms.add(self)
+
+    def _after_fork(self):
+        # A lock held by another thread at the time of the fork is never released.
+        self._lock = threading.Lock()
+
+    def observe(self, event: RequestEvent):
+        """Add the timings of ``event`` to the histograms of its endpoint."""
+        with self._lock:
+            phases = self.histograms.setdefault(event.endpoint, {})
+            for phase, value in event.timings.items():
+                if value is not None:
+                    if phase not in phases:
+                        phases[phase] = Histogram(self.buckets)
+                    phases[phase].observe(value)
+
+    def summary(self) -> Dict[str, Dict[str, Dict]]:
+        """
+        Return a summary of the histograms.
+
+        :return: A dict mapping endpoints to dicts mapping phases to dicts with ``count``,
+            ``sum``, ``mean``, ``p50``, ``p95`` and ``p99``.
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    phase: {
+                        "count": h.count,
+                        "sum": h.sum,
+                        "mean": h.sum / h.count,
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "p99": h.quantile(0.99),
+                    }
+                    for phase, h in phases.items()
+                }
+                for endpoint, phases in self.histograms.items()
+            }
+
+
+_latency_histograms: "weakref.WeakSet[LatencyHistograms]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for histograms in list(_latency_histograms):
+        histograms._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
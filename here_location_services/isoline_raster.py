@@ -0,0 +1,355 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module overlays isolines on a raster grid, locally and without further API calls.
+
+A :class:`RasterGrid` covers a bounding box with square cells of a resolution in degrees.
+:func:`overlay` classifies the cell centers against the isolines of many responses, e.g.
+of many depots, and counts per range how many responses reach each cell. The union of a
+range is then the cells reached by any response and the intersection the cells reached
+by all of them. Results are approximations at the resolution of the grid.
+
+Example::
+
+    results = ls.calculate_isolines_many(depots, "600,1200", "time", "car")
+    grid = RasterGrid.covering(results.values(), resolution=0.005)
+    coverage = overlay(results.values(), grid)
+    coverage.area(coverage.union(600))  # km² reached within 10 minutes
+
+An :class:`IsochroneHeatMap` of :meth:`LS.isochrone_heat_map
+<here_location_services.ls.LS.isochrone_heat_map>` holds the minimal travel time of each
+cell from a grid of origins, and can be refined where the travel times of neighbouring
+cells vary most.
+"""
+
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .isolines import IsolineResult
+
+#: Kilometers per degree of latitude.
+KM_PER_DEGREE = 111.32
+
+Bounds = Tuple[float, float, float, float]
+
+
+def _responses(items: Iterable[Any]) -> List[Any]:
+    """Return the responses of ``items``, skipping failed :class:`IsolineResult` objects."""
+    responses = [item.response if isinstance(item, IsolineResult) else item for item in items]
+    return [response for response in responses if response is not None]
+
+
+def response_bounds(response: Any) -> Optional[Bounds]:
+    """
+    Return the ``(west, south, east, north)`` bounds of the isolines of a response.
+
+    :param response: An :class:`IsolineResponse
+        <here_location_services.responses.IsolineResponse>`.
+    :return: The bounds, None if the response has no polygons.
+    """
+    rings = [ring for isoline in response.to_polygons() for polygon in isoline for ring in polygon]
+    if not rings:
+        return None
+    coordinates = np.concatenate(rings)
+    west, south = coordinates.min(axis=0)
+    east, north = coordinates.max(axis=0)
+    return float(west), float(south), float(east), float(north)
+
+
+def _classify(responses: List[Any], grid: "RasterGrid") -> Iterator[Tuple[Tuple, np.ndarray]]:
+    """Yield the window of each response and the smallest range containing its cells."""
+    for response in responses:
+        bounds = response_bounds(response)
+        window = grid.window(bounds) if bounds is not None else None
+        if window is not None:
+            yield window, response.contains(*grid.centers(*window))
+
+
+class RasterGrid:
+    """A grid of square cells covering a bounding box, rows from north to south."""
+
+    def __init__(self, west: float, south: float, east: float, north: float, resolution: float):
+        """
+        Instantiate the grid.
+
+        :param west: The western bound in degrees of longitude.
+        :param south: The southern bound in degrees of latitude.
+        :param east: The eastern bound, extended to a whole number of cells.
+        :param north: The northern bound.
+        :param resolution: The size of a cell in degrees.
+        :raises ValueError: If ``resolution`` is not positive.
+        """
+        if resolution <= 0:
+            raise ValueError("resolution must be positive.")
+        self.west = west
+        self.north = north
+        self.resolution = resolution
+        # Rounded first, so that a bound on a cell edge does not add a cell of float error.
+        self.shape = (
+            max(1, math.ceil(round((north - south) / resolution, 9))),
+            max(1, math.ceil(round((east - west) / resolution, 9))),
+        )
+
+    def __repr__(self):
+        return f"RasterGrid({self.bounds}, resolution={self.resolution}, shape={self.shape})"
+
+    @classmethod
+    def covering(cls, items: Iterable[Any], resolution: float) -> "RasterGrid":
+        """
+        Return a grid covering the isolines of responses.
+
+        :param items: :class:`IsolineResponse
+            <here_location_services.responses.IsolineResponse>` or :class:`IsolineResult
+            <here_location_services.isolines.IsolineResult>` objects.
+        :param resolution: The size of a cell in degrees.
+        :raises ValueError: If no response has polygons.
+        """
+        bounds = [b for b in map(response_bounds, _responses(items)) if b is not None]
+        if not bounds:
+            raise ValueError("No isolines to cover.")
+        west, south, east, north = np.array(bounds).T
+        return cls(west.min(), south.min(), east.max(), north.max(), resolution)
+
+    @property
+    def bounds(self) -> Bounds:
+        """Return the ``(west, south, east, north)`` bounds of the grid."""
+        rows, cols = self.shape
+        return (
+            self.west,
+            self.north - rows * self.resolution,
+            self.west + cols * self.resolution,
+            self.north,
+        )
+
+    @property
+    def transform(self) -> Tuple[float, float, float, float, float, float]:
+        """
+        Return the affine transform from ``(col, row)`` to ``(lng, lat)``.
+
+        The coefficients ``(a, b, c, d, e, f)`` are in the order of :mod:`affine` and
+        rasterio, i.e. ``lng = a * col + b * row + c`` and ``lat = d * col + e * row + f``.
+        """
+        return (self.resolution, 0.0, self.west, 0.0, -self.resolution, self.north)
+
+    def centers(
+        self, rows: slice = slice(None), cols: slice = slice(None)
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the coordinates of the centers of cells.
+
+        :param rows: A slice of rows.
+        :param cols: A slice of columns.
+        :return: A tuple of 2-D arrays of latitudes and longitudes.
+        """
+        row_ids = np.arange(self.shape[0])[rows]
+        col_ids = np.arange(self.shape[1])[cols]
+        lats = self.north - (row_ids + 0.5) * self.resolution
+        lngs = self.west + (col_ids + 0.5) * self.resolution
+        lng_grid, lat_grid = np.meshgrid(lngs, lats)
+        return lat_grid, lng_grid
+
+    def window(self, bounds: Bounds) -> Optional[Tuple[slice, slice]]:
+        """
+        Return the rows and columns of the cells overlapping ``bounds``.
+
+        :param bounds: ``(west, south, east, north)`` bounds.
+        :return: A tuple of a slice of rows and one of columns, None if they do not overlap.
+        """
+        west, south, east, north = bounds
+        rows, cols = self.shape
+        row_start = max(0, math.floor((self.north - north) / self.resolution))
+        row_stop = min(rows, math.ceil((self.north - south) / self.resolution))
+        col_start = max(0, math.floor((west - self.west) / self.resolution))
+        col_stop = min(cols, math.ceil((east - self.west) / self.resolution))
+        if row_start >= row_stop or col_start >= col_stop:
+            return None
+        return slice(row_start, row_stop), slice(col_start, col_stop)
+
+    def cell_areas(self) -> np.ndarray:
+        """Return the area of the cells of each row in square kilometers."""
+        lats = self.north - (np.arange(self.shape[0]) + 0.5) * self.resolution
+        side = self.resolution * KM_PER_DEGREE
+        return side * side * np.cos(np.radians(lats))
+
+
+class Coverage:
+    """Counts of the responses reaching each cell of a grid, per range."""
+
+    def __init__(self, grid: RasterGrid, ranges: List[float], counts: np.ndarray, responses: int):
+        """
+        Instantiate the coverage.
+
+        :param grid: The :class:`RasterGrid`.
+        :param ranges: The range values, sorted.
+        :param counts: An array of shape ``(ranges, rows, cols)`` of the numbers of responses
+            reaching each cell within each range.
+        :param responses: The number of overlaid responses.
+        """
+        self.grid = grid
+        self.ranges = ranges
+        self.counts = counts
+        self.responses = responses
+
+    def __repr__(self):
+        return f"Coverage({self.responses} responses, ranges={self.ranges}, {self.grid})"
+
+    def _band(self, value: float) -> np.ndarray:
+        if value not in self.ranges:
+            raise ValueError(f"Unknown range {value}, expected one of {self.ranges}.")
+        return self.counts[self.ranges.index(value)]
+
+    def union(self, value: float) -> np.ndarray:
+        """Return a mask of the cells reached by any response within the range ``value``."""
+        return self._band(value) > 0
+
+    def intersection(self, value: float, min_count: Optional[int] = None) -> np.ndarray:
+        """
+        Return a mask of the cells reached by all responses within the range ``value``.
+
+        :param value: A range value.
+        :param min_count: Return the cells reached by at least this many responses instead.
+        """
+        return self._band(value) >= (self.responses if min_count is None else min_count)
+
+    def area(self, mask: np.ndarray) -> float:
+        """Return the area of the cells of ``mask`` in square kilometers."""
+        return float((mask * self.grid.cell_areas()[:, None]).sum())
+
+
+def overlay(
+    items: Iterable[Any], grid: RasterGrid, ranges: Optional[Sequence[float]] = None
+) -> Coverage:
+    """
+    Count the responses reaching each cell of ``grid`` within each range.
+
+    Only the cells within the bounds of a response are classified against its isolines.
+    The isolines of a range are assumed to contain the ones of smaller ranges.
+
+    :param items: :class:`IsolineResponse
+        <here_location_services.responses.IsolineResponse>` or :class:`IsolineResult
+        <here_location_services.isolines.IsolineResult>` objects. Failed results are skipped.
+    :param grid: The :class:`RasterGrid`.
+    :param ranges: The range values to count, by default all range values of the responses.
+    :return: A :class:`Coverage`.
+    """
+    responses = _responses(items)
+    if ranges is None:
+        values = {i["range"]["value"] for r in responses for i in r.isolines or []}
+        ranges = sorted(values)
+    ranges = list(ranges)
+    counts = np.zeros((len(ranges),) + grid.shape, dtype="int32")
+    for window, smallest in _classify(responses, grid):
+        for band, value in enumerate(ranges):
+            counts[(band,) + window] += smallest <= value
+    return Coverage(grid, ranges, counts, len(responses))
+
+
+def origin_grid(bounds: Bounds, spacing: float) -> List[Tuple[float, float]]:
+    """
+    Return the centers of the cells of a grid of ``spacing`` degrees covering ``bounds``.
+
+    :param bounds: ``(west, south, east, north)`` bounds.
+    :param spacing: The distance between origins in degrees.
+    :return: A list of ``(lat, lng)`` origins.
+    """
+    lats, lngs = RasterGrid(*bounds, resolution=spacing).centers()
+    return [(round(float(lat), 9), round(float(lng), 9)) for lat, lng in zip(lats.flat, lngs.flat)]
+
+
+class IsochroneHeatMap:
+    """The minimal travel time of each cell of a grid from a set of origins."""
+
+    def __init__(self, grid: RasterGrid, options: Dict[str, Any]) -> None:
+        """
+        Instantiate an empty heat map.
+
+        :param grid: The :class:`RasterGrid` of the heat map.
+        :param options: The keyword arguments of :meth:`LS.calculate_isolines_many
+            <here_location_services.ls.LS.calculate_isolines_many>` used for all origins.
+        """
+        self.grid = grid
+        self.options = options
+        #: The minimal travel time of each cell in seconds, rounded up to the range of an
+        #: isoline, NaN for cells not reached from any origin.
+        self.values = np.full(grid.shape, np.nan)
+        #: The origins whose isolines were added so far.
+        self.origins: Set[Tuple[float, float]] = set()
+        #: The reasons of failed origins, which are retried by :meth:`refinement_origins`.
+        self.errors: Dict[Tuple[float, float], str] = {}
+
+    def __repr__(self):
+        reached = int(np.count_nonzero(~np.isnan(self.values)))
+        return f"IsochroneHeatMap({len(self.origins)} origins, {reached} cells reached)"
+
+    @property
+    def transform(self) -> Tuple[float, float, float, float, float, float]:
+        """Return the affine transform of :attr:`values`, see :attr:`RasterGrid.transform`."""
+        return self.grid.transform
+
+    def add(self, results: Dict[Any, IsolineResult]) -> None:
+        """
+        Rasterize the isolines of origins into the heat map.
+
+        :param results: The results of :meth:`LS.calculate_isolines_many
+            <here_location_services.ls.LS.calculate_isolines_many>`.
+        """
+        for result in results.values():
+            if result.error is None:
+                self.origins.add(result.center)
+                self.errors.pop(result.center, None)
+            else:
+                self.errors[result.center] = result.error
+        for window, smallest in _classify(_responses(results.values()), self.grid):
+            self.values[window] = np.fmin(self.values[window], smallest)
+
+    def variance(self, size: int = 3) -> np.ndarray:
+        """
+        Return the variance of the values of the ``size`` × ``size`` cells around each cell.
+
+        :param size: An odd number of cells.
+        :return: A float64 array of the shape of :attr:`values`, NaN for cells without
+            reached neighbours.
+        """
+        pad = size // 2
+        reached = ~np.isnan(self.values)
+        values = np.pad(np.where(reached, self.values, 0.0), pad)
+        counts = np.pad(reached.astype("float64"), pad)
+        windows = np.lib.stride_tricks.sliding_window_view
+        count = windows(counts, (size, size)).sum(axis=(2, 3))
+        total = windows(values, (size, size)).sum(axis=(2, 3))
+        squares = windows(values * values, (size, size)).sum(axis=(2, 3))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / count
+            return np.maximum(squares / count - mean * mean, 0.0)
+
+    def refinement_origins(
+        self, threshold: float, spacing: float, size: int = 3
+    ) -> List[Tuple[float, float]]:
+        """
+        Return new origins in the cells whose :meth:`variance` exceeds ``threshold``.
+
+        The centers of those cells are snapped to a grid of ``spacing`` degrees aligned with
+        the north-west corner of the heat map, like :func:`origin_grid`, and origins which
+        were already added are left out. Failed origins in :attr:`errors` are returned again
+        to be retried.
+
+        :param threshold: A variance in square seconds.
+        :param spacing: The distance between new origins in degrees.
+        :param size: The size of the neighbourhood of :meth:`variance`.
+        :return: A list of ``(lat, lng)`` origins.
+        """
+        variance = self.variance(size)
+        rows, cols = np.nonzero(np.nan_to_num(variance) > threshold)
+        lats, lngs = self.grid.centers()
+        north, west = self.grid.north, self.grid.west
+        snapped = {
+            (
+                round(float(north - (np.floor((north - lat) / spacing) + 0.5) * spacing), 9),
+                round(float(west + (np.floor((lng - west) / spacing) + 0.5) * spacing), 9),
+            )
+            for lat, lng in zip(lats[rows, cols], lngs[rows, cols])
+        }
+        return sorted((snapped | set(self.errors)) - self.origins)
@@ -12,7 +12,9 @@ from here_location_services.platform.auth import Auth
 
 from .apis import Api
 from .config.base_config import PlaceOptions, Truck, WayPointOptions
+from .deadline import DEFAULT_TIMEOUT, Timeout
 from .exceptions import ApiError
+from .transport import Transport
 
 
 class IsolineRoutingApi(Api):
@@ -24,8 +26,17 @@ class IsolineRoutingApi(Api):
         auth: Optional[Auth] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
-        super().__init__(api_key, auth=auth, proxies=proxies, country=country)
+        super().__init__(
+            api_key,
+            auth=auth,
+            proxies=proxies,
+            country=country,
+            timeout=timeout,
+            transport=transport,
+        )
         self._base_url = f"https://isoline.router.{self._get_url_string()}"
 
     def get_isoline_routing(
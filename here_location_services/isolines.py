@@ -0,0 +1,338 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the geometry of isolines as NumPy arrays.
+
+The flexible polylines of the ``outer`` and ``inner`` rings of the polygons of an isoline
+are decoded once into float64 arrays of shape ``(n, 2)`` with ``(lng, lat)`` coordinates.
+A polygon is a list of rings, the outer ring followed by its holes.
+
+:meth:`LS.calculate_isolines_many <here_location_services.ls.LS.calculate_isolines_many>`
+returns an :class:`IsolineResult` per center.
+
+The polygons of an isoline form one multipolygon. Many multipolygons are converted in bulk
+into a ragged array, i.e. one array of coordinates with offsets of rings, polygons and
+multipolygons, from which shapely geometries and WKB are built without a Python object per
+coordinate.
+
+Points are classified against the rings of an isoline with an :class:`EdgeGrid`, which
+buckets the edges of the rings into horizontal strips so that each point is only tested
+against the edges crossing its strip, with the even-odd rule.
+"""
+
+import struct
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import flexpolyline as fp
+import numpy as np
+import pandas as pd
+
+#: A polygon as a list of rings, the outer ring followed by its holes.
+Polygon = List[np.ndarray]
+
+#: Maximum number of point-edge pairs tested at once by :meth:`EdgeGrid.contains`.
+BLOCK_SIZE = 1 << 22
+
+
+def decode_ring(polyline: str) -> np.ndarray:
+    """
+    Decode a flexible polyline into a ring.
+
+    :param polyline: The encoded flexible polyline.
+    :return: A float64 array of shape ``(n, 2)`` of ``(lng, lat)`` coordinates.
+    """
+    points = np.array(fp.decode(polyline), dtype="float64").reshape(-1, 2)
+    return points[:, ::-1].copy()
+
+
+def decode_polygons(isoline: Dict[str, Any]) -> List[Polygon]:
+    """
+    Decode the polygons of an isoline of a response.
+
+    :param isoline: An item of the ``isolines`` of an isoline routing response.
+    :return: A list of polygons.
+    """
+    return [
+        [decode_ring(polygon["outer"])] + [decode_ring(ring) for ring in polygon.get("inner", [])]
+        for polygon in isoline.get("polygons") or []
+    ]
+
+
+def close_ring(ring: np.ndarray) -> np.ndarray:
+    """Return ``ring`` with its first coordinate repeated at the end if it is not closed."""
+    if len(ring) and not np.array_equal(ring[0], ring[-1]):
+        return np.concatenate([ring, ring[:1]])
+    return ring
+
+
+def ragged_array(
+    geometries: Sequence[List[Polygon]],
+) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Return multipolygons as one array of coordinates with offsets.
+
+    The layout is the one of :func:`shapely.from_ragged_array` and GeoArrow.
+
+    :param geometries: Multipolygons as lists of polygons, e.g. the polygons of the ranges
+        of :class:`IsolineResult` objects.
+    :return: A tuple of an array of shape ``(n, 2)`` of the coordinates of closed rings and
+        of the offsets of rings in coordinates, of polygons in rings and of multipolygons in
+        polygons.
+    """
+    rings = [
+        close_ring(ring) for geometry in geometries for polygon in geometry for ring in polygon
+    ]
+    polygon_sizes = [len(polygon) for geometry in geometries for polygon in geometry]
+    geometry_sizes = [len(geometry) for geometry in geometries]
+    coordinates = np.concatenate(rings) if rings else np.empty((0, 2))
+
+    def offsets(sizes):
+        return np.concatenate([[0], np.cumsum(sizes, dtype="int64")]).astype("int64")
+
+    return coordinates, (
+        offsets([len(ring) for ring in rings]),
+        offsets(polygon_sizes),
+        offsets(geometry_sizes),
+    )
+
+
+def to_wkb(geometries: Sequence[List[Polygon]]) -> List[bytes]:
+    """
+    Return multipolygons as little endian WKB.
+
+    :param geometries: Multipolygons as lists of polygons.
+    :return: A list of WKB ``MultiPolygon`` geometries.
+    """
+    result = []
+    for geometry in geometries:
+        parts = [struct.pack("<BII", 1, 6, len(geometry))]
+        for polygon in geometry:
+            parts.append(struct.pack("<BII", 1, 3, len(polygon)))
+            for ring in polygon:
+                ring = close_ring(ring)
+                parts.append(struct.pack("<I", len(ring)))
+                parts.append(np.ascontiguousarray(ring, dtype="<f8").tobytes())
+        result.append(b"".join(parts))
+    return result
+
+
+def to_shapely(geometries: Sequence[List[Polygon]]) -> np.ndarray:
+    """
+    Return multipolygons as shapely geometries.
+
+    :param geometries: Multipolygons as lists of polygons.
+    :return: An array of :class:`shapely.MultiPolygon` objects.
+    :raises ImportError: If shapely 2 is not installed.
+    """
+    try:
+        import shapely
+    except ImportError:
+        raise ImportError("to_shapely requires shapely, pip install here-location-services[geo].")
+    coordinates, offsets = ragged_array(geometries)
+    return shapely.from_ragged_array(shapely.GeometryType.MULTIPOLYGON, coordinates, offsets)
+
+
+def center_items(centers: Any) -> List[Tuple[Hashable, Tuple[float, float]]]:
+    """
+    Return the ids and coordinates of ``centers``.
+
+    :param centers: A dict of ``[lat, lng]`` by id, a DataFrame with ``lat`` and ``lng``
+        columns and the ids as index, or a sequence of ``[lat, lng]`` with the positions as ids.
+    :return: A list of ``(id, (lat, lng))`` tuples.
+    """
+    if isinstance(centers, pd.DataFrame):
+        coordinates = centers[["lat", "lng"]].to_numpy(dtype="float64")
+        return [
+            (key, (float(lat), float(lng))) for key, (lat, lng) in zip(centers.index, coordinates)
+        ]
+    items = centers.items() if isinstance(centers, dict) else enumerate(centers)
+    return [(key, (float(center[0]), float(center[1]))) for key, center in items]
+
+
+class IsolineResult:
+    """The isolines of one center of a bulk isoline calculation."""
+
+    def __init__(
+        self,
+        center: Tuple[float, float],
+        response: Optional[Any] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Instantiate the result and decode the polygons of ``response``.
+
+        :param center: The ``(lat, lng)`` of the center.
+        :param response: The :class:`IsolineResponse
+            <here_location_services.responses.IsolineResponse>`, None if it failed.
+        :param error: The reason of the failure.
+        """
+        self.center = center
+        self.response = response
+        self.error = error
+        isolines = (response.isolines or []) if response is not None else []
+        #: The range values of the isolines, e.g. seconds or meters.
+        self.ranges: List[float] = [isoline["range"]["value"] for isoline in isolines]
+        #: The polygons of each range.
+        self.polygons: List[List[Polygon]] = response.to_polygons() if response is not None else []
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"IsolineResult({self.center}, error={self.error!r})"
+        return f"IsolineResult({self.center}, ranges={self.ranges})"
+
+    @property
+    def ok(self) -> bool:
+        """Return True if the isolines were calculated."""
+        return self.error is None
+
+
+class EdgeGrid:
+    """An index of the edges of rings for vectorized point-in-polygon tests."""
+
+    def __init__(self, rings: Sequence[np.ndarray], strips: Optional[int] = None) -> None:
+        """
+        Build the index.
+
+        :param rings: Arrays of shape ``(n, 2)`` of ``(lng, lat)`` coordinates. Rings are
+            closed implicitly.
+        :param strips: Number of horizontal strips, by default the square root of the number
+            of edges.
+        """
+        starts = [ring for ring in rings if len(ring) > 1]
+        ends = [np.roll(ring, -1, axis=0) for ring in starts]
+        start = np.concatenate(starts) if starts else np.empty((0, 2))
+        end = np.concatenate(ends) if ends else np.empty((0, 2))
+        sloped = start[:, 1] != end[:, 1]
+        self.edges = np.hstack([start[sloped], end[sloped]])
+        if len(self.edges):
+            lngs, lats = self.edges[:, [0, 2]], self.edges[:, [1, 3]]
+            self.bounds = (lngs.min(), lats.min(), lngs.max(), lats.max())
+        else:
+            self.bounds = (np.inf, np.inf, -np.inf, -np.inf)
+        self.strips = strips or max(1, int(np.sqrt(len(self.edges))))
+        self._height = (self.bounds[3] - self.bounds[1]) / self.strips or 1.0
+        low = self._strip(self.edges[:, [1, 3]].min(axis=1))
+        high = self._strip(self.edges[:, [1, 3]].max(axis=1))
+        counts = high - low + 1
+        edge_ids = np.repeat(np.arange(len(self.edges)), counts)
+        strip_ids = (
+            np.repeat(low, counts)
+            + np.arange(counts.sum())
+            - np.repeat(np.cumsum(counts) - counts, counts)
+        )
+        order = np.argsort(strip_ids, kind="stable")
+        self._edge_ids = edge_ids[order]
+        self._offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(strip_ids, minlength=self.strips))]
+        )
+
+    def _strip(self, lats: np.ndarray) -> np.ndarray:
+        strips = np.floor((lats - self.bounds[1]) / self._height).astype("int64")
+        return np.clip(strips, 0, self.strips - 1)
+
+    def contains(self, lngs: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """
+        Test which points are inside the rings.
+
+        :param lngs: An array of longitudes.
+        :param lats: An array of latitudes of the same shape.
+        :return: A boolean array of the shape of ``lngs``.
+        """
+        lngs = np.asarray(lngs, dtype="float64")
+        lats = np.asarray(lats, dtype="float64")
+        inside = np.zeros(lngs.shape, dtype=bool)
+        x, y, flat = lngs.ravel(), lats.ravel(), inside.ravel()
+        west, south, east, north = self.bounds
+        candidates = np.flatnonzero((x >= west) & (x <= east) & (y >= south) & (y <= north))
+        strips = self._strip(y[candidates])
+        order = np.argsort(strips, kind="stable")
+        candidates, strips = candidates[order], strips[order]
+        bounds = np.searchsorted(strips, np.arange(self.strips + 1))
+        for strip in np.flatnonzero(np.diff(bounds)):
+            edges = self.edges[self._edge_ids[self._offsets[strip] : self._offsets[strip + 1]]]
+            points = candidates[bounds[strip] : bounds[strip + 1]]
+            step = max(1, BLOCK_SIZE // max(1, len(edges)))
+            for block in range(0, len(points), step):
+                ids = points[block : block + step]
+                flat[ids] = self._crossings(edges, x[ids, None], y[ids, None]) % 2 == 1
+        return inside
+
+    @staticmethod
+    def _crossings(edges: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        x1, y1, x2, y2 = edges.T
+        spans = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        return (spans & (x < crossing)).sum(axis=1)
+
+
+def isoline_grids(
+    ranges: List[float], polygons: List[List[Polygon]]
+) -> List[Tuple[float, EdgeGrid]]:
+    """
+    Index the rings of each isoline of a response.
+
+    :param ranges: The range values of the isolines.
+    :param polygons: The polygons of each isoline.
+    :return: A list of ``(range value, grid)`` tuples sorted by range value.
+    """
+    grids = [
+        (value, EdgeGrid([ring for polygon in isoline for ring in polygon]))
+        for value, isoline in zip(ranges, polygons)
+    ]
+    return sorted(grids, key=lambda item: item[0])
+
+
+def smallest_range(
+    grids: List[Tuple[float, EdgeGrid]], lats: np.ndarray, lngs: np.ndarray
+) -> np.ndarray:
+    """
+    Return the smallest range of the isolines containing each point.
+
+    :param grids: The grids of :func:`isoline_grids`.
+    :param lats: An array of latitudes.
+    :param lngs: An array of longitudes of the same shape.
+    :return: A float64 array of range values, NaN for points outside of all isolines.
+    """
+    lats = np.asarray(lats, dtype="float64")
+    lngs = np.asarray(lngs, dtype="float64")
+    ranges = np.full(lats.shape, np.nan)
+    pending = np.flatnonzero(np.ones(lats.shape, dtype=bool))
+    for value, grid in grids:
+        if not len(pending):
+            break
+        inside = grid.contains(lngs.ravel()[pending], lats.ravel()[pending])
+        ranges.ravel()[pending[inside]] = value
+        pending = pending[~inside]
+    return ranges
+
+
+def contains_many(
+    responses: Sequence[Any], lats: np.ndarray, lngs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the smallest range of the isolines of many responses containing each point.
+
+    :param responses: :class:`IsolineResponse
+        <here_location_services.responses.IsolineResponse>` or :class:`IsolineResult`
+        objects. Failed results are skipped.
+    :param lats: An array of latitudes.
+    :param lngs: An array of longitudes of the same shape.
+    :return: A tuple of a float64 array of the smallest range values, NaN for points outside
+        of all isolines, and an int64 array of the positions in ``responses`` of the isolines,
+        -1 for points outside of all isolines.
+    """
+    lats = np.asarray(lats, dtype="float64")
+    ranges = np.full(lats.shape, np.nan)
+    positions = np.full(lats.shape, -1, dtype="int64")
+    for position, item in enumerate(responses):
+        response = item.response if isinstance(item, IsolineResult) else item
+        if response is None:
+            continue
+        values = response.contains(lats, lngs)
+        smaller = values < ranges
+        smaller |= np.isnan(ranges) & ~np.isnan(values)
+        ranges[smaller] = values[smaller]
+        positions[smaller] = position
+    return ranges, positions
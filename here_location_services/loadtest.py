@@ -0,0 +1,309 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains a load generator to size worker pools and validate contracted QPS.
+
+A :class:`LoadTest` calls methods of an :class:`LS <here_location_services.ls.LS>` instance
+either at a target rate, or with a fixed number of concurrent workers as fast as possible,
+and reports the throughput, latency percentiles, error and throttle rates and the client
+CPU time per request.
+
+At a target rate the latency of a call is measured from the time it was scheduled, so that
+calls queued behind slow ones are not hidden from the percentiles.
+
+The module can be run from the command line with an input file of JSON lines, each with
+an ``operation``, i.e. the name of an ``LS`` method, and its ``kwargs``::
+
+    {"operation": "geocode", "kwargs": {"query": "Invalidenstraße 116, Berlin"}}
+    {"operation": "autosuggest", "kwargs": {"query": "res", "limit": 5, "at": [52.5, 13.4]}}
+
+For example, to send 50 requests per second for a minute to a local stand-in server::
+
+    python -m here_location_services.loadtest calls.jsonl --rate 50 --duration 60 \\
+        --base-url http://127.0.0.1:8080
+
+Operations taking config objects, e.g. ``matrix``, can be driven from Python by passing
+functions calling ``LS`` to :class:`LoadTest`.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from here_location_services.cassette import ReplayTransport
+from here_location_services.exceptions import ApiError, TooManyRequestsException
+from here_location_services.ls import LS
+from here_location_services.transport import Transport
+
+#: Percentiles of the reported latencies.
+PERCENTILES = (50, 90, 95, 99)
+
+Call = Callable[[LS], Any]
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """
+    Return the ``p``-th percentile of ``values`` with the nearest-rank method.
+
+    :param values: A sorted list of values.
+    :param p: A percentile between 0 and 100.
+    :return: The percentile, None if ``values`` is empty.
+    """
+    if not values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+
+def is_throttled(exc: BaseException) -> bool:
+    """Return True if ``exc`` was raised for a response with HTTP status 429."""
+    if isinstance(exc, TooManyRequestsException):
+        return True
+    if isinstance(exc, ApiError) and exc.args:
+        return getattr(exc.args[0], "status_code", None) == 429
+    return False
+
+
+def read_calls(path: str) -> List[Call]:
+    """
+    Read the calls of a load test from a file of JSON lines.
+
+    :param path: The path of the file.
+    :return: A list of functions calling ``LS``.
+    :raises ValueError: If a line names an unknown operation.
+    """
+    calls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            name = record["operation"]
+            method = getattr(LS, name, None)
+            if name.startswith("_") or not hasattr(method, "__wrapped__"):
+                raise ValueError(f"Unknown operation {name!r}.")
+            calls.append(_bind(name, record.get("kwargs") or {}))
+    return calls
+
+
+def _bind(name: str, kwargs: Dict) -> Call:
+    def call(ls: LS):
+        return getattr(ls, name)(**kwargs)
+
+    return call
+
+
+class LoadTest:
+    """Call methods of an ``LS`` instance at a target rate or concurrency."""
+
+    def __init__(
+        self,
+        ls: LS,
+        calls: Iterable[Call],
+        rate: Optional[float] = None,
+        concurrency: int = 8,
+        duration: Optional[float] = None,
+        requests: Optional[int] = None,
+    ):
+        """
+        Instantiate the load test.
+
+        :param ls: The :class:`LS <here_location_services.ls.LS>` instance shared by all
+            workers.
+        :param calls: Functions calling ``ls``, repeated in turn until the test ends.
+        :param rate: An optional target of calls per second. Without it, ``concurrency``
+            workers call as fast as possible.
+        :param concurrency: Number of worker threads.
+        :param duration: Optional number of seconds to run.
+        :param requests: Optional number of calls to send, at least one of ``duration`` and
+            ``requests`` is required.
+        :raises ValueError: If the test has no calls or no end.
+        """
+        self.ls = ls
+        self.calls = list(calls)
+        if not self.calls:
+            raise ValueError("At least one call is required.")
+        if duration is None and requests is None:
+            raise ValueError("Either duration or requests is required.")
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self._latencies: List[float] = []
+        self._errors: Dict[str, int] = {}
+        self._throttled = 0
+        self._lock = threading.Lock()
+
+    def _call(self, call: Call, scheduled: float):
+        try:
+            call(self.ls)
+            error = None
+        except Exception as exc:
+            error = exc
+        latency = time.perf_counter() - scheduled
+        with self._lock:
+            self._latencies.append(latency)
+            if error is not None:
+                name = type(error).__name__
+                self._errors[name] = self._errors.get(name, 0) + 1
+                if is_throttled(error):
+                    self._throttled += 1
+
+    def _schedule(self) -> Iterable[int]:
+        """Yield call numbers until the test ends."""
+        end = None if self.duration is None else time.perf_counter() + self.duration
+        for i in itertools.count():
+            if self.requests is not None and i >= self.requests:
+                return
+            if end is not None and time.perf_counter() >= end:
+                return
+            yield i
+
+    def _run_at_rate(self, rate: float):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for i in self._schedule():
+                scheduled = start + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._call, self.calls[i % len(self.calls)], scheduled)
+
+    def _run_concurrently(self):
+        schedule = iter(self._schedule())
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    i = next(schedule, None)
+                if i is None:
+                    return
+                self._call(self.calls[i % len(self.calls)], time.perf_counter())
+
+        workers = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the load test.
+
+        :return: The :meth:`report` of the test.
+        """
+        cpu, start = time.process_time(), time.perf_counter()
+        if self.rate:
+            self._run_at_rate(self.rate)
+        else:
+            self._run_concurrently()
+        return self.report(time.perf_counter() - start, time.process_time() - cpu)
+
+    def report(self, elapsed: float, cpu: float) -> Dict[str, Any]:
+        """
+        Summarize the calls of the test.
+
+        :param elapsed: Seconds the test took.
+        :param cpu: CPU seconds the process spent during the test.
+        :return: A dict with the number of ``requests``, ``throughput`` in calls per second,
+            ``latency`` percentiles in seconds, ``error_rate``, ``throttle_rate``, counts of
+            ``errors`` per exception type and ``cpu_per_request`` in seconds.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            errors = dict(self._errors)
+            throttled = self._throttled
+        count = len(latencies)
+        latency: Dict[str, Optional[float]] = {
+            f"p{p}": percentile(latencies, p) for p in PERCENTILES
+        }
+        latency["mean"] = sum(latencies) / count if count else None
+        latency["max"] = latencies[-1] if count else None
+        return {
+            "requests": count,
+            "elapsed": elapsed,
+            "throughput": count / elapsed if elapsed > 0 else 0.0,
+            "latency": latency,
+            "error_rate": sum(errors.values()) / count if count else 0.0,
+            "throttle_rate": throttled / count if count else 0.0,
+            "errors": errors,
+            "cpu_per_request": cpu / count if count else None,
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Return ``report`` as human readable text."""
+
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.1f} ms"
+
+    lines = [
+        f"requests        {report['requests']} in {report['elapsed']:.1f} s",
+        f"throughput      {report['throughput']:.1f} req/s",
+        "latency         "
+        + ", ".join(f"{name} {ms(value)}" for name, value in report["latency"].items()),
+        f"error rate      {report['error_rate']:.2%}",
+        f"throttle rate   {report['throttle_rate']:.2%}",
+        f"cpu per request {ms(report['cpu_per_request'])}",
+    ]
+    for name, count in sorted(report["errors"].items()):
+        lines.append(f"  {name}: {count}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run a load test from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m here_location_services.loadtest",
+        description="Drive LS operations read from a file of JSON lines.",
+    )
+    parser.add_argument("input", help="File of JSON lines with operation and kwargs.")
+    parser.add_argument("--rate", type=float, help="Target calls per second.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of workers.")
+    parser.add_argument("--duration", type=float, help="Seconds to run.")
+    parser.add_argument("--requests", type=int, help="Number of calls to send.")
+    parser.add_argument("--base-url", help="Send all requests to this URL instead.")
+    parser.add_argument("--cassette", help="Replay responses from a recorded cassette.")
+    parser.add_argument("--latency", default="0", help="Replay latency, seconds or 'recorded'.")
+    parser.add_argument("--api-key", help="API key, defaults to the env var LS_API_KEY.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+    if args.duration is None and args.requests is None:
+        parser.error("one of --duration and --requests is required")
+
+    transport: Transport
+    if args.cassette:
+        latency = args.latency if args.latency == "recorded" else float(args.latency)
+        transport = ReplayTransport(args.cassette, latency=latency)
+    else:
+        transport = Transport(pool_maxsize=max(args.concurrency, 10), base_url=args.base_url)
+    api_key = args.api_key or os.environ.get("LS_API_KEY")
+    if not api_key and (args.base_url or args.cassette):
+        api_key = "dummy"
+    ls = LS(api_key=api_key, transport=transport)
+
+    test = LoadTest(
+        ls,
+        read_calls(args.input),
+        rate=args.rate,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        requests=args.requests,
+    )
+    report = test.run()
+    transport.close()
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,13 +3,18 @@
 
 """This module contains class to interact with Location services REST APIs."""
 
+import itertools
 import os
+import time
 import urllib
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime
-from time import sleep
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, Type, Union
 
+import numpy as np
+import pandas as pd
+import requests
 from geojson import LineString, Point
 
 from here_location_services.config.routing_config import Scooter, Via
@@ -18,7 +23,18 @@ from here_location_services.platform.apis.aaa_oauth2_api import AAAOauth2Api
 from here_location_services.platform.auth import Auth
 from here_location_services.platform.credentials import PlatformCredentials
 
+from .accounting import Ledger
+from .apis import Api
 from .autosuggest_api import AutosuggestApi
+from .bulk_routing import (
+    REQUEST_ERRORS,
+    RouteSweep,
+    error_message,
+    pair_array,
+    route_summary,
+    summary_frame,
+)
+from .circuit_breaker import CircuitBreaker
 from .config.autosuggest_config import SearchCircle
 from .config.base_config import PlaceOptions, Truck, WayPointOptions
 from .config.matrix_routing_config import (
@@ -29,12 +45,19 @@ from .config.matrix_routing_config import (
     PolygonRegion,
     WorldRegion,
 )
+from .deadline import DEFAULT_TIMEOUT, Timeout, wait
 from .destination_weather_api import DestinationWeatherApi
 from .exceptions import ApiError
 from .geocoding_search_api import GeocodingSearchApi
+from .hedging import HedgingPolicy
+from .hooks import Hooks, LatencyHistograms, operation, record_decoding
+from .isoline_raster import IsochroneHeatMap, RasterGrid, origin_grid
 from .isoline_routing_api import IsolineRoutingApi
+from .isolines import IsolineResult, center_items
+from .matrix_cube import MEMMAP_THRESHOLD, TILE_SIZE, allocate, matrix_values, tiles
 from .matrix_routing_api import MatrixRoutingApi
 from .responses import (
+    ApiResponse,
     AutosuggestResponse,
     BrowseResponse,
     DestinationWeatherResponse,
@@ -49,7 +72,12 @@ from .responses import (
     WeatherAlertsResponse,
 )
 from .routing_api import RoutingApi
+from .singleflight import SingleFlight
+from .streaming import iter_tours, read_matrix_result
 from .tour_planning_api import TourPlanningApi
+from .tracing import Tracer, span
+from .transport import Transport
+from .utils import map_in_context, submit_in_context
 
 
 class LS:
@@ -64,13 +92,59 @@ class LS:
         platform_credentials: Optional[PlatformCredentials] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
+        coalesce: bool = False,
+        hedging: Optional[HedgingPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        latency_histograms: bool = False,
+        tracer: Optional[Tracer] = None,
     ):
+        """
+        Instantiate the client.
+
+        :param api_key: An API key, defaults to the environment variable ``LS_API_KEY``.
+        :param platform_credentials: :class:`PlatformCredentials` used to authenticate with
+            an access token if no ``api_key`` is available.
+        :param proxies: An optional dict of proxies.
+        :param country: A string, ``row`` for the rest of the world or ``china``.
+        :param timeout: Connect and read timeouts in seconds of every request, either a float
+            or a tuple of two floats, or None to disable them. The ``timeout`` keyword argument
+            of the methods overrides them for a single call. Use
+            :class:`Deadline <here_location_services.deadline.Deadline>` or the ``deadline``
+            keyword argument of the methods in seconds to bound the total time of a call
+            including async job polling.
+        :param transport: An optional :class:`Transport <here_location_services.transport.Transport>`
+            shared by all APIs. A single instance with its connection pool is thread-safe and
+            can be shared by many worker threads. Use a :mod:`here_location_services.cassette`
+            transport to record or replay traffic, including token requests.
+        :param coalesce: If True, identical requests sent concurrently by several threads share
+            a single network call, see :mod:`here_location_services.singleflight`.
+        :param hedging: An optional :class:`HedgingPolicy <here_location_services.hedging.HedgingPolicy>`
+            for the latency sensitive geocoding, search and autosuggest requests.
+        :param circuit_breaker: An optional :class:`CircuitBreaker <here_location_services.circuit_breaker.CircuitBreaker>`
+            shared by all APIs to fail fast on degraded hosts.
+        :param latency_histograms: If True, the timings of all requests are aggregated in
+            :attr:`histograms`, see :mod:`here_location_services.hooks`.
+        :param tracer: An optional :class:`Tracer <here_location_services.tracing.Tracer>`
+            to trace every call in a span.
+        """  # noqa E501
         api_key = api_key or os.environ.get("LS_API_KEY")
         self.auth: Optional[Auth] = None
+        self.timeout = timeout
+        self.transport = transport or Transport()
+        self.tracer = tracer
+        #: The :class:`Ledger <here_location_services.accounting.Ledger>` attached with
+        #: :meth:`Ledger.attach <here_location_services.accounting.Ledger.attach>`, which
+        #: checks the estimated transactions of bulk calls before they are sent.
+        self.ledger: Optional[Ledger] = None
         if not api_key:
             credentials = platform_credentials or PlatformCredentials.from_default()
             aaa_oauth2_api = AAAOauth2Api(
-                base_url=credentials.cred_properties["endpoint"], proxies={}
+                base_url=credentials.cred_properties["endpoint"],
+                proxies={},
+                timeout=timeout,
+                transport=self.transport,
             )
             self.auth = Auth(credentials=credentials, aaa_oauth2_api=aaa_oauth2_api)
 
@@ -80,41 +154,116 @@ class LS:
             auth=self.auth,
             proxies=proxies,
             country=country,
+            timeout=timeout,
+            transport=self.transport,
         )
         self.isoline_routing_api = IsolineRoutingApi(
             api_key=api_key,
             auth=self.auth,
             proxies=proxies,
             country=country,
+            timeout=timeout,
+            transport=self.transport,
         )
         self.routing_api = RoutingApi(
             api_key=api_key,
             auth=self.auth,
             proxies=proxies,
             country=country,
+            timeout=timeout,
+            transport=self.transport,
         )
         self.matrix_routing_api = MatrixRoutingApi(
-            api_key=api_key, auth=self.auth, proxies=proxies, country=country
+            api_key=api_key,
+            auth=self.auth,
+            proxies=proxies,
+            country=country,
+            timeout=timeout,
+            transport=self.transport,
         )
         self.autosuggest_api = AutosuggestApi(
             api_key=api_key,
             auth=self.auth,
             proxies=proxies,
             country=country,
+            timeout=timeout,
+            transport=self.transport,
         )
         self.destination_weather_api = DestinationWeatherApi(
             api_key=api_key,
             auth=self.auth,
             proxies=proxies,
             country=country,
+            timeout=timeout,
+            transport=self.transport,
         )
         self.tour_planning_api = TourPlanningApi(
             api_key=api_key,
             auth=self.auth,
             proxies=proxies,
             country=country,
+            timeout=timeout,
+            transport=self.transport,
         )
+        self.single_flight = SingleFlight() if coalesce else None
+        self.circuit_breaker = circuit_breaker
+        #: Lifecycle hooks of the requests of all APIs.
+        self.hooks = Hooks()
+        for api in self.apis:
+            api.single_flight = self.single_flight
+            api.circuit_breaker = self.circuit_breaker
+            api.hooks.parent = self.hooks
+        self.histograms: Optional[LatencyHistograms] = None
+        if latency_histograms:
+            self.histograms = LatencyHistograms()
+            self.hooks.on_response(self.histograms.observe)
+        self.geo_search_api.hedging = hedging
+        self.autosuggest_api.hedging = hedging
+
+    @property
+    def apis(self) -> List[Api]:
+        """Return the low-level API clients used by this instance."""
+        return [
+            self.geo_search_api,
+            self.isoline_routing_api,
+            self.routing_api,
+            self.matrix_routing_api,
+            self.autosuggest_api,
+            self.destination_weather_api,
+            self.tour_planning_api,
+        ]
+
+    def _decode(
+        self,
+        cls: Type[ApiResponse],
+        resp: Union[requests.Response, Dict],
+        parse: Optional[Callable[[requests.Response], Dict]] = None,
+    ):
+        """
+        Parse the body of ``resp`` and build a response object of type ``cls``.
+
+        The time spent in both steps is recorded for the ``on_response`` hooks.
+
+        :param cls: A subclass of :class:`ApiResponse`.
+        :param resp: A :class:`requests.Response` object, or its already parsed body.
+        :param parse: An optional function parsing the body of a :class:`requests.Response`
+            object, defaults to :meth:`requests.Response.json`.
+        :return: An instance of ``cls``.
+        """
+        with span("LS.decode", response_type=cls.__name__):
+            start = time.perf_counter()
+            if isinstance(resp, dict):
+                data = resp
+            else:
+                data = parse(resp) if parse is not None else resp.json()
+            parsed = time.perf_counter()
+            response = cls.new(data)
+        record_decoding(
+            None if isinstance(resp, dict) else parsed - start, time.perf_counter() - parsed
+        )
+        return response
 
+    @operation
     def geocode(self, query: str, limit: int = 20, lang: str = "en-US") -> GeocoderResponse:
         """Calculate coordinates as result of geocoding for the given ``query``.
 
@@ -123,6 +272,11 @@ class LS:
             Default value is 20.
         :param lang: A string to represent language to be used for result rendering from
             a list of BCP47 compliant Language Codes.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ValueError: If ``query`` is empty or having all whitespace characters.
         :return: :class:`GeocoderResponse` object.
         """
@@ -130,8 +284,9 @@ class LS:
             raise ValueError(f"Invalid input query: {query}")
 
         resp = self.geo_search_api.get_geocoding(query, limit=limit, lang=lang)
-        return GeocoderResponse.new(resp.json())
+        return self._decode(GeocoderResponse, resp)
 
+    @operation
     def reverse_geocode(
         self, lat: float, lng: float, limit: int = 1, lang: str = "en-US"
     ) -> ReverseGeocoderResponse:
@@ -145,6 +300,11 @@ class LS:
             Default value is 1.
         :param lang: A string to represent language to be used for result rendering from
             a list of BCP47 compliant Language Codes.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ValueError: If Latitude is not in range between -90 and 90 or
              Longitude is not in range between -180 and 180.
         :return: :class:`ReverseGeocoderResponse` object.
@@ -155,8 +315,9 @@ class LS:
             raise ValueError("Longitude must be in range -180 to 180.")
 
         resp = self.geo_search_api.get_reverse_geocoding(lat=lat, lng=lng, limit=limit, lang=lang)
-        return ReverseGeocoderResponse.new(resp.json())
+        return self._decode(ReverseGeocoderResponse, resp)
 
+    @operation
     def calculate_isoline(
         self,
         range: str,
@@ -225,6 +386,11 @@ class LS:
             for ``destination``.
         :param destination_waypoint_options: :class:`WayPointOptions` optional waypoint options
             for ``destination``.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ValueError: If ``origin`` and ``destination`` are provided together.
         :return: :class:`IsolineResponse` object.
         """
@@ -256,12 +422,203 @@ class LS:
             destination_place_options=destination_place_options,
             destination_waypoint_options=destination_waypoint_options,
         )
-        response = IsolineResponse.new(resp.json())
+        response = self._decode(IsolineResponse, resp)
 
         if response.notices:
             raise ValueError("Isolines could not be calculated.")
         return response
 
+    @operation
+    def calculate_isolines_many(
+        self,
+        centers: Union[Dict, pd.DataFrame, Sequence],
+        range: str,
+        range_type: str,
+        transport_mode: str,
+        direction: str = "origin",
+        concurrency: int = 8,
+        time: Optional[datetime] = None,
+        routing_mode: Optional[str] = "fast",
+        shape_max_points: Optional[int] = None,
+        optimised_for: Optional[str] = "balanced",
+        avoid_features: Optional[List[str]] = None,
+        truck: Optional[Truck] = None,
+        errors: str = "coerce",
+    ) -> Dict[Hashable, IsolineResult]:
+        """Calculate isolines of many centers concurrently.
+
+        Centers with identical coordinates are requested only once. The polygons of each
+        center are decoded into NumPy rings, see :mod:`here_location_services.isolines`.
+
+        :param centers: A dict of ``[lat, lng]`` by id, a DataFrame with ``lat`` and ``lng``
+            columns and the ids as index, or a sequence of ``[lat, lng]`` with the positions
+            as ids.
+        :param range: A string representing a range of isoline, unit is defined by
+            parameter range type. Example: range='1000' or range='1000,2000,3000'
+        :param range_type: A string representing a type of ``range``. Possible values are
+            ``distance``, ``time`` and ``consumption``.
+        :param transport_mode: A string representing Mode of transport to be used for the
+            calculation of the isolines.
+        :param direction: ``origin`` for isolines reachable from the centers, ``destination``
+            for isolines reaching the centers.
+        :param concurrency: Number of concurrent requests.
+        :param time: The departure time for ``origin`` or arrival time for ``destination``.
+        :param routing_mode: A string to represent routing mode.
+        :param shape_max_points: An integer to Limit the number of points in the resulting
+            isoline geometry.
+        :param optimised_for: A string to specify how isoline calculation is optimized.
+        :param avoid_features: Avoid routes that violate these properties.
+        :param truck: Different truck options to use during route calculation when
+            transport_mode = truck.
+        :param errors: ``coerce`` to keep the reason of a failed center in
+            :attr:`IsolineResult.error <here_location_services.isolines.IsolineResult.error>`,
+            ``raise`` to raise the exception.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
+        :raises ValueError: If ``direction`` or ``errors`` is invalid.
+        :raises BatchLimitExceededException: If the estimated transactions exceed the
+            ``batch_limit`` of the attached ledger.
+        :return: A dict of :class:`IsolineResult <here_location_services.isolines.IsolineResult>`
+            by center id.
+        """
+        if direction not in ("origin", "destination"):
+            raise ValueError("direction must be 'origin' or 'destination'.")
+        if errors not in ("raise", "coerce"):
+            raise ValueError("errors must be 'raise' or 'coerce'.")
+        items = center_items(centers)
+        unique_centers = list(dict.fromkeys(center for _, center in items))
+        if self.ledger is not None:
+            self.ledger.check(self.ledger.estimate("isolines", requests=len(unique_centers)))
+        times = {"departure_time": time} if direction == "origin" else {"arrival_time": time}
+
+        def calculate(center: Tuple[float, float]) -> IsolineResult:
+            try:
+                response = self.calculate_isoline(
+                    range=range,
+                    range_type=range_type,
+                    transport_mode=transport_mode,
+                    routing_mode=routing_mode,
+                    shape_max_points=shape_max_points,
+                    optimised_for=optimised_for,
+                    avoid_features=avoid_features,
+                    truck=truck,
+                    **{direction: list(center)},
+                    **times,
+                )
+            except Exception as exc:
+                if errors == "raise":
+                    raise
+                return IsolineResult(center, error=error_message(exc))
+            return IsolineResult(center, response)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            calculated = map_in_context(executor, calculate, unique_centers)
+        results = dict(zip(unique_centers, calculated))
+        return {key: results[center] for key, center in items}
+
+    @operation
+    def isochrone_heat_map(
+        self,
+        bounds: Tuple[float, float, float, float],
+        ranges: Sequence[int],
+        resolution: float,
+        spacing: float,
+        transport_mode: str = "car",
+        direction: str = "origin",
+        concurrency: int = 8,
+        time: Optional[datetime] = None,
+        routing_mode: Optional[str] = "fast",
+        shape_max_points: Optional[int] = None,
+        avoid_features: Optional[List[str]] = None,
+        truck: Optional[Truck] = None,
+    ) -> IsochroneHeatMap:
+        """Rasterize the minimal travel time of each cell of a bounding box from a grid of origins.
+
+        The bounding box is covered with origins every ``spacing`` degrees. Isolines of all
+        ``ranges`` are calculated concurrently for each origin, see
+        :meth:`calculate_isolines_many`, and each cell of a grid of ``resolution`` degrees
+        gets the smallest range of the isolines containing its center, over all origins.
+        Refine the heat map with :meth:`refine_heat_map`.
+
+        Example::
+
+            heat_map = ls.isochrone_heat_map(
+                (13.2, 52.4, 13.6, 52.6), [300, 600, 900, 1200], resolution=0.002, spacing=0.05
+            )
+            heat_map.values  # seconds, with the affine transform heat_map.transform
+
+        :param bounds: ``(west, south, east, north)`` bounds of the heat map.
+        :param ranges: Travel times of the isolines in seconds.
+        :param resolution: The size of a cell of the heat map in degrees.
+        :param spacing: The distance between origins in degrees.
+        :param transport_mode: A string representing Mode of transport.
+        :param direction: ``origin`` for travel times from the origins, ``destination`` for
+            travel times to them.
+        :param concurrency: Number of concurrent requests.
+        :param time: The departure time for ``origin`` or arrival time for ``destination``.
+        :param routing_mode: A string to represent routing mode.
+        :param shape_max_points: An integer to Limit the number of points of each isoline.
+        :param avoid_features: Avoid routes that violate these properties.
+        :param truck: Different truck options to use when transport_mode = truck.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
+        :return: An :class:`IsochroneHeatMap
+            <here_location_services.isoline_raster.IsochroneHeatMap>`.
+        """
+        options = dict(
+            range=",".join(str(value) for value in sorted(ranges)),
+            range_type="time",
+            transport_mode=transport_mode,
+            direction=direction,
+            concurrency=concurrency,
+            time=time,
+            routing_mode=routing_mode,
+            shape_max_points=shape_max_points,
+            avoid_features=avoid_features,
+            truck=truck,
+        )
+        heat_map = IsochroneHeatMap(RasterGrid(*bounds, resolution=resolution), options)
+        heat_map.add(self.calculate_isolines_many(origin_grid(bounds, spacing), **options))
+        return heat_map
+
+    @operation
+    def refine_heat_map(
+        self, heat_map: IsochroneHeatMap, threshold: float, spacing: float, size: int = 3
+    ) -> IsochroneHeatMap:
+        """Add origins to a heat map where the travel times of neighbouring cells vary most.
+
+        Isolines are calculated with the options of the heat map for origins in the cells
+        whose variance exceeds ``threshold``, see
+        :meth:`IsochroneHeatMap.refinement_origins
+        <here_location_services.isoline_raster.IsochroneHeatMap.refinement_origins>`, and
+        rasterized into the heat map.
+
+        :param heat_map: An :class:`IsochroneHeatMap
+            <here_location_services.isoline_raster.IsochroneHeatMap>` of
+            :meth:`isochrone_heat_map`.
+        :param threshold: A variance in square seconds.
+        :param spacing: The distance between new origins in degrees, e.g. half of the
+            spacing of the previous origins.
+        :param size: The size of the neighbourhood of the variance in cells.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
+        :return: The refined ``heat_map``.
+        """
+        origins = heat_map.refinement_origins(threshold, spacing, size)
+        if origins:
+            heat_map.add(self.calculate_isolines_many(origins, **heat_map.options))
+        return heat_map
+
+    @operation
     def autosuggest(
         self,
         query: str,
@@ -299,6 +656,11 @@ class LS:
         :param show: Select additional fields to be rendered in the response. Please note
             that some of the fields involve additional webservice calls and can increase
             the overall response time.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`requests.Response` object.
         :raises ValueError: If ``search_in_circle``,``search_in_bbox`` and ``destination``
             are provided together.
@@ -322,10 +684,11 @@ class LS:
             political_view=political_view,
             show=show,
         )
-        response = AutosuggestResponse.new(resp.json())
+        response = self._decode(AutosuggestResponse, resp)
 
         return response
 
+    @operation
     def get_dest_weather(
         self,
         products: List[str],
@@ -354,6 +717,11 @@ class LS:
             `DEST_WEATHER_PRODUCT.observation`.
         :param language: Defines the language used in the descriptions in the response.
         :param units: Defines whether units or imperial units are used in the response.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ValueError: If neither `at`, `query` or `zipcode` are passed.
         :raises ValueError: If `one_observation` is set to true without passing
             DEST_WEATHER_PRODUCT.observation in `products`
@@ -378,9 +746,10 @@ class LS:
             language=language,
             units=units,
         )
-        response = DestinationWeatherResponse.new(resp.json())
+        response = self._decode(DestinationWeatherResponse, resp)
         return response
 
+    @operation
     def get_weather_alerts(
         self,
         geometry: Union[Point, LineString],
@@ -407,6 +776,11 @@ class LS:
             it is not removed from the feed by national weather institutes
             (valid until warning is present in the response)
         :param width: int
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ValueError: If maximum width exceeds 100000 for point type geometry
             or width exceeds 25000 for LineString geometry
         :return: :class:`WeatherAlertsResponse` object.
@@ -427,9 +801,10 @@ class LS:
             end_time=end_time,
             width=width,
         )
-        response = WeatherAlertsResponse.new(resp.json())
+        response = self._decode(WeatherAlertsResponse, resp)
         return response
 
+    @operation
     def solve_tour_planning(
         self,
         fleet: Fleet,
@@ -438,7 +813,8 @@ class LS:
         optimization_traffic: Optional[str] = None,
         optimization_waiting_time: Optional[Dict] = None,
         is_async: Optional[bool] = False,
-    ) -> TourPlanningResponse:
+        stream: bool = False,
+    ) -> Union[TourPlanningResponse, Iterator[Dict]]:
         """Requests profile-aware routing data, creates a Vehicle Routing Problem and solves it.
 
         :param fleet: A fleet represented by various vehicle types for serving jobs.
@@ -452,8 +828,17 @@ class LS:
             of a vehicle arriving at a stop before the starting time of the time window defined
             for serving the job.
         :param is_async: Solves the problem Asynchronously
+        :param stream: If set to True the solution is parsed incrementally and an iterator
+            yielding one tour at a time is returned instead of a :class:`TourPlanningResponse`.
+            Memory usage then stays bounded by the size of a single tour.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ApiError: If
-        :return: :class:`TourPlanningResponse` object.
+        :return: :class:`TourPlanningResponse` object or an iterator of tours if ``stream``
+            is True.
         """
 
         if is_async is True:
@@ -466,18 +851,26 @@ class LS:
                 is_async=is_async,
             )
             status_url = resp.json()["href"]
-            while True:
-                resp_status = self.tour_planning_api.get_async_tour_planning_status(status_url)
-                if resp_status.status_code == 200 and resp_status.json().get("error"):
-                    raise ApiError(resp_status)
-                elif resp_status.status_code == 200 and resp_status.json()["status"] == "success":
-                    result_url = resp_status.json()["resource"]["href"]
-                    break
-                elif resp_status.status_code in (401, 403, 404, 500):
-                    raise ApiError(resp_status)
-                sleep(2)
+            for iteration in itertools.count():
+                with span("LS.poll", iteration=iteration):
+                    resp_status = self.tour_planning_api.get_async_tour_planning_status(status_url)
+                    if resp_status.status_code == 200 and resp_status.json().get("error"):
+                        raise ApiError(resp_status)
+                    elif (
+                        resp_status.status_code == 200
+                        and resp_status.json()["status"] == "success"
+                    ):
+                        result_url = resp_status.json()["resource"]["href"]
+                        break
+                    elif resp_status.status_code in (401, 403, 404, 500):
+                        raise ApiError(resp_status)
+                    wait(2)
+            if stream:
+                return iter_tours(
+                    self.tour_planning_api.get_async_tour_planning_results(result_url, stream=True)
+                )
             result = self.matrix_routing_api.get_async_matrix_route_results(result_url)
-            response = TourPlanningResponse.new(result)
+            response = self._decode(TourPlanningResponse, result)
             return response
         else:
             resp = self.tour_planning_api.solve_tour_planning(
@@ -487,10 +880,14 @@ class LS:
                 optimization_traffic=optimization_traffic,
                 optimization_waiting_time=optimization_waiting_time,
                 is_async=is_async,
+                stream=stream,
             )
-            response = TourPlanningResponse.new(resp.json())
+            if stream:
+                return iter_tours(resp)
+            response = self._decode(TourPlanningResponse, resp)
             return response
 
+    @operation
     def discover(
         self,
         query: str,
@@ -522,6 +919,11 @@ class LS:
         :param limit: An int representing maximum number of results to be returned.
         :param lang: A string to represent language to be used for result rendering from
             a list of BCP47 compliant Language Codes.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ValueError: If ``center`` and ``bounding_box`` are provided together.
         :return: :class:`DiscoverResponse` object.
         """
@@ -540,8 +942,9 @@ class LS:
             limit=limit,
             lang=lang,
         )
-        return DiscoverResponse.new(resp.json())
+        return self._decode(DiscoverResponse, resp)
 
+    @operation
     def browse(
         self,
         center: List,
@@ -566,6 +969,11 @@ class LS:
         :param name: A string representing Full-text filter on POI names/titles.
         :param lang: A string to represent language to be used for result rendering from
             a list of BCP47 compliant Language Codes.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`BrowseResponse` object.
         """
         resp = self.geo_search_api.get_search_browse(
@@ -578,8 +986,9 @@ class LS:
             name=name,
             lang=lang,
         )
-        return BrowseResponse.new(resp.json())
+        return self._decode(BrowseResponse, resp)
 
+    @operation
     def lookup(self, location_id: str, lang: Optional[str] = None) -> LookupResponse:
         """
         Get search results by providing ``location_id``.
@@ -587,11 +996,17 @@ class LS:
         :param location_id: A string representing id.
         :param lang: A string to represent language to be used for result rendering from
             a list of BCP47 compliant Language Codes.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`LookupResponse` object.
         """
         resp = self.geo_search_api.get_search_lookup(location_id=location_id, lang=lang)
-        return LookupResponse.new(resp.json())
+        return self._decode(LookupResponse, resp)
 
+    @operation
     def car_route(
         self,
         origin: List,
@@ -640,6 +1055,11 @@ class LS:
         :param avoid_areas: A list of areas to avoid during route calculation. To define avoid area.
         :param exclude: A comma separated list of three-letter country codes
             (ISO-3166-1 alpha-3 code) that routes will exclude.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`RoutingResponse` object.
         """  # noqa: E501
 
@@ -663,8 +1083,9 @@ class LS:
             avoid_areas=avoid_areas,
             exclude=exclude,
         )
-        return RoutingResponse.new(resp.json())
+        return self._decode(RoutingResponse, resp)
 
+    @operation
     def bicycle_route(
         self,
         origin: List,
@@ -713,6 +1134,11 @@ class LS:
         :param avoid_areas: A list of areas to avoid during route calculation. To define avoid area.
         :param exclude: A comma separated list of three-letter country codes
             (ISO-3166-1 alpha-3 code) that routes will exclude.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`RoutingResponse` object.
         """  # noqa E501
         resp = self.routing_api.route(
@@ -735,8 +1161,9 @@ class LS:
             avoid_areas=avoid_areas,
             exclude=exclude,
         )
-        return RoutingResponse.new(resp.json())
+        return self._decode(RoutingResponse, resp)
 
+    @operation
     def truck_route(
         self,
         origin: List,
@@ -788,6 +1215,11 @@ class LS:
         :param avoid_areas: A list of areas to avoid during route calculation. To define avoid area.
         :param exclude: A comma separated list of three-letter country codes
             (ISO-3166-1 alpha-3 code) that routes will exclude.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`RoutingResponse` object.
         """  # noqa E501
         resp = self.routing_api.route(
@@ -811,8 +1243,9 @@ class LS:
             avoid_areas=avoid_areas,
             exclude=exclude,
         )
-        return RoutingResponse.new(resp.json())
+        return self._decode(RoutingResponse, resp)
 
+    @operation
     def scooter_route(
         self,
         origin: List,
@@ -863,6 +1296,11 @@ class LS:
         :param avoid_areas: A list of areas to avoid during route calculation. To define avoid area.
         :param exclude: A comma separated list of three-letter country codes
             (ISO-3166-1 alpha-3 code) that routes will exclude.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`RoutingResponse` object.
         """  # noqa E501
         resp = self.routing_api.route(
@@ -886,8 +1324,9 @@ class LS:
             avoid_areas=avoid_areas,
             exclude=exclude,
         )
-        return RoutingResponse.new(resp.json())
+        return self._decode(RoutingResponse, resp)
 
+    @operation
     def pedestrian_route(
         self,
         origin: List,
@@ -936,6 +1375,11 @@ class LS:
         :param avoid_areas: A list of areas to avoid during route calculation. To define avoid area.
         :param exclude: A comma separated list of three-letter country codes
             (ISO-3166-1 alpha-3 code) that routes will exclude.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :return: :class:`RoutingResponse` object.
         """  # noqa E501
         resp = self.routing_api.route(
@@ -958,8 +1402,356 @@ class LS:
             avoid_areas=avoid_areas,
             exclude=exclude,
         )
-        return RoutingResponse.new(resp.json())
+        return self._decode(RoutingResponse, resp)
+
+    @operation
+    def route_many(
+        self,
+        pairs: Optional[Union[pd.DataFrame, Sequence]] = None,
+        origins: Optional[Sequence] = None,
+        destinations: Optional[Sequence] = None,
+        transport_mode: str = "car",
+        concurrency: int = 8,
+        departure_time: Optional[datetime] = None,
+        routing_mode: str = "fast",
+        return_results: Optional[List] = None,
+        truck: Optional[Truck] = None,
+        scooter: Optional[Scooter] = None,
+        avoid_features: Optional[List[str]] = None,
+        avoid_areas: Optional[List[AvoidBoundingBox]] = None,
+        exclude: Optional[List[str]] = None,
+        geometry: bool = False,
+        errors: str = "coerce",
+    ) -> pd.DataFrame:
+        """Calculate routes of many origin-destination pairs concurrently.
+
+        Identical pairs are requested only once. Only a summary of the first route of each
+        response is kept.
+
+        :param pairs: A DataFrame with the columns ``origin_lat``, ``origin_lng``,
+            ``destination_lat`` and ``destination_lng``, or a sequence of pairs of
+            ``[lat, lng]`` origins and destinations.
+        :param origins: A sequence or array of ``[lat, lng]`` origins, used with
+            ``destinations`` instead of ``pairs``.
+        :param destinations: A sequence or array of ``[lat, lng]`` destinations.
+        :param transport_mode: A string to represent mode of transport, e.g. ``car`` or
+            ``truck``.
+        :param concurrency: Number of concurrent requests.
+        :param departure_time: :class:`datetime.datetime` object.
+        :param routing_mode: A string to represent routing mode.
+        :param return_results: A list of strings, ``summary`` is always requested. Add
+            ``tolls`` for the ``tolls`` column.
+        :param truck: Different truck options to use if ``transport_mode`` is ``truck``.
+        :param scooter: Additional attributes if ``transport_mode`` is ``scooter``.
+        :param avoid_features: Avoid routes that violate these properties.
+        :param avoid_areas: A list of areas to avoid during route calculation.
+        :param exclude: A list of three-letter country codes that routes will exclude.
+        :param geometry: If True, the table has a ``geometry`` column of
+            :class:`LazyGeometry <here_location_services.bulk_routing.LazyGeometry>` objects,
+            decoded only when accessed.
+        :param errors: ``coerce`` to leave the columns of failed requests empty with the
+            reason in the ``error`` column, ``raise`` to raise the exception. Errors of API
+            responses, timeouts, deadlines and open circuits are kept per pair.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
+        :raises ValueError: If the options do not match ``transport_mode``.
+        :raises BatchLimitExceededException: If the estimated transactions exceed the
+            ``batch_limit`` of the attached ledger.
+        :return: A DataFrame with one row per pair and the columns ``duration`` and
+            ``base_duration`` in seconds, ``length`` in meters, ``tolls``, ``sections``
+            and ``error``.
+        """
+        if truck and transport_mode != "truck":
+            raise ValueError("Truck option must be used when transport_mode is truck")
+        if scooter and transport_mode != "scooter":
+            raise ValueError("Scooter option must be used when transport_mode is scooter")
+        if errors not in ("raise", "coerce"):
+            raise ValueError("errors must be 'raise' or 'coerce'.")
+        array, index = pair_array(pairs, origins, destinations)
+        codes, uniques = pd.MultiIndex.from_arrays(array.T).factorize()
+        if self.ledger is not None:
+            self.ledger.check(self.ledger.estimate("routes", requests=len(uniques)))
+        results = ["summary"] + [r for r in return_results or [] if r != "summary"]
+        if geometry and "polyline" not in results:
+            results.append("polyline")
+
+        def route(key) -> Optional[Dict]:
+            try:
+                resp = self.routing_api.route(
+                    transport_mode=transport_mode,
+                    origin=[key[0], key[1]],
+                    destination=[key[2], key[3]],
+                    departure_time=departure_time,
+                    routing_mode=routing_mode,
+                    return_results=results,
+                    truck=truck,
+                    scooter=scooter,
+                    avoid_features=avoid_features,
+                    avoid_areas=avoid_areas,
+                    exclude=exclude,
+                )
+            except REQUEST_ERRORS as exc:
+                if errors == "raise":
+                    raise
+                return {"error": error_message(exc)}
+            return route_summary(resp.json(), geometry=geometry)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            summaries = map_in_context(executor, route, uniques)
+        return summary_frame(summaries, codes, index, geometry)
+
+    @operation
+    def route_sweep(
+        self,
+        departure_times: Sequence[datetime],
+        pairs: Optional[Union[pd.DataFrame, Sequence]] = None,
+        origins: Optional[Sequence] = None,
+        destinations: Optional[Sequence] = None,
+        transport_mode: str = "car",
+        concurrency: int = 8,
+        routing_mode: str = "fast",
+        truck: Optional[Truck] = None,
+        scooter: Optional[Scooter] = None,
+        avoid_features: Optional[List[str]] = None,
+        avoid_areas: Optional[List[AvoidBoundingBox]] = None,
+        exclude: Optional[List[str]] = None,
+        errors: str = "coerce",
+    ) -> RouteSweep:
+        """Calculate routes of origin-destination pairs at many departure times concurrently.
+
+        Identical pairs and departure times are requested only once. Unless ``errors`` is
+        ``raise``, a failed route leaves its slot NaN with the reason in
+        :attr:`RouteSweep.errors` and does not abort the sweep.
+
+        Example::
+
+            departures = departure_range(datetime(2021, 6, 1), datetime(2021, 6, 2))
+            sweep = ls.route_sweep(departures, origins=origins, destinations=destinations)
+            sweep.durations  # array of shape (len(origins), 96)
+
+        :param departure_times: A sequence of :class:`datetime.datetime` objects, e.g. from
+            :func:`departure_range <here_location_services.bulk_routing.departure_range>`.
+        :param pairs: A DataFrame with the columns ``origin_lat``, ``origin_lng``,
+            ``destination_lat`` and ``destination_lng``, or a sequence of pairs of
+            ``[lat, lng]`` origins and destinations.
+        :param origins: A sequence or array of ``[lat, lng]`` origins, used with
+            ``destinations`` instead of ``pairs``.
+        :param destinations: A sequence or array of ``[lat, lng]`` destinations.
+        :param transport_mode: A string to represent mode of transport.
+        :param concurrency: Number of concurrent requests.
+        :param routing_mode: A string to represent routing mode.
+        :param truck: Different truck options to use if ``transport_mode`` is ``truck``.
+        :param scooter: Additional attributes if ``transport_mode`` is ``scooter``.
+        :param avoid_features: Avoid routes that violate these properties.
+        :param avoid_areas: A list of areas to avoid during route calculation.
+        :param exclude: A list of three-letter country codes that routes will exclude.
+        :param errors: ``coerce`` to leave the slots of failed requests NaN with the reason
+            in :attr:`RouteSweep.errors`, ``raise`` to raise the exception. Errors of API
+            responses, timeouts, deadlines and open circuits are kept per slot.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
+        :raises ValueError: If the options do not match ``transport_mode`` or ``errors`` is
+            invalid.
+        :raises BatchLimitExceededException: If the estimated transactions exceed the
+            ``batch_limit`` of the attached ledger.
+        :return: A :class:`RouteSweep <here_location_services.bulk_routing.RouteSweep>`
+            with arrays of shape ``(pairs, times)``.
+        """
+        if truck and transport_mode != "truck":
+            raise ValueError("Truck option must be used when transport_mode is truck")
+        if scooter and transport_mode != "scooter":
+            raise ValueError("Scooter option must be used when transport_mode is scooter")
+        if errors not in ("raise", "coerce"):
+            raise ValueError("errors must be 'raise' or 'coerce'.")
+        array, index = pair_array(pairs, origins, destinations)
+        codes, uniques = pd.MultiIndex.from_arrays(array.T).factorize()
+        departures = list(departure_times)
+        positions = {d: i for i, d in enumerate(dict.fromkeys(departures))}
+        unique_departures = list(positions)
+        time_codes = [positions[d] for d in departures]
+        if self.ledger is not None:
+            requests = len(uniques) * len(unique_departures)
+            self.ledger.check(self.ledger.estimate("routes", requests=requests))
+
+        def route(slot: Tuple[int, int]) -> Dict:
+            key = uniques[slot[0]]
+            try:
+                resp = self.routing_api.route(
+                    transport_mode=transport_mode,
+                    origin=[key[0], key[1]],
+                    destination=[key[2], key[3]],
+                    departure_time=unique_departures[slot[1]],
+                    routing_mode=routing_mode,
+                    return_results=["summary"],
+                    truck=truck,
+                    scooter=scooter,
+                    avoid_features=avoid_features,
+                    avoid_areas=avoid_areas,
+                    exclude=exclude,
+                )
+            except REQUEST_ERRORS as exc:
+                if errors == "raise":
+                    raise
+                return {"error": error_message(exc)}
+            return route_summary(resp.json())
+
+        slots = list(itertools.product(range(len(uniques)), range(len(unique_departures))))
+        shape = (len(uniques), len(unique_departures))
+        durations, lengths = np.full(shape, np.nan), np.full(shape, np.nan)
+        failed = np.full(shape, None, dtype=object)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for slot, summary in zip(slots, map_in_context(executor, route, slots)):
+                values = (summary.get("duration"), summary.get("length"))
+                durations[slot], lengths[slot] = (np.nan if v is None else v for v in values)
+                failed[slot] = summary.get("error")
+        failed = failed[codes][:, time_codes]
+        return RouteSweep(
+            departures=departures,
+            durations=durations[codes][:, time_codes],
+            lengths=lengths[codes][:, time_codes],
+            errors={(int(i), int(j)): failed[i, j] for i, j in zip(*np.nonzero(failed))},
+            index=index,
+        )
 
+    @operation
+    def matrix_cube(
+        self,
+        origins: List[Dict],
+        destinations: Optional[List[Dict]],
+        departure_times: Sequence[datetime],
+        region_definition: Union[
+            CircleRegion,
+            BoundingBoxRegion,
+            PolygonRegion,
+            AutoCircleRegion,
+            WorldRegion,
+        ],
+        matrix_attribute: str = "travelTimes",
+        concurrency: int = 4,
+        tile_size: Tuple[int, int] = TILE_SIZE,
+        dtype: str = "float64",
+        path: Optional[str] = None,
+        memmap_threshold: int = MEMMAP_THRESHOLD,
+        profile: Optional[str] = None,
+        routing_mode: Optional[str] = None,
+        transport_mode: Optional[str] = None,
+        avoid_features: Optional[List[str]] = None,
+        avoid_areas: Optional[List[AvoidBoundingBox]] = None,
+        truck: Optional[Truck] = None,
+    ) -> np.ndarray:
+        """
+        Calculate routing matrices of many departure times as one array.
+
+        One asynchronous matrix request is sent per departure time and tile of origins and
+        destinations, concurrently, and the streamed results are written into an array of
+        shape ``(times, origins, destinations)``.
+
+        :param origins: A list of dictionaries containing lat and long for origin points.
+        :param destinations: A list of dictionaries containing lat and long for destination
+            points. If None, ``origins`` are used as destinations.
+        :param departure_times: A sequence of :class:`datetime.datetime` objects with explicit
+            timezone, the first axis of the array.
+        :param region_definition: Definition of a region in which the matrices will be
+            calculated, see :meth:`matrix`.
+        :param matrix_attribute: ``travelTimes`` or ``distances``.
+        :param concurrency: Number of matrices calculated concurrently.
+        :param tile_size: Maximum numbers of origins and destinations of one request.
+        :param dtype: A floating point dtype of the array.
+        :param path: The path of a ``.npy`` file to memory-map the array to. If the call fails,
+            the file is removed unless it existed before.
+        :param memmap_threshold: Size in bytes above which the array is memory-mapped to a
+            temporary ``.npy`` file if ``path`` is not given. The temporary file is removed if
+            the call fails.
+        :param profile: A string to represent profile id.
+        :param routing_mode: A string to represent routing mode.
+        :param transport_mode: A string to represent transport mode.
+        :param avoid_features: Avoid routes that violate these properties.
+        :param avoid_areas: A list of areas to avoid during route calculation.
+        :param truck: Different truck options to use when transport_mode = truck.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
+        :raises ValueError: If conflicting options are provided.
+        :raises ApiError: If a matrix request fails, the remaining requests are cancelled.
+        :raises BatchLimitExceededException: If the estimated transactions exceed the
+            ``batch_limit`` of the attached ledger.
+        :return: A :class:`numpy.ndarray` or :class:`numpy.memmap`, entries without a route
+            are NaN.
+        """
+        if matrix_attribute not in ("travelTimes", "distances"):
+            raise ValueError("matrix_attribute must be 'travelTimes' or 'distances'.")
+        destinations = origins if destinations is None else destinations
+        departures = list(departure_times)
+        if self.ledger is not None:
+            self.ledger.check(
+                *(
+                    self.ledger.estimate(
+                        "matrix",
+                        requests=len(departures),
+                        origins=rows.stop - rows.start,
+                        destinations=columns.stop - columns.start,
+                    )
+                    for rows, columns in tiles(len(origins), len(destinations), tile_size)
+                )
+            )
+        created = path is None or not os.path.exists(path)
+        cube = allocate(
+            (len(departures), len(origins), len(destinations)), dtype, path, memmap_threshold
+        )
+
+        def calculate(time_index: int, rows: slice, columns: slice):
+            result = self.matrix(
+                origins=origins[rows],
+                destinations=destinations[columns],
+                region_definition=region_definition,
+                async_req=True,
+                stream=True,
+                profile=profile,
+                departure_time=departures[time_index],
+                routing_mode=routing_mode,
+                transport_mode=transport_mode,
+                avoid_features=avoid_features,
+                avoid_areas=avoid_areas,
+                truck=truck,
+                matrix_attributes=[matrix_attribute],
+            )
+            cube[time_index, rows, columns] = matrix_values(result.matrix, matrix_attribute)
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    submit_in_context(executor, calculate, time_index, rows, columns)
+                    for time_index in range(len(departures))
+                    for rows, columns in tiles(len(origins), len(destinations), tile_size)
+                ]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        except BaseException:
+            if created and isinstance(cube, np.memmap):
+                # Nobody gets the file of a failed cube, remove it once unmapped by dropping
+                # the last reference to the cube.
+                filename = str(cube.filename)
+                del cube
+                os.remove(filename)
+            raise
+        if isinstance(cube, np.memmap):
+            cube.flush()
+        return cube
+
+    @operation
     def matrix(
         self,
         origins: List[Dict],
@@ -980,6 +1772,7 @@ class LS:
         avoid_areas: Optional[List[AvoidBoundingBox]] = None,
         truck: Optional[Truck] = None,
         matrix_attributes: Optional[List[str]] = None,
+        stream: bool = False,
     ) -> MatrixRoutingResponse:
         """
         Calculate routing matrix between multiple ``origins`` and ``destinations`` using
@@ -1031,6 +1824,15 @@ class LS:
         :param matrix_attributes: Defines which attributes are included in the response as part of
             the data representation of the matrix entries summaries. Matrix attributes are defined
             in :attr:`MATRIX_ATTRIBUTES <here_location_services.config.matrix_routing_config.MATRIX_ATTRIBUTES>`
+        :param stream: If set to True the results of an asynchronous request are parsed
+            incrementally and ``travelTimes``, ``distances`` and ``errorCodes`` of the matrix
+            are returned as flat :class:`numpy.ndarray` objects instead of lists. Can only be
+            used with ``async_req`` set to True.
+        :param deadline: An optional time budget in seconds for the whole call, see
+            :class:`Deadline <here_location_services.deadline.Deadline>`.
+        :param timeout: Optional connect and read timeouts in seconds of the requests of this
+            call, either a float or a tuple of two floats, or None to disable them. Defaults to
+            the timeout of the instance.
         :raises ValueError: If conflicting options are provided.
         :raises ApiError: If API response status code is not as expected.
         :return: :class:`MatrixRoutingResponse` object.
@@ -1039,6 +1841,8 @@ class LS:
             raise ValueError("profile must be used with WorldRegion only.")
         if truck and transport_mode != "truck":
             raise ValueError("Truck option must be used when transport_mode is truck")
+        if stream and async_req is not True:
+            raise ValueError("stream can only be used when async_req is True")
         if async_req is True:
             resp = self.matrix_routing_api.matrix_route_async(
                 origins=origins,
@@ -1054,18 +1858,24 @@ class LS:
                 matrix_attributes=matrix_attributes,
             )
             status_url = resp["statusUrl"]
-            while True:
-                resp_status = self.matrix_routing_api.get_async_matrix_route_status(status_url)
-                if resp_status.status_code == 200 and resp_status.json().get("error"):
-                    raise ApiError(resp_status)
-                elif resp_status.status_code == 303:
-                    result_url = resp_status.json()["resultUrl"]
-                    break
-                elif resp_status.status_code in (401, 403, 404, 500):
-                    raise ApiError(resp_status)
-                sleep(2)
+            for iteration in itertools.count():
+                with span("LS.poll", iteration=iteration):
+                    resp_status = self.matrix_routing_api.get_async_matrix_route_status(status_url)
+                    if resp_status.status_code == 200 and resp_status.json().get("error"):
+                        raise ApiError(resp_status)
+                    elif resp_status.status_code == 303:
+                        result_url = resp_status.json()["resultUrl"]
+                        break
+                    elif resp_status.status_code in (401, 403, 404, 500):
+                        raise ApiError(resp_status)
+                    wait(2)
+            if stream:
+                resp_result = self.matrix_routing_api.get_async_matrix_route_results(
+                    result_url, stream=True
+                )
+                return self._decode(MatrixRoutingResponse, resp_result, parse=read_matrix_result)
             result = self.matrix_routing_api.get_async_matrix_route_results(result_url)
-            return MatrixRoutingResponse.new(result)
+            return self._decode(MatrixRoutingResponse, result)
         else:
             resp = self.matrix_routing_api.matrix_route(
                 origins=origins,
@@ -1080,4 +1890,4 @@ class LS:
                 truck=truck,
                 matrix_attributes=matrix_attributes,
             )
-            return MatrixRoutingResponse.new(resp)
+            return self._decode(MatrixRoutingResponse, resp)
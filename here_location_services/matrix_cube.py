@@ -0,0 +1,90 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains helpers of :meth:`LS.matrix_cube <here_location_services.ls.LS.matrix_cube>`
+to assemble the matrices of many departure times into one array of shape
+``(times, origins, destinations)``.
+
+Matrices larger than a tile are split into tiles of origins and destinations, each tile
+being a separate asynchronous matrix request. Cubes larger than a threshold are allocated
+as memory-mapped ``.npy`` files, which can be opened again with :func:`numpy.load`.
+"""
+
+import os
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+#: Size in bytes above which a cube is memory-mapped, 1 GiB.
+MEMMAP_THRESHOLD = 1 << 30
+
+#: Default maximum numbers of origins and destinations of one matrix request.
+TILE_SIZE = (10000, 10000)
+
+
+def tiles(origins: int, destinations: int, tile_size: Tuple[int, int]) -> Iterator[Tuple]:
+    """
+    Yield the tiles of a matrix as pairs of origin and destination slices.
+
+    :param origins: Number of origins.
+    :param destinations: Number of destinations.
+    :param tile_size: Maximum numbers of origins and destinations of a tile.
+    :raises ValueError: If a size of ``tile_size`` is not positive.
+    """
+    rows, columns = tile_size
+    if rows <= 0 or columns <= 0:
+        raise ValueError("tile_size must be positive.")
+    for row in range(0, origins, rows):
+        for column in range(0, destinations, columns):
+            yield (
+                slice(row, min(row + rows, origins)),
+                slice(column, min(column + columns, destinations)),
+            )
+
+
+def allocate(
+    shape: Tuple[int, int, int],
+    dtype: str = "float64",
+    path: Optional[str] = None,
+    memmap_threshold: int = MEMMAP_THRESHOLD,
+) -> np.ndarray:
+    """
+    Allocate a cube filled with NaN.
+
+    :param shape: The shape of the cube.
+    :param dtype: A floating point dtype.
+    :param path: The path of a ``.npy`` file to memory-map the cube to.
+    :param memmap_threshold: Size in bytes above which a cube without ``path`` is
+        memory-mapped to a temporary ``.npy`` file. The file is not deleted, its path is
+        the ``filename`` of the returned :class:`numpy.memmap`.
+    :return: A :class:`numpy.ndarray`, or a :class:`numpy.memmap` if memory-mapped.
+    """
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if path is None and size > memmap_threshold:
+        fd, path = tempfile.mkstemp(suffix=".npy", prefix="matrix-cube-")
+        os.close(fd)
+    if path is None:
+        return np.full(shape, np.nan, dtype=dtype)
+    cube = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    cube[:] = np.nan
+    return cube
+
+
+def matrix_values(matrix: dict, attribute: str) -> np.ndarray:
+    """
+    Return an attribute of a matrix routing result as a 2-D array.
+
+    Entries with an error code are NaN.
+
+    :param matrix: The ``matrix`` of a matrix routing result.
+    :param attribute: ``travelTimes`` or ``distances``.
+    :return: A float64 array of shape ``(numOrigins, numDestinations)``.
+    """
+    shape = (matrix["numOrigins"], matrix["numDestinations"])
+    values = np.array(matrix[attribute], dtype="float64").reshape(shape)
+    error_codes = matrix.get("errorCodes")
+    if error_codes is not None and len(error_codes):
+        values[np.asarray(error_codes).reshape(shape) != 0] = np.nan
+    return values
@@ -18,7 +18,9 @@ from .config.matrix_routing_config import (
     PolygonRegion,
     WorldRegion,
 )
+from .deadline import DEFAULT_TIMEOUT, Timeout
 from .exceptions import ApiError
+from .transport import Transport
 
 
 class MatrixRoutingApi(Api):
@@ -30,8 +32,17 @@ class MatrixRoutingApi(Api):
         auth: Optional[Auth] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
-        super().__init__(api_key, auth=auth, proxies=proxies, country=country)
+        super().__init__(
+            api_key,
+            auth=auth,
+            proxies=proxies,
+            country=country,
+            timeout=timeout,
+            transport=transport,
+        )
         self._base_url = f"https://matrix.router.{self._get_url_string()}"
 
     def __send_post_request(
@@ -232,9 +243,20 @@ class MatrixRoutingApi(Api):
         """Get the status of async matrix calculation for the provided status url."""
         return self.get(status_url, allow_redirects=False)
 
-    def get_async_matrix_route_results(self, result_url: str) -> requests.Response:
-        """Get the results of async matrix calculation for the provided result url."""
-        resp = self.get(result_url)
+    def get_async_matrix_route_results(self, result_url: str, stream: bool = False):
+        """Get the results of async matrix calculation for the provided result url.
+
+        :param result_url: A string to represent result url of async matrix calculation.
+        :param stream: If set to True the response body is not downloaded and the
+            :class:`requests.Response` object is returned to be parsed incrementally with
+            :func:`here_location_services.streaming.read_matrix_result`.
+        :return: A dict of the results or :class:`requests.Response` object if ``stream``
+            is True.
+        :raises ApiError: If ``status_code`` of API response is not 200.
+        """
+        resp = self.get(result_url, stream=stream)
         if resp.status_code != 200:
             raise ApiError(resp)
+        if stream:
+            return resp
         return resp.json()
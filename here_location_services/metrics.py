@@ -0,0 +1,268 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the :class:`Metrics` class to export client traffic metrics.
+
+Metrics are collected from the :mod:`request lifecycle hooks <here_location_services.hooks>`
+of one or more :class:`LS <here_location_services.ls.LS>` instances, labelled with a
+``service`` name, and rendered in the Prometheus text exposition format. They can be served
+from a local HTTP endpoint or written to a file, e.g. for the textfile collector of the
+Prometheus node exporter.
+
+Example::
+
+    metrics = Metrics()
+    metrics.attach(ls, service="checkout")
+    metrics.serve(port=9464)
+"""
+
+import os
+import tempfile
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+from here_location_services.hooks import DEFAULT_BUCKETS, Histogram, RequestEvent
+
+#: Default upper bounds in bytes of the buckets of payload size histograms.
+SIZE_BUCKETS = (100.0, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+#: Content type of the Prometheus text exposition format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_COUNTERS = {
+    "requests": "Number of requests sent.",
+    "errors": "Number of failed requests by HTTP status, or exception type without response.",
+    "cache_hits": "Number of requests served from a cache.",
+    "retries": "Number of requests sent again, e.g. hedged requests.",
+    "throttles": "Number of requests throttled with HTTP status 429.",
+    "async_polls": "Number of status requests polling async jobs.",
+}
+
+_HISTOGRAMS = {
+    "request_duration_seconds": "Duration of requests including response parsing.",
+    "request_size_bytes": "Size of request bodies.",
+    "response_size_bytes": "Size of response bodies.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Counters and histograms of the requests of :class:`LS` instances."""
+
+    def __init__(
+        self,
+        namespace: str = "here_location_services",
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        size_buckets: Tuple[float, ...] = SIZE_BUCKETS,
+    ):
+        """
+        Instantiate the metrics.
+
+        :param namespace: The prefix of all metric names.
+        :param buckets: Sorted upper bounds in seconds of the buckets of duration histograms.
+        :param size_buckets: Sorted upper bounds in bytes of the buckets of size histograms.
+        """
+        self.namespace = namespace
+        self.buckets = buckets
+        self.size_buckets = size_buckets
+        self._counters: Dict[str, Dict[Labels, float]] = {name: {} for name in _COUNTERS}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {name: {} for name in _HISTOGRAMS}
+        self._lock = threading.Lock()
+        _metrics.add(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        _metrics.add(self)
+
+    def _after_fork(self):
+        # A lock held by another thread at the time of the fork is never released.
+        self._lock = threading.Lock()
+
+    def attach(self, ls, service: str = "default"):
+        """
+        Collect the metrics of the requests of ``ls``.
+
+        :param ls: An :class:`LS <here_location_services.ls.LS>` instance.
+        :param service: The value of the ``service`` label of its metrics.
+        """
+        ls.hooks.on_response(lambda event: self.observe_response(event, service))
+        ls.hooks.on_error(lambda event: self.observe_error(event, service))
+        ls.hooks.on_retry(lambda event: self.observe_retry(event, service))
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1):
+        """
+        Increment a counter.
+
+        :param name: One of ``requests``, ``errors``, ``cache_hits``, ``retries``,
+            ``throttles`` or ``async_polls``.
+        :param labels: The labels of the counter.
+        :param value: The increment.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counter = self._counters[name]
+            counter[key] = counter.get(key, 0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float):
+        """
+        Add ``value`` to a histogram.
+
+        :param name: One of ``request_duration_seconds``, ``request_size_bytes`` or
+            ``response_size_bytes``.
+        :param labels: The labels of the histogram.
+        :param value: The observed value.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histograms = self._histograms[name]
+            if key not in histograms:
+                buckets = self.buckets if name.endswith("_seconds") else self.size_buckets
+                histograms[key] = Histogram(buckets)
+            histograms[key].observe(value)
+
+    def record_cache_hit(self, endpoint: str, service: str = "default"):
+        """Count a request to ``endpoint`` which was served from a cache."""
+        self.inc("cache_hits", {"service": service, "endpoint": endpoint})
+
+    def _observe_request(self, event: RequestEvent, service: str):
+        labels = {"service": service, "endpoint": event.endpoint}
+        self.inc("requests", dict(labels, method=event.method))
+        if event.endpoint == "status" or event.endpoint.endswith(".status"):
+            self.inc("async_polls", labels)
+        if event.timings["total"] is not None:
+            self.observe("request_duration_seconds", labels, event.timings["total"])
+        self.observe("request_size_bytes", labels, event.bytes_sent)
+
+    def observe_response(self, event: RequestEvent, service: str = "default"):
+        """Record an ``on_response`` event."""
+        self._observe_request(event, service)
+        labels = {"service": service, "endpoint": event.endpoint}
+        if event.bytes_received is not None:
+            self.observe("response_size_bytes", labels, event.bytes_received)
+        if event.status_code is not None and event.status_code >= 400:
+            self.inc("errors", dict(labels, status=str(event.status_code)))
+        if event.status_code == 429:
+            self.inc("throttles", labels)
+
+    def observe_error(self, event: RequestEvent, service: str = "default"):
+        """Record an ``on_error`` event."""
+        self._observe_request(event, service)
+        status = type(event.error).__name__ if event.error is not None else "unknown"
+        self.inc("errors", {"service": service, "endpoint": event.endpoint, "status": status})
+
+    def observe_retry(self, event: RequestEvent, service: str = "default"):
+        """Record an ``on_retry`` event."""
+        self.inc("retries", {"service": service, "endpoint": event.endpoint})
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, help_text in _COUNTERS.items():
+                metric = f"{self.namespace}_{name}_total"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+            for name, help_text in _HISTOGRAMS.items():
+                metric = f"{self.namespace}_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    bounds = histogram.buckets + (float("inf"),)
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        bucket_labels = labels + (("le", _format_value(bound)),)
+                        lines.append(
+                            f"{metric}_bucket{_format_labels(bucket_labels)} {cumulative}"
+                        )
+                    lines.append(
+                        f"{metric}_sum{_format_labels(labels)} {_format_value(histogram.sum)}"
+                    )
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Write all metrics to the file ``path``.
+
+        The file is replaced atomically, so readers never see a partially written file.
+
+        :param path: The path of the file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve all metrics at ``http://{host}:{port}/metrics`` from a daemon thread.
+
+        :param port: The port to listen on, ``0`` for any free port.
+        :param host: The address to listen on.
+        :return: The server, call its ``shutdown`` method to stop it.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+_metrics: "weakref.WeakSet[Metrics]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for metrics in list(_metrics):
+        metrics._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
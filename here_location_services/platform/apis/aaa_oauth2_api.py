@@ -15,7 +15,9 @@ from typing import Dict, Optional
 
 from requests_oauthlib import OAuth1
 
+from here_location_services.deadline import DEFAULT_TIMEOUT, Timeout
 from here_location_services.platform.apis.api import Api
+from here_location_services.transport import Transport
 
 
 class AAAOauth2Api(Api):
@@ -27,12 +29,16 @@ class AAAOauth2Api(Api):
         self,
         base_url: str,
         proxies: Optional[dict] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
         self.base_url = base_url
         self.proxies: Optional[Dict] = proxies
         super().__init__(
             access_token=None,
             proxies=self.proxies,
+            timeout=timeout,
+            transport=transport,
         )
 
     def request_scoped_access_token(self, oauth: OAuth1, data: str) -> Dict:  # type: ignore[return]  # noqa E501
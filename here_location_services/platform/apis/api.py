@@ -8,16 +8,38 @@ from typing import Optional, Union
 
 import requests
 
-from here_location_services.exceptions import AuthenticationException, TooManyRequestsException
+from here_location_services.deadline import (
+    DEFAULT_TIMEOUT,
+    UNSET,
+    Timeout,
+    current_deadline,
+    resolve_timeout,
+)
+from here_location_services.exceptions import (
+    AuthenticationException,
+    DeadlineExceededException,
+    TooManyRequestsException,
+)
+from here_location_services.transport import Transport
 
 
 class Api:
     """Base class for low level api calls."""
 
-    def __init__(self, access_token, proxies: Optional[dict] = None):
+    def __init__(
+        self,
+        access_token,
+        proxies: Optional[dict] = None,
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
+    ):
         self.access_token = access_token
         self._user_agent = "dhpy"
         self.proxies: Optional[dict] = proxies or urllib.request.getproxies()
+        self.timeout = timeout
+        #: An optional :class:`Transport <here_location_services.transport.Transport>`
+        #: sending the requests, by default :func:`requests.post` is used.
+        self.transport = transport
 
     @property
     def headers(self) -> dict:
@@ -46,27 +68,32 @@ class Api:
         :param headers: Request headers. Defaults to the api headers property.
         :param kwargs: Optional arguments that request takes.
         :return: response from the API.
+        :raises DeadlineExceededException: If the active deadline expires.
         """
         headers = headers or self.headers
         headers["User-Agent"] = self._user_agent
+        kwargs["timeout"] = resolve_timeout(kwargs.get("timeout", UNSET), self.timeout)
         if isinstance(data, dict) or isinstance(data, list):
-            return requests.post(
-                url,
-                headers=headers,
-                json=data,
-                params=params,
-                proxies=self.proxies,
-                **kwargs,
-            )
+            kwargs["json"] = data
         else:
+            kwargs["data"] = data
+        try:
+            if self.transport is not None:
+                return self.transport.request(
+                    "POST", url, headers=headers, params=params, proxies=self.proxies, **kwargs
+                )
             return requests.post(
                 url,
                 headers=headers,
-                data=data,
                 params=params,
                 proxies=self.proxies,
                 **kwargs,
             )
+        except requests.Timeout as exc:
+            deadline = current_deadline()
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceededException(deadline.seconds) from exc
+            raise
 
     @staticmethod
     def raise_response_exception(resp: requests.Response) -> None:
@@ -10,6 +10,9 @@ refreshed, too.
 """
 
 
+import os
+import threading
+import weakref
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -17,6 +20,7 @@ from requests_oauthlib import OAuth1
 
 from here_location_services.platform.apis.aaa_oauth2_api import AAAOauth2Api
 from here_location_services.platform.credentials import PlatformCredentials
+from here_location_services.tracing import span
 
 
 class Auth:
@@ -24,6 +28,9 @@ class Auth:
     This class is responsible for authenticating with the HERE platform.
 
     It requires PlatformCredentials, AAAOauth2BaseApi object.
+
+    A still valid token is kept when the instance is inherited by a forked child process or
+    pickled, so that child processes do not need to request a token of their own.
     """
 
     def __init__(self, credentials: PlatformCredentials, aaa_oauth2_api: AAAOauth2Api):
@@ -43,16 +50,32 @@ class Auth:
         self._token_requested_at: Optional[datetime] = None
         self._token_expires_at: Optional[datetime] = None
         self._scope: Optional[str] = None
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        _instances.add(self)
 
     @property
     def token(self) -> Optional[str]:
         """
         Return the current token or requests a new one if needed.
 
+        Concurrent callers wait for a single token refresh.
+
         :return: a valid token
         """
         if not self.token_still_valid():
-            self.generate_token()
+            with self._lock:
+                if not self.token_still_valid():
+                    self.generate_token()
         return self._token
 
     def token_still_valid(self) -> bool:
@@ -74,9 +97,10 @@ class Auth:
             client_secret=self.credentials.cred_properties["secret"],
             signature_method="HMAC-SHA256",
         )
-        response_json = self.aaa_oauth2_api.request_scoped_access_token(
-            oauth, data="grant_type=client_credentials"
-        )
+        with span("Auth.generate_token"):
+            response_json = self.aaa_oauth2_api.request_scoped_access_token(
+                oauth, data="grant_type=client_credentials"
+            )
 
         self._token = response_json.get("access_token")
         self._token_type = response_json.get("token_type")
@@ -85,3 +109,16 @@ class Auth:
         self._token_expires_at = self._token_requested_at + timedelta(
             seconds=self._token_expires_in
         )
+
+
+_instances: "weakref.WeakSet[Auth]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    # A lock held by another thread of the parent at fork time would never be released.
+    for auth in list(_instances):
+        auth._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -8,9 +8,27 @@ This module contains classes for accessing the responses from Location Services
 import json
 
 import flexpolyline as fp
-from geojson import Feature, FeatureCollection, LineString, Point, Polygon
+import numpy as np
+from geojson import Feature, FeatureCollection, LineString, MultiPolygon, Point
 from pandas import DataFrame
 
+from .isolines import (
+    close_ring,
+    decode_polygons,
+    isoline_grids,
+    smallest_range,
+    to_shapely,
+    to_wkb,
+)
+from .route_tables import route_coordinates, route_table
+
+
+def _json_default(obj):
+    """Serialize :class:`numpy.ndarray` values of streamed responses as lists."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 
 class ApiResponse:
     """Base class for all the responses from Location Services RESTful APIs."""
@@ -24,9 +42,9 @@ class ApiResponse:
 
     def as_json_string(self, encoding: str = "utf8"):
         """Return API response as json string."""
-        json_string = json.dumps(self.response, sort_keys=True, ensure_ascii=False).encode(
-            encoding
-        )
+        json_string = json.dumps(
+            self.response, sort_keys=True, ensure_ascii=False, default=_json_default
+        ).encode(encoding)
         return json_string.decode()
 
     def to_geojson(self):
@@ -82,19 +100,58 @@ class IsolineResponse(ApiResponse):
         }
         for param, default in self._filters.items():
             setattr(self, param, kwargs.get(param, default))
+        self._polygons = None
+        self._grids = None
 
     def to_geojson(self):
-        """Return API response as GeoJSON."""
+        """Return API response as GeoJSON, with a ``MultiPolygon`` feature per range."""
         feature_collection = FeatureCollection([])
-        for isoline in self.response["isolines"]:
-            for polygon in isoline["polygons"]:
-                polyline = polygon["outer"]
-                lstring = fp.decode(polyline)
-                lstring = [(coord[1], coord[0]) for coord in lstring]
-                f = Feature(geometry=Polygon([lstring]), properties={"range": isoline["range"]})
-                feature_collection.features.append(f)
+        for isoline, polygons in zip(self.response["isolines"], self.to_polygons()):
+            coordinates = [[close_ring(ring).tolist() for ring in polygon] for polygon in polygons]
+            f = Feature(geometry=MultiPolygon(coordinates), properties={"range": isoline["range"]})
+            feature_collection.features.append(f)
         return feature_collection
 
+    def to_polygons(self):
+        """
+        Return the polygons of each isoline, decoded once per response.
+
+        :return: A list with a list of polygons per isoline, each polygon being a list of
+            ``(lng, lat)`` arrays of the outer ring followed by its holes.
+        """
+        if self._polygons is None:
+            self._polygons = [decode_polygons(isoline) for isoline in self.isolines or []]
+        return self._polygons
+
+    def to_shapely(self):
+        """
+        Return a shapely ``MultiPolygon`` per isoline, with holes.
+
+        :return: An array of :class:`shapely.MultiPolygon` objects.
+        :raises ImportError: If shapely 2 is not installed.
+        """
+        return to_shapely(self.to_polygons())
+
+    def to_wkb(self):
+        """Return a WKB ``MultiPolygon`` per isoline, with holes."""
+        return to_wkb(self.to_polygons())
+
+    def contains(self, lats, lngs):
+        """
+        Return the smallest range of the isolines containing each point.
+
+        The rings of the isolines are decoded and indexed once per response. Holes are
+        respected with the even-odd rule.
+
+        :param lats: An array of latitudes.
+        :param lngs: An array of longitudes of the same shape.
+        :return: A float64 array of range values, NaN for points outside of all isolines.
+        """
+        if self._grids is None:
+            ranges = [isoline["range"]["value"] for isoline in self.isolines or []]
+            self._grids = isoline_grids(ranges, self.to_polygons())
+        return smallest_range(self._grids, lats, lngs)
+
 
 class DiscoverResponse(ApiResponse):
     """A class representing the search discover API response data."""
@@ -147,6 +204,55 @@ class RoutingResponse(ApiResponse):
                 feature_collection.features.append(f)
         return feature_collection
 
+    def to_frame(self, table: str = "sections") -> DataFrame:
+        """
+        Return a table of the sections, spans or actions of all routes.
+
+        See :mod:`here_location_services.route_tables` for the columns of the tables.
+
+        :param table: ``sections``, ``spans`` or ``actions``.
+        :return: A DataFrame keyed by ``route_id`` and ``section_id``.
+        :raises ValueError: If ``table`` is unknown.
+        """
+        return route_table(self.response["routes"], table)
+
+    def to_coordinates(self):
+        """
+        Return the coordinates of all sections in one array, with the offsets of sections.
+
+        The coordinates of the ``i``-th row of :meth:`to_frame` are
+        ``coordinates[offsets[i]:offsets[i + 1]]``.
+
+        :return: A tuple of an array of shape ``(n, 3)`` of ``(lng, lat, elevation)`` and an
+            array of offsets.
+        """
+        return route_coordinates(self.response["routes"])
+
+    def to_arrow(self, table: str = "sections", geometry: bool = True):
+        """
+        Return a table of the sections, spans or actions of all routes as a
+        :class:`pyarrow.Table`.
+
+        :param table: ``sections``, ``spans`` or ``actions``.
+        :param geometry: If True, the table of sections has a ``geometry`` column of lists of
+            ``[lng, lat, elevation]`` sharing the buffers of :meth:`to_coordinates`.
+        :return: A :class:`pyarrow.Table`.
+        :raises ImportError: If pyarrow is not installed.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError(
+                "to_arrow requires pyarrow, pip install here-location-services[arrow]."
+            )
+        arrow_table = pa.Table.from_pandas(self.to_frame(table), preserve_index=False)
+        if table == "sections" and geometry:
+            coordinates, offsets = self.to_coordinates()
+            points = pa.FixedSizeListArray.from_arrays(pa.array(coordinates.ravel()), 3)
+            lines = pa.ListArray.from_arrays(pa.array(offsets.astype("int32")), points)
+            arrow_table = arrow_table.append_column("geometry", lines)
+        return arrow_table
+
 
 class MatrixRoutingResponse(ApiResponse):
     """A class representing Matrix routing response data."""
@@ -161,25 +267,25 @@ class MatrixRoutingResponse(ApiResponse):
         """Return API response as GeoJSON."""
         raise NotImplementedError("This method is not valid for MatrixRoutingResponse.")
 
+    def _to_matrix(self, attribute):
+        if not self.matrix:
+            return None
+        values = self.matrix.get(attribute)
+        if values is None or len(values) == 0:
+            return None
+        dest_count = self.matrix.get("numDestinations")
+        if isinstance(values, np.ndarray):
+            return DataFrame(values.reshape(-1, dest_count), columns=range(dest_count))
+        nested_values = [values[i : i + dest_count] for i in range(0, len(values), dest_count)]
+        return DataFrame(nested_values, columns=range(dest_count))
+
     def to_distnaces_matrix(self):
         """Return distnaces matrix in a dataframe."""
-        if self.matrix and self.matrix.get("distances"):
-            distances = self.matrix.get("distances")
-            dest_count = self.matrix.get("numDestinations")
-            nested_distances = [
-                distances[i : i + dest_count] for i in range(0, len(distances), dest_count)
-            ]
-            return DataFrame(nested_distances, columns=range(dest_count))
+        return self._to_matrix("distances")
 
     def to_travel_times_matrix(self):
         """Return travel times matrix in a dataframe."""
-        if self.matrix and self.matrix.get("travelTimes"):
-            distances = self.matrix.get("travelTimes")
-            dest_count = self.matrix.get("numDestinations")
-            nested_distances = [
-                distances[i : i + dest_count] for i in range(0, len(distances), dest_count)
-            ]
-            return DataFrame(nested_distances, columns=range(dest_count))
+        return self._to_matrix("travelTimes")
 
 
 class AutosuggestResponse(ApiResponse):
@@ -0,0 +1,169 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module flattens the routes of a routing response into columnar tables.
+
+There is a table of sections, one of spans and one of actions, each keyed by ``route_id``
+and ``section_id``, i.e. the positions of the route in the response and of the section in
+its route. Columns of known fields have fixed dtypes, any other scalar or nested field of
+spans and actions is added with its name in snake case.
+
+The geometry of the sections is not part of the tables. It is decoded into one array of
+``(lng, lat, elevation)`` coordinates with an array of offsets, so that the coordinates of
+the ``i``-th section are ``coordinates[offsets[i]:offsets[i + 1]]``. The ``offset`` of a span
+or an action is relative to the start of its section.
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+import flexpolyline as fp
+import numpy as np
+import pandas as pd
+
+#: Tables of :func:`route_table` and their columns of known fields with their dtypes.
+TABLES: Dict[str, Dict[str, str]] = {
+    "sections": {
+        "route_id": "int32",
+        "section_id": "int32",
+        "id": "string",
+        "type": "category",
+        "transport_mode": "category",
+        "departure_time": "datetime64[ns, UTC]",
+        "departure_lat": "float64",
+        "departure_lng": "float64",
+        "arrival_time": "datetime64[ns, UTC]",
+        "arrival_lat": "float64",
+        "arrival_lng": "float64",
+        "duration": "float64",
+        "base_duration": "float64",
+        "typical_duration": "float64",
+        "length": "float64",
+        "span_count": "int32",
+        "action_count": "int32",
+    },
+    "spans": {
+        "route_id": "int32",
+        "section_id": "int32",
+        "span_id": "int32",
+        "offset": "Int64",
+        "length": "float64",
+        "duration": "float64",
+    },
+    "actions": {
+        "route_id": "int32",
+        "section_id": "int32",
+        "action_id": "int32",
+        "action": "category",
+        "offset": "Int64",
+        "length": "float64",
+        "duration": "float64",
+        "direction": "category",
+        "severity": "category",
+        "instruction": "string",
+    },
+}
+
+
+def snake_case(name: str) -> str:
+    """Return the camel case ``name`` of a field in snake case."""
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _section_row(route_id: int, section_id: int, section: Dict[str, Any]) -> Dict[str, Any]:
+    summary = section.get("travelSummary") or section.get("summary") or {}
+    row = {
+        "route_id": route_id,
+        "section_id": section_id,
+        "id": section.get("id"),
+        "type": section.get("type"),
+        "transport_mode": (section.get("transport") or {}).get("mode"),
+        "duration": summary.get("duration"),
+        "base_duration": summary.get("baseDuration"),
+        "typical_duration": summary.get("typicalDuration"),
+        "length": summary.get("length"),
+        "span_count": len(section.get("spans") or []),
+        "action_count": len(section.get("actions") or []),
+    }
+    for end in ("departure", "arrival"):
+        event = section.get(end) or {}
+        location = (event.get("place") or {}).get("location") or {}
+        row[f"{end}_time"] = event.get("time")
+        row[f"{end}_lat"] = location.get("lat")
+        row[f"{end}_lng"] = location.get("lng")
+    return row
+
+
+def _item_rows(
+    route_id: int, section_id: int, items: List[Dict[str, Any]], key: str
+) -> List[Dict[str, Any]]:
+    rows = []
+    for item_id, item in enumerate(items):
+        row = {"route_id": route_id, "section_id": section_id, key: item_id}
+        row.update((snake_case(name), value) for name, value in item.items())
+        rows.append(row)
+    return rows
+
+
+def _frame(rows: List[Dict[str, Any]], dtypes: Dict[str, str]) -> pd.DataFrame:
+    names = list(dtypes)
+    for row in rows:
+        names.extend(name for name in row if name not in dtypes and name not in names)
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        dtype = dtypes.get(name)
+        if dtype is not None and dtype.startswith("datetime64"):
+            columns[name] = pd.Series(pd.to_datetime(values, utc=True), dtype=dtype)
+        elif dtype is not None:
+            columns[name] = pd.Series(values, dtype=dtype)
+        else:
+            columns[name] = pd.Series(values, dtype=object).infer_objects()
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(rows)))
+
+
+def route_table(routes: List[Dict[str, Any]], table: str) -> pd.DataFrame:
+    """
+    Flatten ``routes`` into one of the tables of :data:`TABLES`.
+
+    :param routes: The ``routes`` of a routing response.
+    :param table: ``sections``, ``spans`` or ``actions``.
+    :return: A DataFrame.
+    :raises ValueError: If ``table`` is unknown.
+    """
+    if table not in TABLES:
+        raise ValueError(f"table must be one of {', '.join(TABLES)}.")
+    rows: List[Dict[str, Any]] = []
+    for route_id, route in enumerate(routes or []):
+        for section_id, section in enumerate(route.get("sections") or []):
+            if table == "sections":
+                rows.append(_section_row(route_id, section_id, section))
+            else:
+                items = section.get(table) or []
+                rows.extend(_item_rows(route_id, section_id, items, f"{table[:-1]}_id"))
+    return _frame(rows, TABLES[table])
+
+
+def route_coordinates(routes: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode the polylines of all sections of ``routes`` into one array of coordinates.
+
+    :param routes: The ``routes`` of a routing response.
+    :return: A tuple of a float64 array of shape ``(n, 3)`` with ``(lng, lat, elevation)``
+        coordinates, the elevation is NaN if the polyline has none, and an int64 array of
+        offsets of the sections with one more item than there are sections.
+    """
+    coordinates: List[Tuple[float, float, float]] = []
+    offsets = [0]
+    for route in routes or []:
+        for section in route.get("sections") or []:
+            polyline = section.get("polyline")
+            if polyline:
+                coordinates.extend(
+                    (point[1], point[0], point[2] if len(point) > 2 else np.nan)
+                    for point in fp.decode(polyline)
+                )
+            offsets.append(len(coordinates))
+    array = np.array(coordinates, dtype="float64").reshape(-1, 3)
+    return array, np.array(offsets, dtype="int64")
@@ -0,0 +1,147 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the :class:`SingleFlight` class to coalesce identical in-flight requests.
+
+When several threads send the same request at the same time, only the first one, the leader,
+sends it over the network. The others wait for the leader and receive the same
+:class:`requests.Response` object, or the same exception. The JSON body of a shared response
+is decoded once, :meth:`requests.Response.json` returns the same decoded object to all
+threads. Shared responses and their decoded bodies must hence be treated as read-only.
+Nothing is kept once the leader has finished, so this is not a cache: a request sent after
+the previous one has completed is sent again.
+
+Coalescing is enabled with ``LS(coalesce=True)``.
+"""
+
+import json
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import requests
+
+from here_location_services.deadline import current_deadline
+from here_location_services.exceptions import DeadlineExceededException
+
+
+class _Call:
+    """A request in flight."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """A group of requests in which identical concurrent requests share one call."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        #: Number of calls which were served by the call of another thread.
+        self.shared = 0
+        _groups.add(self)
+
+    def __getstate__(self):
+        return {"shared": self.shared}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.shared = state["shared"]
+
+    def _after_fork(self):
+        # The leaders of calls in flight do not exist in a forked child process.
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Call ``fn`` unless a call with the same ``key`` is in flight, then wait for its result.
+
+        :param key: The key identifying identical calls.
+        :param fn: The function to call without arguments.
+        :return: The result of ``fn`` or of the call in flight.
+        :raises DeadlineExceededException: If the active deadline expires while waiting.
+        """
+        with self._lock:
+            waiting = self._calls.get(key)
+            if waiting is None:
+                call = self._calls[key] = _Call()
+            else:
+                waiting.waiters += 1
+                self.shared += 1
+        if waiting is not None:
+            deadline = current_deadline()
+            if not waiting.done.wait(None if deadline is None else deadline.remaining()):
+                raise DeadlineExceededException(deadline.seconds)  # type: ignore
+            if waiting.error is not None:
+                raise waiting.error
+            return waiting.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters and isinstance(call.result, requests.Response):
+                _decode_once(call.result)
+            call.done.set()
+
+
+def _decode_once(resp: requests.Response):
+    """Make :meth:`requests.Response.json` of ``resp`` decode the body only once."""
+    decode = resp.json
+    lock = threading.Lock()
+    decoded: Dict[str, Any] = {}
+
+    def json(**kwargs):
+        if kwargs:
+            return decode(**kwargs)
+        with lock:
+            if "body" not in decoded:
+                decoded["body"] = decode()
+        return decoded["body"]
+
+    resp.json = json  # type: ignore
+
+
+def request_key(
+    method: str,
+    url: str,
+    params: Optional[Dict] = None,
+    data: Any = None,
+    headers: Optional[Dict] = None,
+) -> str:
+    """
+    Return the key identifying a fully built request.
+
+    :param method: HTTP method, e.g. ``GET`` or ``POST``.
+    :param url: A string to represent URL.
+    :param params: An optional dict for query params.
+    :param data: An optional JSON body.
+    :param headers: An optional dict of headers.
+    :return: A string.
+    """
+    return json.dumps(
+        [method, url, params or {}, data, headers or {}], sort_keys=True, default=str
+    )
+
+
+_groups: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for group in list(_groups):
+        group._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,332 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains helpers to parse large JSON responses incrementally.
+
+The helpers consume the body of a :class:`requests.Response` requested with
+``stream=True`` chunk by chunk and only ever hold one array element (e.g. a single tour)
+or one chunk of numbers in memory, instead of the whole response body and its complete
+Python object tree.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import requests
+
+#: Size of the chunks in bytes read from streamed responses.
+CHUNK_SIZE = 64 * 1024
+
+#: Keys of the numeric arrays in the ``matrix`` object of matrix routing results.
+MATRIX_ARRAYS = ("travelTimes", "distances", "errorCodes")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]+")
+_STRING_TAIL = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(r"[^,:\]}\s]+")
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+
+Path = Tuple[str, ...]
+Chunks = Union[requests.Response, Iterable[Union[bytes, str]]]
+
+
+class _JsonStream:
+    """An incremental JSON scanner which walks a document only along requested paths.
+
+    Paths are tuples of object keys; array indices are not part of a path. Arrays found
+    at one of the ``items`` paths are emitted element by element, arrays found at one of
+    the ``numeric`` paths are emitted as chunks of :class:`numpy.ndarray`. Scalar values
+    of objects on the way to these arrays are emitted as well, everything else is skipped
+    without being decoded.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[Union[bytes, str]],
+        items: Iterable[Path] = (),
+        numeric: Iterable[Path] = (),
+    ):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._items: Set[Path] = set(items)
+        self._numeric: Set[Path] = set(numeric)
+        self._prefixes: Set[Path] = {
+            path[:i] for path in self._items | self._numeric for i in range(len(path))
+        }
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer and drop the consumed part of it."""
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            chunk = self._utf8.decode(b"", final=True)
+        else:
+            if isinstance(chunk, bytes):
+                chunk = self._utf8.decode(chunk)
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _need_more(self):
+        if not self._fill():
+            raise ValueError("Unexpected end of JSON stream.")
+
+    def _peek(self) -> str:
+        while True:
+            whitespace = _WHITESPACE.match(self._buf, self._pos)
+            if whitespace:
+                self._pos = whitespace.end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            self._need_more()
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at position {self._pos} of JSON stream.")
+        self._pos += 1
+
+    def _value_end(self) -> int:
+        """Return the end index of the value starting at the current position."""
+        offset = 0
+        depth = 0
+        while True:
+            i = self._pos + offset
+            char = self._buf[i] if depth == 0 else ""
+            if depth == 0 and char not in '[{"':
+                match = _SCALAR.match(self._buf, i)
+                if not match:
+                    raise ValueError(f"Unexpected {char!r} at position {i} of JSON stream.")
+                if match.end() < len(self._buf) or self._eof:
+                    return match.end()
+            elif depth == 0 and char == '"':
+                match = _STRING_TAIL.match(self._buf, i + 1)
+                if match:
+                    return match.end()
+            else:
+                while True:
+                    match = _STRUCTURAL.search(self._buf, i)
+                    if not match:
+                        offset = len(self._buf) - self._pos
+                        break
+                    char = match.group()
+                    if char == '"':
+                        tail = _STRING_TAIL.match(self._buf, match.end())
+                        if not tail:
+                            offset = match.start() - self._pos
+                            break
+                        i = tail.end()
+                        continue
+                    i = match.end()
+                    depth += 1 if char in "[{" else -1
+                    if depth == 0:
+                        return i
+            self._need_more()
+
+    def _read_value(self) -> Any:
+        self._peek()
+        end = self._value_end()
+        value = json.loads(self._buf[self._pos : end])
+        self._pos = end
+        return value
+
+    def _read_key(self) -> str:
+        if self._peek() != '"':
+            raise ValueError(f"Expected an object key at position {self._pos} of JSON stream.")
+        return self._read_value()
+
+    def _skip_value(self):
+        self._peek()
+        self._pos = self._value_end()
+
+    def _read_numbers(self) -> Iterator[np.ndarray]:
+        """Emit the numbers of the array opened at the current position in chunks."""
+        while True:
+            end = self._buf.find("]", self._pos)
+            stop = end if end != -1 else self._buf.rfind(",", self._pos)
+            if stop > self._pos and not self._buf[self._pos : stop].isspace():
+                values = self._buf[self._pos : stop].split(",")
+                try:
+                    yield np.array(values, dtype=np.float64)
+                except ValueError:
+                    yield np.array(
+                        [np.nan if v.strip() == "null" else float(v) for v in values],
+                        dtype=np.float64,
+                    )
+            if end != -1:
+                self._pos = end + 1
+                return
+            if stop > self._pos:
+                self._pos = stop + 1
+            self._need_more()
+
+    def walk(self, path: Path = ()) -> Iterator[Tuple[str, Path, Any]]:
+        """Yield ``(kind, path, value)`` events for the value at the current position.
+
+        ``kind`` is one of ``"item"`` for an element of an ``items`` array, ``"numbers"``
+        for a chunk of a ``numeric`` array and ``"value"`` for any other emitted value.
+        """
+        char = self._peek()
+        if char == "{" and path in self._prefixes:
+            self._pos += 1
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            while True:
+                key = self._read_key()
+                self._expect(":")
+                yield from self.walk(path + (key,))
+                char = self._peek()
+                self._pos += 1
+                if char == "}":
+                    return
+                if char != ",":
+                    raise ValueError(f"Expected ',' or '}}' at position {self._pos - 1}.")
+        elif char == "[" and path in self._numeric:
+            self._pos += 1
+            for chunk in self._read_numbers():
+                yield "numbers", path, chunk
+        elif char == "[" and path in self._items:
+            self._pos += 1
+            if self._peek() == "]":
+                self._pos += 1
+                return
+            while True:
+                yield "item", path, self._read_value()
+                char = self._peek()
+                self._pos += 1
+                if char == "]":
+                    return
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' at position {self._pos - 1}.")
+        elif char in "[{":
+            self._skip_value()
+        else:
+            yield "value", path, self._read_value()
+
+
+def _iter_chunks(source: Chunks, chunk_size: int = CHUNK_SIZE) -> Iterator[Union[bytes, str]]:
+    if isinstance(source, requests.Response):
+        try:
+            yield from source.iter_content(chunk_size=chunk_size)
+        finally:
+            source.close()
+    else:
+        yield from source
+
+
+def iter_json_items(
+    source: Chunks, path: Sequence[str], chunk_size: int = CHUNK_SIZE
+) -> Iterator[Any]:
+    """Parse ``source`` incrementally and yield the elements of the array at ``path``.
+
+    :param source: A :class:`requests.Response` requested with ``stream=True`` or an
+        iterable of ``bytes`` or ``str`` chunks of a JSON document.
+    :param path: A sequence of object keys leading to an array, e.g. ``("tours",)``.
+    :param chunk_size: Size of the chunks in bytes read from a :class:`requests.Response`.
+    :return: An iterator of the decoded array elements.
+    :raises ValueError: If the JSON document is malformed or truncated.
+    """
+    stream = _JsonStream(_iter_chunks(source, chunk_size), items=[tuple(path)])
+    for kind, _, value in stream.walk():
+        if kind == "item":
+            yield value
+
+
+def iter_tours(source: Chunks, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """Yield the tours of a Tour Planning API solution one at a time.
+
+    :param source: A streamed :class:`requests.Response` or an iterable of chunks of the
+        solution document.
+    :param chunk_size: Size of the chunks in bytes read from a :class:`requests.Response`.
+    :return: An iterator of tour dictionaries.
+    """
+    return iter_json_items(source, ("tours",), chunk_size=chunk_size)
+
+
+def iter_tour_stops(
+    source: Chunks, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Tuple[Optional[str], Dict]]:
+    """Yield the stops of all tours of a Tour Planning API solution one at a time.
+
+    Only a single tour is held in memory at any time.
+
+    :param source: A streamed :class:`requests.Response` or an iterable of chunks of the
+        solution document.
+    :param chunk_size: Size of the chunks in bytes read from a :class:`requests.Response`.
+    :return: An iterator of tuples of ``vehicleId`` and stop dictionary.
+    """
+    for tour in iter_tours(source, chunk_size=chunk_size):
+        for stop in tour.get("stops", []):
+            yield tour.get("vehicleId"), stop
+
+
+def iter_matrix_chunks(
+    source: Chunks, attribute: str = "travelTimes", chunk_size: int = CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    """Yield an array of a matrix routing result in flat chunks of numbers.
+
+    The chunks are consecutive parts of the flat, row-major array, i.e. the kth value over
+    all chunks corresponds to the (i, j) entry of the matrix with
+    k = num_destinations * i + j.
+
+    :param source: A streamed :class:`requests.Response` or an iterable of chunks of the
+        matrix result document.
+    :param attribute: One of ``travelTimes``, ``distances`` or ``errorCodes``.
+    :param chunk_size: Size of the chunks in bytes read from a :class:`requests.Response`.
+    :return: An iterator of one dimensional :class:`numpy.ndarray` objects.
+    """
+    stream = _JsonStream(_iter_chunks(source, chunk_size), numeric=[("matrix", attribute)])
+    for kind, _, value in stream.walk():
+        if kind == "numbers":
+            yield value
+
+
+def read_matrix_result(
+    source: Chunks,
+    attributes: Sequence[str] = MATRIX_ARRAYS,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict:
+    """Parse a matrix routing result incrementally into columnar arrays.
+
+    The returned dictionary has the same layout as the API response, except that the
+    arrays named in ``attributes`` are flat :class:`numpy.ndarray` objects which are
+    filled chunk by chunk, without materializing a Python object per matrix entry.
+    Other nested values like ``regionDefinition`` are skipped.
+
+    :param source: A streamed :class:`requests.Response` or an iterable of chunks of the
+        matrix result document.
+    :param attributes: Names of the arrays of the ``matrix`` object to read.
+    :param chunk_size: Size of the chunks in bytes read from a :class:`requests.Response`.
+    :return: A dictionary representing the matrix result.
+    """
+    numeric = [("matrix", attribute) for attribute in attributes]
+    stream = _JsonStream(_iter_chunks(source, chunk_size), numeric=numeric)
+    result: Dict[str, Any] = {}
+    matrix: Dict[str, Any] = {}
+    parts: Dict[str, list] = {}
+    size: Optional[int] = None
+    for kind, path, value in stream.walk():
+        if kind == "numbers":
+            parts.setdefault(path[-1], []).append(value)
+        elif path[:1] == ("matrix",) and len(path) == 2:
+            matrix[path[1]] = value
+        elif len(path) == 1:
+            result[path[0]] = value
+    if "numOrigins" in matrix and "numDestinations" in matrix:
+        size = matrix["numOrigins"] * matrix["numDestinations"]
+    for attribute, chunks in parts.items():
+        array = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float64)
+        if size is not None and array.size != size:
+            raise ValueError(f"Expected {size} values for {attribute}, got {array.size}.")
+        matrix[attribute] = array
+    result["matrix"] = matrix
+    return result
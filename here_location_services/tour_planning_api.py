@@ -12,7 +12,9 @@ from here_location_services.config.tour_planning_config import Fleet, Plan
 from here_location_services.platform.auth import Auth
 
 from .apis import Api
+from .deadline import DEFAULT_TIMEOUT, Timeout
 from .exceptions import ApiError
+from .transport import Transport
 
 
 class TourPlanningApi(Api):
@@ -24,8 +26,17 @@ class TourPlanningApi(Api):
         auth: Optional[Auth] = None,
         proxies: Optional[dict] = None,
         country: str = "row",
+        timeout: Timeout = DEFAULT_TIMEOUT,
+        transport: Optional[Transport] = None,
     ):
-        super().__init__(api_key, auth=auth, proxies=proxies, country=country)
+        super().__init__(
+            api_key,
+            auth=auth,
+            proxies=proxies,
+            country=country,
+            timeout=timeout,
+            transport=transport,
+        )
         self._base_url = f"https://tourplanning.{self._get_url_string()}"
 
     def solve_tour_planning(
@@ -36,6 +47,7 @@ class TourPlanningApi(Api):
         optimization_traffic: Optional[str] = None,
         optimization_waiting_time: Optional[Dict] = None,
         is_async: Optional[bool] = False,
+        stream: bool = False,
     ):
         """Requests profile-aware routing data, creates a Vehicle Routing Problem and solves it.
 
@@ -50,6 +62,8 @@ class TourPlanningApi(Api):
             of a vehicle arriving at a stop before the starting time of the time window defined
             for serving the job.
         :param is_async: Solves the problem Asynchronously
+        :param stream: If set to True the response body is not downloaded upfront so that it
+            can be parsed incrementally with :mod:`here_location_services.streaming`.
         :return: :class:`requests.Response` object.
         :raises ApiError: If ``status_code`` of API response is not 200 or 202.
 
@@ -78,7 +92,7 @@ class TourPlanningApi(Api):
         data["fleet"] = vars(fleet)
         data["plan"] = vars(plan)
 
-        resp = self.post(url, data=data)
+        resp = self.post(url, data=data, stream=stream)
         if resp.status_code == 200 or resp.status_code == 202:
             return resp
         else:
@@ -88,9 +102,16 @@ class TourPlanningApi(Api):
         """Get the status of async tour planning calculation for the provided status url."""
         return self.get(status_url, allow_redirects=False)
 
-    def get_async_tour_planning_results(self, result_url: str):
-        """Get the results of async tour planning for the provided result url."""
-        resp = self.get(result_url)
+    def get_async_tour_planning_results(self, result_url: str, stream: bool = False):
+        """Get the results of async tour planning for the provided result url.
+
+        :param result_url: A string to represent result url of async tour planning.
+        :param stream: If set to True the response body is not downloaded upfront so that it
+            can be parsed incrementally with :mod:`here_location_services.streaming`.
+        :return: :class:`requests.Response` object.
+        :raises ApiError: If ``status_code`` of API response is not 200.
+        """
+        resp = self.get(result_url, stream=stream)
         if resp.status_code != 200:
             raise ApiError(resp)
         return resp
@@ -0,0 +1,195 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains OpenTelemetry-style tracing of client operations.
+
+With a :class:`Tracer` passed to :class:`LS <here_location_services.ls.LS>`, every call of a
+method sending requests, e.g. :meth:`LS.matrix <here_location_services.ls.LS.matrix>`, opens
+a root span. Child spans cover HTTP attempts, token refreshes, async job polling iterations
+and response decoding. Finished spans are passed to a pluggable :class:`SpanExporter`.
+
+Outside of a traced operation :func:`span` does nothing, so tracing costs nothing unless
+enabled.
+
+Example::
+
+    exporter = InMemoryExporter()
+    ls = LS(api_key=api_key, tracer=Tracer(exporter))
+    ls.matrix(origins=origins, region_definition=WorldRegion(), async_req=True)
+    for span in exporter.spans:
+        print(span.name, span.duration)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(
+        self,
+        name: str,
+        tracer: "Tracer",
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Instantiate and start the span.
+
+        :param name: The name of the span.
+        :param tracer: The tracer exporting the span when it ends.
+        :param parent: The optional parent span.
+        :param attributes: Optional attributes of the span.
+        """
+        self.name = name
+        self.tracer = tracer
+        self.parent_id: Optional[str] = parent.span_id if parent is not None else None
+        self.trace_id: str = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id: str = os.urandom(8).hex()
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        #: ``ok`` or ``error``.
+        self.status = "ok"
+        #: Start and end time in nanoseconds since the epoch.
+        self.start_time = time.time_ns()
+        self.end_time: Optional[int] = None
+
+    def __repr__(self):
+        return f"Span({self.name!r}, duration={self.duration}, status={self.status!r})"
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Return the duration of the span in seconds, None if it has not ended."""
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        """Set the attribute ``key`` of the span."""
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        """Mark the span as failed with ``exc``."""
+        self.status = "error"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)
+
+    def end(self):
+        """End the span and pass it to the exporter of the tracer."""
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+            self.tracer.exporter.export([self])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span as a dict."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """A base class for exporters of finished spans."""
+
+    def export(self, spans: List[Span]):
+        """
+        Export finished spans.
+
+        :param spans: A list of :class:`Span` objects.
+        """
+        raise NotImplementedError
+
+    def shutdown(self):
+        """Flush and release resources of the exporter."""
+
+
+class InMemoryExporter(SpanExporter):
+    """An exporter keeping all finished spans in memory, e.g. for tests."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        """Append ``spans`` to :attr:`spans`."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def clear(self):
+        """Remove all spans."""
+        with self._lock:
+            self.spans.clear()
+
+    def find(self, name: str) -> List[Span]:
+        """Return the spans with the name ``name``."""
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("here_location_services_span", default=None)
+
+
+class Tracer:
+    """A tracer creating spans which are passed to an exporter when they end."""
+
+    def __init__(self, exporter: SpanExporter):
+        """
+        Instantiate the tracer.
+
+        :param exporter: The exporter of finished spans.
+        """
+        self.exporter = exporter
+
+    @contextmanager
+    def start_span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Start a span as child of the current span and make it the current span.
+
+        :param name: The name of the span.
+        :param attributes: Attributes of the span.
+        :return: A context manager yielding the span, which ends on exit.
+        """
+        parent = current_span()
+        span_ = Span(name, self, parent=parent, attributes=attributes)
+        token = _current_span.set(span_)
+        try:
+            yield span_
+        except BaseException as exc:
+            span_.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            span_.end()
+
+
+def current_span() -> Optional[Span]:
+    """Return the span active in the current context, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Start a child span of the current span, or do nothing if no span is active.
+
+    :param name: The name of the span.
+    :param attributes: Attributes of the span.
+    :return: A context manager yielding the span or None.
+    """
+    parent = current_span()
+    if parent is None:
+        yield None
+        return
+    with parent.tracer.start_span(name, **attributes) as child:
+        yield child
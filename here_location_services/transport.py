@@ -0,0 +1,143 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+This module contains the HTTP transport used by the Location Services API clients.
+
+A :class:`Transport` owns a pooled :class:`requests.Session`. A single transport is shared
+by all the APIs of an :class:`LS <here_location_services.ls.LS>` instance, so that one
+instance and its connection pool can be shared by many threads.
+
+Transports are fork-safe: a child process never reuses the connections of its parent, the
+session is rebuilt on first use after a fork. Transports can also be pickled, e.g. to hand
+a prepared :class:`LS <here_location_services.ls.LS>` to the workers of a
+:class:`multiprocessing.pool.Pool`.
+"""
+
+import os
+import threading
+import weakref
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+#: Default number of connections kept open per host.
+DEFAULT_POOL_MAXSIZE = 64
+
+
+class Transport:
+    """A thread-safe HTTP transport based on a pooled :class:`requests.Session`."""
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        base_url: Optional[str] = None,
+    ):
+        """
+        Instantiate the transport.
+
+        :param pool_connections: Number of hosts to keep connection pools for.
+        :param pool_maxsize: Maximum number of connections kept open per host. Should be at
+            least the number of threads sharing the transport.
+        :param base_url: An optional URL, e.g. ``http://127.0.0.1:8080``, replacing scheme and
+            host of all request URLs, e.g. to send requests to a local stand-in server. The
+            original host is sent in the ``X-Forwarded-Host`` header.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self._session: Optional[requests.Session] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        _transports.add(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_session=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        _transports.add(self)
+
+    def _after_fork(self):
+        """Drop the session inherited from the parent process without closing it.
+
+        Closing it would shut down sockets which are still used by the parent.
+        """
+        self._session = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        """Return the session of the transport, created on first use."""
+        if self._pid != os.getpid():
+            self._after_fork()
+        session = self._session
+        if session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._new_session()
+                session = self._session
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send HTTP request.
+
+        :param method: HTTP method, e.g. ``GET`` or ``POST``.
+        :param url: A string to represent URL.
+        :param kwargs: Optional arguments that :meth:`requests.Session.request` takes.
+        :return: :class:`requests.Response` object.
+        """
+        if self.base_url is not None:
+            url, host = self.rewrite_url(url)
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, **{"X-Forwarded-Host": host})
+        return self.session.request(method, url, **kwargs)
+
+    def rewrite_url(self, url: str) -> Tuple[str, str]:
+        """
+        Return ``url`` with scheme and host replaced by :attr:`base_url`, and its host.
+
+        :param url: A string to represent URL.
+        :return: A tuple of the rewritten URL and the original host.
+        """
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        if self.base_url is None:
+            return url, parts.netloc
+        return f"{self.base_url}{path}", parts.netloc
+
+    def close(self):
+        """Close all pooled connections of the transport."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_transports: "weakref.WeakSet[Transport]" = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for transport in list(_transports):
+        transport._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -5,8 +5,11 @@
 This is a collection of utilities for using Here Location Services.
 """
 
+import contextvars
 import os
 import warnings
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Iterable, List
 
 
 def get_apikey() -> str:
@@ -21,3 +24,31 @@ def get_apikey() -> str:
         warnings.warn("No token found in environment variable LS_API_KEY.")
 
     return api_key or ""
+
+
+def submit_in_context(executor: Executor, fn: Callable, *args: Any) -> Future:
+    """
+    Submit ``fn`` to ``executor`` to run in a copy of the caller's context.
+
+    The deadline, ledger label, active operation and tracing span of the caller are thus
+    kept on the worker thread.
+
+    :param executor: A :class:`concurrent.futures.Executor`.
+    :param fn: The function to call.
+    :param args: The positional arguments of ``fn``.
+    :return: A :class:`concurrent.futures.Future` of the call.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def map_in_context(executor: Executor, fn: Callable, items: Iterable) -> List:
+    """
+    Call ``fn`` for each of ``items`` on ``executor``, in copies of the caller's context.
+
+    :param executor: A :class:`concurrent.futures.Executor`.
+    :param fn: The function to call with each item.
+    :param items: The items.
+    :return: A list of the results in the order of ``items``.
+    """
+    futures = [submit_in_context(executor, fn, item) for item in items]
+    return [future.result() for future in futures]
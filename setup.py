@@ -27,7 +27,7 @@ dependency_links = [
 with open(path.join(here, "requirements_dev.txt"), encoding="utf-8") as f:
     dev_reqs = f.read().strip().split("\n")
 
-packages = find_packages(exclude=["docs", "tests"])
+packages = find_packages(exclude=["docs", "tests", "benchmarks"])
 version = {}
 with open("{}/__version__.py".format(packages[0])) as f:
     exec(f.read(), version)
@@ -45,7 +45,7 @@ setup(
     include_package_data=True,
     install_requires=install_requires,
     dependency_links=dependency_links,
-    extras_require={"dev": dev_reqs},
+    extras_require={"dev": dev_reqs, "arrow": ["pyarrow"], "geo": ["shapely>=2"]},
     long_description=long_description,
     long_description_content_type="text/markdown",
 )
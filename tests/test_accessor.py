@@ -0,0 +1,99 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the pandas accessor for vectorized geocoding."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.deadline import Deadline, current_deadline
+from here_location_services.exceptions import ApiError
+
+
+def make_response(status_code, data):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+def test_geocode_column(mocker):
+    """Test unique addresses are geocoded once and broadcast to all rows."""
+
+    def get_geocoding(query, limit=20, lang="en-US"):
+        if query == "nowhere":
+            raise ApiError(make_response(400, {}))
+        item = {
+            "title": query,
+            "resultType": "street",
+            "address": {"label": query.title()},
+            "position": {"lat": len(query), "lng": 1.5},
+            "scoring": {"queryScore": 0.8},
+        }
+        return make_response(200, {"items": [item]})
+
+    ls = LS(api_key="dummy")
+    geocoding = mocker.patch.object(ls.geo_search_api, "get_geocoding", side_effect=get_geocoding)
+    df = pd.DataFrame(
+        {"address": ["berlin", "paris", "berlin", None, "nowhere"]}, index=list("abcde")
+    )
+    result = df.hls.geocode("address", ls=ls, concurrency=2)
+
+    assert geocoding.call_count == 3
+    assert "lat" not in df
+    assert result["lat"].tolist()[:3] == [6.0, 5.0, 6.0]
+    assert np.isnan(result.loc["d", "lat"]) and np.isnan(result.loc["e", "lat"])
+    assert result["label"].dtype == "string"
+    assert result["resultType"].dtype == "category"
+    assert result["score"].dtype == "float64"
+    assert result.loc["c", "label"] == "Berlin"
+    assert result["error"].dtype == "string"
+    assert result["error"].isna().tolist() == [True, True, True, True, False]
+    assert result.loc["e", "error"].startswith("400")
+
+    with pytest.raises(ApiError):
+        df.hls.geocode("address", ls=ls, errors="raise")
+    geocoding.side_effect = KeyError("bug")
+    with pytest.raises(KeyError):
+        df.hls.geocode("address", ls=ls)
+
+
+def test_geocode_column_context(mocker):
+    """Test addresses are geocoded within the caller's deadline."""
+    deadlines = set()
+
+    def get_geocoding(query, limit=20, lang="en-US"):
+        deadlines.add(current_deadline())
+        return make_response(200, {"items": []})
+
+    ls = LS(api_key="dummy")
+    mocker.patch.object(ls.geo_search_api, "get_geocoding", side_effect=get_geocoding)
+    df = pd.DataFrame({"address": ["berlin", "paris", "rome"]})
+    with Deadline(5) as deadline:
+        df.hls.geocode("address", ls=ls, concurrency=3)
+    assert deadlines == {deadline}
+
+
+def test_reverse_geocode_columns(mocker):
+    """Test unique coordinates are reverse geocoded into prefixed columns."""
+
+    def get_reverse_geocoding(lat, lng, limit=1, lang="en-US"):
+        item = {"title": f"{lat},{lng}", "resultType": "houseNumber", "distance": 10}
+        return make_response(200, {"items": [item]})
+
+    ls = LS(api_key="dummy")
+    reverse = mocker.patch.object(
+        ls.geo_search_api, "get_reverse_geocoding", side_effect=get_reverse_geocoding
+    )
+    df = pd.DataFrame({"lat": [52.5, 52.5, np.nan, 91.0], "lng": [13.4, 13.4, 13.4, 0.0]})
+    result = df.hls.reverse_geocode("lat", "lng", ls=ls, prefix="address_")
+
+    assert reverse.call_count == 1
+    assert result["address_label"].tolist()[:2] == ["52.5,13.4", "52.5,13.4"]
+    assert result["address_label"].isna().tolist() == [False, False, True, True]
+    assert result["address_distance"].tolist()[0] == 10.0
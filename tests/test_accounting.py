@@ -0,0 +1,139 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test accounting of billable transactions."""
+
+import csv
+import json
+
+import pandas as pd
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.accounting import Ledger
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.exceptions import BatchLimitExceededException
+
+
+def make_response(status_code, data):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+def test_ledger(mocker, tmp_path):
+    """Test transactions and matrix cells are accounted per label and service."""
+    mocker.patch("here_location_services.ls.wait")
+    mocker.patch(
+        "here_location_services.transport.Transport.request",
+        side_effect=[
+            make_response(200, {"items": []}),
+            make_response(200, {"items": []}),
+            make_response(
+                202, {"statusUrl": "https://matrix.router.hereapi.com/v8/matrix/1/status"}
+            ),
+            make_response(303, {"resultUrl": "https://matrix.router.hereapi.com/v8/matrix/1"}),
+            make_response(200, {"matrix": {"numOrigins": 3, "travelTimes": [0]}}),
+        ],
+    )
+    ls = LS(api_key="dummy")
+    ledger = Ledger(matrix_cells_per_transaction=4)
+    ledger.attach(ls)
+    ls.geocode("berlin")
+    with ledger.tag("import"):
+        ls.geocode("paris")
+        origins = [{"lat": 1, "lng": 2}] * 3
+        ls.matrix(
+            origins=origins,
+            destinations=origins[:2],
+            region_definition=WorldRegion(),
+            async_req=True,
+        )
+        ledger.record_cache_saved("geocode", count=5)
+
+    assert ledger.report() == [
+        {
+            "label": "default",
+            "service": "geocode",
+            "requests": 1,
+            "transactions": 1,
+            "matrix_cells": 0,
+            "cache_saved": 0,
+        },
+        {
+            "label": "import",
+            "service": "geocode",
+            "requests": 1,
+            "transactions": 1,
+            "matrix_cells": 0,
+            "cache_saved": 5,
+        },
+        {
+            "label": "import",
+            "service": "matrix",
+            "requests": 1,
+            "transactions": 2,
+            "matrix_cells": 6,
+            "cache_saved": 0,
+        },
+    ]
+    assert ledger.totals()["transactions"] == 4
+
+    path = tmp_path / "usage.csv"
+    ledger.write_csv(str(path))
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert rows[2]["matrix_cells"] == "6"
+
+
+def test_ledger_estimate():
+    """Test the pre-flight estimate of batches."""
+    ledger = Ledger(matrix_cells_per_transaction=100)
+    assert ledger.estimate("geocode", requests=1000, price_per_transaction=0.001) == {
+        "service": "geocode",
+        "requests": 1000,
+        "transactions": 1000,
+        "matrix_cells": 0,
+        "cost": 1.0,
+    }
+    estimate = ledger.estimate("matrix", requests=2, origins=1000, destinations=1000)
+    assert estimate["matrix_cells"] == 2_000_000
+    assert estimate["transactions"] == 20_000
+    assert estimate["cost"] is None
+
+
+def test_ledger_checks_bulk_calls(mocker):
+    """Test bulk calls are estimated and refused above the batch limit before sending."""
+    request = mocker.patch("here_location_services.transport.Transport.request")
+    ls = LS(api_key="dummy")
+    ledger = Ledger(matrix_cells_per_transaction=4, batch_limit=10)
+    ledger.attach(ls)
+    assert ls.ledger is ledger
+
+    pairs = [[52.5, 13.4, 52.52, 13.42 + i % 11 / 100] for i in range(20)]
+    with pytest.raises(BatchLimitExceededException, match="11 transactions"):
+        ls.route_many(pairs)
+    assert ledger.last_estimate["requests"] == 11
+
+    origins = [{"lat": 52.5 + i / 100, "lng": 13.4} for i in range(5)]
+    departures = [pd.Timestamp("2021-06-01 08:00", tz="UTC")] * 2
+    with pytest.raises(BatchLimitExceededException):
+        ls.matrix_cube(origins, None, departures, WorldRegion(), tile_size=(2, 5))
+    assert ledger.last_estimate == {
+        "service": "matrix",
+        "requests": 6,
+        "transactions": 2 * (3 + 3 + 2),
+        "matrix_cells": 2 * 25,
+        "cost": None,
+    }
+
+    with pytest.raises(BatchLimitExceededException):
+        ls.calculate_isolines_many(
+            [[52.5, 13.4 + i / 100] for i in range(11)], "600", "time", "car"
+        )
+    with pytest.raises(BatchLimitExceededException):
+        pd.DataFrame({"address": [f"street {i}" for i in range(11)]}).hls.geocode("address", ls=ls)
+    assert ledger.last_estimate["service"] == "geocode"
+    assert request.call_count == 0
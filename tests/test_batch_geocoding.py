@@ -0,0 +1,180 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the streaming batch geocoding pipeline."""
+
+import csv
+import json
+import os
+
+import pytest
+import requests
+
+from here_location_services.accounting import Ledger
+from here_location_services.batch_geocoding import (
+    geocode_file,
+    geocode_rows,
+    main,
+    read_rows,
+    retry_after,
+)
+from here_location_services.deadline import Deadline, current_deadline
+from here_location_services.exceptions import ApiError, BatchLimitExceededException
+from here_location_services.geocoding_search_api import GeocodingSearchApi
+
+
+def make_response(status_code, data, headers=None):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.reason = {200: "OK", 400: "Bad Request", 429: "Too Many Requests"}[status_code]
+    resp.headers.update(headers or {})
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+def fake_geocoding(fail=None):
+    """Return a fake of ``get_geocoding`` answering with the number in the query."""
+
+    def get_geocoding(query, limit=20, lang="en-US"):
+        number = int(query.split()[-1])
+        if number == fail:
+            raise ApiError(make_response(429, {}))
+        if number % 10 == 3:
+            raise ApiError(make_response(400, {}))
+        item = {
+            "title": query,
+            "resultType": "houseNumber",
+            "address": {"label": f"Straße {number}"},
+            "position": {"lat": number, "lng": -number},
+            "scoring": {"queryScore": 0.9},
+        }
+        return make_response(200, {"items": [item]})
+
+    return get_geocoding
+
+
+@pytest.fixture()
+def addresses(tmp_path):
+    path = tmp_path / "addresses.ndjson"
+    with open(path, "w") as f:
+        for i in range(25):
+            address = "" if i == 7 else f"Street {i}"
+            f.write(json.dumps({"id": f"a{i}", "address": address}) + "\n")
+    return str(path)
+
+
+def test_geocode_file_in_order(mocker, addresses, tmp_path):
+    """Test results are written in input order with errors of single rows."""
+    mocker.patch.object(GeocodingSearchApi, "get_geocoding", side_effect=fake_geocoding())
+    output = str(tmp_path / "results.csv")
+    api = GeocodingSearchApi(api_key="dummy")
+    assert geocode_file(api, addresses, output, id_column="id", concurrency=4) == 25
+
+    with open(output) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["id"] for row in rows] == [f"a{i}" for i in range(25)]
+    assert rows[1]["lat"] == "1" and rows[1]["label"] == "Straße 1"
+    assert rows[1]["resultType"] == "houseNumber" and rows[1]["score"] == "0.9"
+    assert rows[3]["error"] == "400 Bad Request"
+    assert rows[7]["error"] == "Empty query"
+    assert list(read_rows(addresses, "address"))[2] == (2, None, "Street 2")
+
+
+def test_geocode_file_batch_limit(mocker, addresses, tmp_path):
+    """Test the transactions of the rows to geocode are checked before sending."""
+    get_geocoding = mocker.patch.object(
+        GeocodingSearchApi, "get_geocoding", side_effect=fake_geocoding()
+    )
+    api = GeocodingSearchApi(api_key="dummy")
+    ledger = Ledger(batch_limit=20)
+    with pytest.raises(BatchLimitExceededException):
+        geocode_file(api, addresses, str(tmp_path / "results.csv"), ledger=ledger)
+    assert ledger.last_estimate["requests"] == 24
+    assert get_geocoding.call_count == 0
+    ledger.batch_limit = 24
+    assert geocode_file(api, addresses, str(tmp_path / "results.csv"), ledger=ledger) == 25
+
+
+def test_geocode_rows_context(mocker):
+    """Test rows are geocoded within the caller's deadline."""
+    deadlines = set()
+    geocoding = fake_geocoding()
+
+    def get_geocoding(*args, **kwargs):
+        deadlines.add(current_deadline())
+        return geocoding(*args, **kwargs)
+
+    mocker.patch.object(GeocodingSearchApi, "get_geocoding", side_effect=get_geocoding)
+    api = GeocodingSearchApi(api_key="dummy")
+    rows = [(i, None, f"Street {i}") for i in range(5)]
+    with Deadline(5) as deadline:
+        results = list(geocode_rows(api, rows, concurrency=2))
+    assert deadlines == {deadline}
+    assert [result["lat"] for result in results] == [0, 1, 2, None, 4]
+
+
+@pytest.mark.parametrize("extension", ["ndjson", "csv"])
+def test_geocode_file_resume(mocker, addresses, tmp_path, extension):
+    """Test a run stopped by throttling resumes after the last checkpoint."""
+    wait = mocker.patch("here_location_services.batch_geocoding.wait")
+    get_geocoding = mocker.patch.object(
+        GeocodingSearchApi, "get_geocoding", side_effect=fake_geocoding(fail=12)
+    )
+    output = str(tmp_path / f"results.{extension}")
+    checkpoint = str(tmp_path / "results.ckpt")
+    args = [addresses, output, "--checkpoint", checkpoint, "--checkpoint-every", "5"]
+    assert main(args + ["--concurrency", "2", "--max-attempts", "3"]) == 1
+    assert [c[0][0] for c in wait.call_args_list] == [1.0, 2.0]
+    with open(checkpoint) as f:
+        checkpointed = json.load(f)
+    assert checkpointed["rows"] == 12
+    assert checkpointed["position"] == os.path.getsize(output)
+    with open(output, "a", encoding="utf-8") as f:
+        f.write("Straße written after the checkpoint\n")
+
+    get_geocoding.side_effect = fake_geocoding()
+    assert main(args) == 0
+    with open(output, encoding="utf-8") as f:
+        if extension == "csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f]
+    assert [int(row["row"]) for row in rows] == list(range(25))
+    assert rows[24]["label"] == "Straße 24"
+    assert get_geocoding.call_count < 3 * 25
+    assert main(args) == 0
+
+
+def test_geocode_retry(mocker):
+    """Test throttled and failed requests are retried with backoff and Retry-After."""
+    wait = mocker.patch("here_location_services.batch_geocoding.wait")
+    mocker.patch.object(
+        GeocodingSearchApi,
+        "get_geocoding",
+        side_effect=[
+            ApiError(make_response(429, {}, {"Retry-After": "7"})),
+            requests.ConnectionError("reset"),
+            make_response(200, {"items": [{"position": {"lat": 1, "lng": 2}}]}),
+        ],
+    )
+    api = GeocodingSearchApi(api_key="dummy")
+    results = list(geocode_rows(api, [(0, None, "Street 1")]))
+    assert results[0]["lat"] == 1 and results[0]["error"] is None
+    assert [c[0][0] for c in wait.call_args_list] == [7.0, 2.0]
+
+    assert (
+        retry_after(make_response(429, {}, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    )
+    assert retry_after(make_response(429, {}, {"Retry-After": "soon"})) is None
+
+
+def test_geocode_file_parquet(mocker, addresses, tmp_path):
+    """Test Parquet output as a directory of part files."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    mocker.patch.object(GeocodingSearchApi, "get_geocoding", side_effect=fake_geocoding())
+    output = str(tmp_path / "results.parquet")
+    api = GeocodingSearchApi(api_key="dummy")
+    geocode_file(api, addresses, output, id_column="id", checkpoint_every=10)
+    table = pq.read_table(output)
+    assert table.num_rows == 25
+    assert table.column("lat").to_pylist()[:3] == [0.0, 1.0, 2.0]
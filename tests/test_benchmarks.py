@@ -0,0 +1,55 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the benchmarks against the local stand-in server."""
+
+from benchmarks.run import compare, run, scenarios
+from benchmarks.server import MockServer
+from here_location_services import LS
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.transport import Transport
+
+
+def test_transport_base_url():
+    """Test requests are sent to the base URL with the original host forwarded."""
+    transport = Transport(base_url="http://127.0.0.1:8080/")
+    assert transport.rewrite_url("https://router.hereapi.com/v8/routes?a=1") == (
+        "http://127.0.0.1:8080/v8/routes?a=1",
+        "router.hereapi.com",
+    )
+
+
+def test_mock_server():
+    """Test all scenarios are answered by the mock server."""
+    sizes = {"/v8/matrix": {"origins": 3, "destinations": 3}}
+    with MockServer(sizes=sizes) as server:
+        ls = LS(api_key="dummy", transport=Transport(base_url=server.url))
+        for name, _, _, call in scenarios(3):
+            assert call(ls) is not None, name
+        resp = ls.matrix(
+            origins=[{"lat": 1, "lng": 2}] * 3, region_definition=WorldRegion(), async_req=True
+        )
+        assert resp.to_travel_times_matrix().shape == (3, 3)
+        assert server.requests == 9
+
+
+def test_run_and_compare():
+    """Test a small benchmark run and the detection of regressions."""
+    results = run(matrix_size=5, iterations=1, concurrency=2, calls=4)
+    assert results["throughput.geocode"] > 0
+    assert results["memory_peak.matrix"] > 0
+    assert compare(results, results, tolerance=0.1) == []
+
+    baseline = dict(results)
+    baseline["call.geocode"] = results["call.geocode"] / 2
+    baseline["throughput.geocode"] = results["throughput.geocode"] * 2
+    assert [r.split(":")[0] for r in compare(results, baseline, tolerance=0.1)] == [
+        "call.geocode",
+        "throughput.geocode",
+    ]
+
+    baseline = {"overhead.geocode": 0.0, "overhead.routes": 0.0, "memory_peak.geocode": 0.0}
+    results = {"overhead.geocode": 0.0005, "overhead.routes": 0.01, "memory_peak.geocode": 1e4}
+    assert [r.split(":")[0] for r in compare(results, baseline, tolerance=0.1)] == [
+        "memory_peak.geocode",
+        "overhead.routes",
+    ]
@@ -0,0 +1,193 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test bulk routing of origin-destination pairs."""
+
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.bulk_routing import LazyGeometry, departure_range
+from here_location_services.config.base_config import Truck
+from here_location_services.deadline import Deadline, current_deadline
+from here_location_services.exceptions import ApiError, DeadlineExceededException
+from here_location_services.routing_api import RoutingApi
+
+
+def make_response(status_code, data):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.reason = {200: "OK", 400: "Bad Request"}[status_code]
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+def fake_route(transport_mode, origin, destination, **kwargs):
+    """Return a route of two sections, failing for origins at latitude 0."""
+    if origin[0] == 0:
+        raise ApiError(make_response(400, {}))
+    if origin[0] == 1:
+        return make_response(200, {"routes": [], "notices": [{"title": "Route not found"}]})
+    sections = [
+        {
+            "summary": {"duration": 100, "baseDuration": 80, "length": 1000},
+            "tolls": [{"fares": [{"price": {"value": 2.5}}]}],
+            "polyline": "BFg9tgKgm5xCw-Bw-B",
+        },
+        {
+            "summary": {"duration": 50, "length": 500},
+            "polyline": "BFw7vgKwk7xCw-Bw-B",
+        },
+    ]
+    return make_response(200, {"routes": [{"sections": sections}]})
+
+
+def test_route_many_deduplicates(mocker):
+    """Test identical pairs are routed once and broadcast to all rows."""
+    route = mocker.patch.object(RoutingApi, "route", side_effect=fake_route)
+    ls = LS(api_key="dummy")
+    pairs = pd.DataFrame(
+        {
+            "origin_lat": [52.5, 0.0, 52.5, 1.0],
+            "origin_lng": [13.4, 13.4, 13.4, 13.4],
+            "destination_lat": [52.52, 52.52, 52.52, 52.52],
+            "destination_lng": [13.42, 13.42, 13.42, 13.42],
+        },
+        index=list("abcd"),
+    )
+    result = ls.route_many(pairs, concurrency=2, return_results=["tolls"], geometry=True)
+
+    assert route.call_count == 3
+    assert route.call_args.kwargs["return_results"] == ["summary", "tolls", "polyline"]
+    assert list(result.index) == list("abcd")
+    assert result.loc["a", "duration"] == 150.0 and result.loc["a", "base_duration"] == 130.0
+    assert result.loc["c", "length"] == 1500.0 and result.loc["c", "tolls"] == 2.5
+    assert result.loc["a", "sections"] == 2
+    assert result.loc["b", "error"] == "400 Bad Request"
+    assert pd.isna(result.loc["b", "duration"])
+    assert result.loc["d", "error"] == "Route not found"
+    assert str(result.dtypes["sections"]) == "Int64"
+
+    line = result.loc["a", "geometry"]
+    assert isinstance(line, LazyGeometry) and "encoded" in repr(line)
+    assert line.__geo_interface__["coordinates"] == [(13.4, 52.5), (13.41, 52.51), (13.42, 52.52)]
+    assert result.loc["c", "geometry"] is line
+    assert result.loc["b", "geometry"] is None
+
+
+def test_route_many_inputs(mocker):
+    """Test pairs given as sequences or as origins and destinations."""
+    route = mocker.patch.object(RoutingApi, "route", side_effect=fake_route)
+    ls = LS(api_key="dummy")
+    result = ls.route_many([[52.5, 13.4, 52.52, 13.42], [52.5, 13.4, 52.6, 13.5]])
+    assert list(result.columns) == [
+        "duration",
+        "base_duration",
+        "length",
+        "tolls",
+        "sections",
+        "error",
+    ]
+    assert route.call_count == 2
+    assert route.call_args.kwargs["return_results"] == ["summary"]
+
+    result = ls.route_many(origins=[[52.5, 13.4]] * 3, destinations=[[52.52, 13.42]] * 3)
+    assert len(result) == 3 and route.call_count == 3
+
+    with pytest.raises(ApiError):
+        ls.route_many([[0, 13.4, 52.52, 13.42]], errors="raise")
+    with pytest.raises(ValueError):
+        ls.route_many(origins=[[52.5, 13.4]], destinations=[])
+    with pytest.raises(ValueError):
+        ls.route_many([[52.5, 13.4, 52.52, 13.42]], truck=Truck(gross_weight=10000))
+
+
+def test_route_many_context(mocker):
+    """Test workers run in the caller's context and keep request failures per pair."""
+    deadlines = []
+
+    def route(transport_mode, origin, destination, **kwargs):
+        deadlines.append(current_deadline())
+        if origin[0] == 0:
+            raise DeadlineExceededException(5)
+        if origin[0] == 1:
+            raise requests.Timeout("read timed out")
+        return fake_route(transport_mode, origin, destination)
+
+    mocker.patch.object(RoutingApi, "route", side_effect=route)
+    ls = LS(api_key="dummy")
+    with Deadline(5) as deadline:
+        result = ls.route_many(
+            [[52.5, 13.4, 52.52, 13.42], [0, 13.4, 52.52, 13.42], [1, 13.4, 52.52, 13.42]],
+            concurrency=3,
+        )
+    assert deadlines == [deadline] * 3
+    assert result["duration"].iloc[0] == 150.0
+    assert result["error"].iloc[1].startswith("DeadlineExceededException")
+    assert result["error"].iloc[2] == "Timeout: read timed out"
+
+
+def test_route_sweep(mocker):
+    """Test a sweep of departure times coalesces requests and reports failed slots."""
+
+    def route(transport_mode, origin, destination, departure_time, **kwargs):
+        if departure_time.hour == 1 and origin[0] == 52.5:
+            raise ApiError(make_response(400, {}))
+        summary = {"duration": 600 + 60 * departure_time.hour, "length": origin[0]}
+        return make_response(200, {"routes": [{"sections": [{"summary": summary}]}]})
+
+    mock = mocker.patch.object(RoutingApi, "route", side_effect=route)
+    ls = LS(api_key="dummy")
+    departures = departure_range(datetime(2021, 6, 1), datetime(2021, 6, 1, 3), timedelta(hours=1))
+    assert len(departures) == 3
+    departures.append(departures[0])
+    sweep = ls.route_sweep(
+        departures,
+        origins=[[52.5, 13.4], [52.6, 13.4], [52.5, 13.4]],
+        destinations=[[52.52, 13.42]] * 3,
+    )
+
+    assert mock.call_count == 2 * 3
+    assert sweep.durations.shape == (3, 4)
+    np.testing.assert_array_equal(sweep.durations[1], [600, 660, 720, 600])
+    assert np.isnan(sweep.durations[0, 1]) and np.isnan(sweep.lengths[2, 1])
+    assert sweep.lengths[1, 0] == 52.6
+    assert sweep.errors == {(0, 1): "400 Bad Request", (2, 1): "400 Bad Request"}
+    assert list(sweep.to_frame().columns) == departures
+    assert "2 errors" in repr(sweep)
+    with pytest.raises(ValueError):
+        departure_range(departures[0], departures[1], timedelta(0))
+
+    origins, destinations = [[52.5, 13.4]], [[52.52, 13.42]]
+    with pytest.raises(ApiError):
+        ls.route_sweep(departures, origins=origins, destinations=destinations, errors="raise")
+    with pytest.raises(ValueError):
+        ls.route_sweep(departures, origins=origins, destinations=destinations, errors="ignore")
+    mock.side_effect = TypeError("bug")
+    with pytest.raises(TypeError):
+        ls.route_sweep(departures, origins=origins, destinations=destinations)
+
+
+def test_route_sweep_context(mocker):
+    """Test the requests of a sweep run within the caller's deadline."""
+    deadlines = set()
+
+    def route(transport_mode, origin, destination, departure_time, **kwargs):
+        deadlines.add(current_deadline())
+        summary = {"duration": 600, "length": 1000}
+        return make_response(200, {"routes": [{"sections": [{"summary": summary}]}]})
+
+    mocker.patch.object(RoutingApi, "route", side_effect=route)
+    ls = LS(api_key="dummy")
+    departures = departure_range(datetime(2021, 6, 1), datetime(2021, 6, 1, 3), timedelta(hours=1))
+    with Deadline(5) as deadline:
+        sweep = ls.route_sweep(
+            departures, origins=[[52.5, 13.4]], destinations=[[52.52, 13.42]], concurrency=3
+        )
+    assert deadlines == {deadline}
+    assert not sweep.errors
@@ -0,0 +1,103 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test recording and replaying HTTP traffic."""
+
+import gzip
+import json
+import time
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.cassette import Cassette, RecordingTransport, ReplayTransport, redact
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.exceptions import CassetteMissException
+from here_location_services.platform.apis.aaa_oauth2_api import AAAOauth2Api
+
+
+def make_response(status_code, data):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+def test_record_and_replay(mocker, tmp_path):
+    """Test recorded traffic is replayed without network access."""
+    mocker.patch("here_location_services.ls.wait")
+    mocker.patch(
+        "requests.Session.request",
+        side_effect=[
+            make_response(200, {"items": [{"title": "Berlin"}]}),
+            make_response(
+                202, {"statusUrl": "https://matrix.router.hereapi.com/v8/matrix/1/status"}
+            ),
+            make_response(200, {"status": "inProgress"}),
+            make_response(303, {"resultUrl": "https://matrix.router.hereapi.com/v8/matrix/1"}),
+            make_response(200, {"matrix": {"numOrigins": 1, "travelTimes": [0]}}),
+        ],
+    )
+    path = str(tmp_path / "traffic.jsonl.gz")
+    transport = RecordingTransport(path)
+    ls = LS(api_key="secret", transport=transport)
+    origins = [{"lat": 1, "lng": 2}]
+    ls.geocode("berlin")
+    ls.matrix(origins=origins, region_definition=WorldRegion(), async_req=True)
+    transport.close()
+
+    with gzip.open(path, "rt") as f:
+        content = f.read()
+    assert "secret" not in content
+    assert len(content.splitlines()) == 5
+
+    requests.Session.request.side_effect = AssertionError("network access")
+    replay = ReplayTransport(path)
+    ls = LS(api_key="other", transport=replay)
+    assert ls.geocode("berlin").items == [{"title": "Berlin"}]
+    for _ in range(2):
+        resp = ls.matrix(origins=origins, region_definition=WorldRegion(), async_req=True)
+        assert resp.matrix == {"numOrigins": 1, "travelTimes": [0]}
+    with pytest.raises(CassetteMissException):
+        ls.geocode("paris")
+
+
+def test_replay_latency_and_tokens():
+    """Test the replay latency and token requests of the platform API."""
+    token = {
+        "access_token": "eyJhbGciOi.secret",
+        "refresh_token": "refresh-secret",
+        "token_type": "bearer",
+        "expires_in": 3600,
+        "scope": "hrn:here:authorization::org:project/p1",
+    }
+    resp = make_response(200, token)
+    kwargs = {"data": "grant", "headers": {"Authorization": "OAuth oauth_signature=abc"}}
+    interaction = Cassette.interaction(
+        "POST", "https://account.api.here.com/oauth2/token?ApiKey=key", kwargs, resp
+    )
+    assert json.loads(interaction["text"]) == dict(
+        token, access_token="redacted", refresh_token="redacted"
+    )
+    assert "secret" not in json.dumps(interaction) and "oauth_signature" not in json.dumps(
+        interaction
+    )
+    assert interaction["url"] == "https://account.api.here.com/oauth2/token"
+    assert redact({"items": [{"nextToken": "t", "clientSecret": "s"}]}) == (
+        {"items": [{"nextToken": "redacted", "clientSecret": "redacted"}]},
+        True,
+    )
+    interaction["elapsed"] = 0.1
+    cassette = Cassette([interaction])
+
+    api = AAAOauth2Api(
+        base_url="https://account.api.here.com/oauth2/token",
+        transport=ReplayTransport(cassette, latency="recorded", speed=2.0),
+    )
+    start = time.perf_counter()
+    assert api.request_scoped_access_token(oauth=None, data="grant")["expires_in"] == 3600
+    assert time.perf_counter() - start >= 0.05
+
+    with pytest.raises(ValueError):
+        ReplayTransport(cassette, latency="fast")
@@ -0,0 +1,107 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the per host circuit breaker."""
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from here_location_services.exceptions import ApiError, CircuitOpenException
+
+
+def make_response(status_code):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = b'{"items": []}'
+    return resp
+
+
+def test_circuit_breaker_per_host(mocker):
+    """Test a circuit opens for a failing host only and fails fast."""
+
+    def request(method, url, **kwargs):
+        if "router" in url:
+            raise requests.ConnectionError("unreachable")
+        return make_response(200)
+
+    transport = mocker.patch(
+        "here_location_services.transport.Transport.request", side_effect=request
+    )
+    breaker = CircuitBreaker(min_requests=4, reset_timeout=60)
+    ls = LS(api_key="dummy", circuit_breaker=breaker)
+    for _ in range(4):
+        with pytest.raises(requests.ConnectionError):
+            ls.car_route(origin=[52.5, 13.4], destination=[52.6, 13.5])
+        ls.geocode("berlin")
+    assert transport.call_count == 8
+    with pytest.raises(CircuitOpenException):
+        ls.car_route(origin=[52.5, 13.4], destination=[52.6, 13.5])
+    assert transport.call_count == 8
+    ls.geocode("berlin")
+    stats = breaker.stats()
+    assert stats["router.hereapi.com"]["state"] == OPEN
+    assert stats["router.hereapi.com"]["rejected"] == 1
+    assert stats["geocode.search.hereapi.com"] == {
+        "state": CLOSED,
+        "requests": 5,
+        "failures": 0,
+        "opened": 0,
+        "rejected": 0,
+    }
+
+
+def test_circuit_breaker_half_open(mocker):
+    """Test probing of a half-open circuit on server errors."""
+    monotonic = mocker.patch("here_location_services.circuit_breaker.time.monotonic")
+    monotonic.return_value = 100.0
+    status = {"code": 503}
+    mocker.patch(
+        "here_location_services.transport.Transport.request",
+        side_effect=lambda *args, **kwargs: make_response(status["code"]),
+    )
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=2, reset_timeout=10)
+    ls = LS(api_key="dummy", circuit_breaker=breaker)
+    host = "geocode.search.hereapi.com"
+    for _ in range(2):
+        with pytest.raises(ApiError):
+            ls.geocode("berlin")
+    assert breaker.state(host) == OPEN
+
+    monotonic.return_value = 111.0
+    assert breaker.state(host) == HALF_OPEN
+    breaker.before_request(host)
+    with pytest.raises(CircuitOpenException):
+        breaker.before_request(host)
+    breaker.record(host, success=False)
+    assert breaker.state(host) == OPEN
+
+    monotonic.return_value = 122.0
+    status["code"] = 200
+    ls.geocode("berlin")
+    assert breaker.state(host) == CLOSED
+
+
+def test_circuit_breaker_releases_probe(mocker):
+    """Test a probe failing for a reason other than the host can be retried."""
+    monotonic = mocker.patch("here_location_services.circuit_breaker.time.monotonic")
+    monotonic.return_value = 100.0
+    request = mocker.patch(
+        "here_location_services.transport.Transport.request", return_value=make_response(503)
+    )
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, reset_timeout=10)
+    ls = LS(api_key="dummy", circuit_breaker=breaker)
+    host = "geocode.search.hereapi.com"
+    with pytest.raises(ApiError):
+        ls.geocode("berlin")
+    assert breaker.state(host) == OPEN
+
+    monotonic.return_value = 111.0
+    request.side_effect = KeyError("cassette")
+    with pytest.raises(KeyError):
+        ls.geocode("berlin")
+    assert breaker.state(host) == HALF_OPEN
+    request.side_effect = None
+    request.return_value = make_response(200)
+    ls.geocode("berlin")
+    assert breaker.state(host) == CLOSED
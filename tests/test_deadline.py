@@ -0,0 +1,148 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test request timeouts and deadlines."""
+
+import time
+from argparse import Namespace
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.apis import Api
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.deadline import (
+    DEFAULT_TIMEOUT,
+    Deadline,
+    current_deadline,
+    request_timeout,
+)
+from here_location_services.exceptions import DeadlineExceededException
+from here_location_services.platform.apis.api import Api as PlatformApi
+
+
+def test_deadline_cap():
+    """Test timeouts are capped by the remaining time of nested deadlines."""
+    assert current_deadline() is None
+    with Deadline(100) as outer:
+        assert current_deadline() is outer
+        assert outer.cap((3, 200))[0] == 3
+        assert 99 < outer.cap((3, 200))[1] <= 100
+        with Deadline(1000) as inner:
+            assert inner.remaining() <= 100
+            assert inner.cap(None)[0] <= 100
+        assert current_deadline() is outer
+    assert current_deadline() is None
+    deadline = Deadline(0)
+    assert deadline.expired
+    with pytest.raises(DeadlineExceededException):
+        deadline.check()
+
+
+def test_api_timeouts(mocker):
+    """Test default, per instance and per call timeouts of requests."""
+    get = mocker.patch("requests.Session.request", return_value=Namespace(status_code=200))
+    api = Api(api_key="dummy")
+    api.get("https://dummy")
+    assert get.call_args[1]["timeout"] == DEFAULT_TIMEOUT
+    api = Api(api_key="dummy", timeout=5)
+    api.get("https://dummy")
+    assert get.call_args[1]["timeout"] == 5
+    api.get("https://dummy", timeout=(1, 2))
+    assert get.call_args[1]["timeout"] == (1, 2)
+    api.get("https://dummy", timeout=None)
+    assert get.call_args[1]["timeout"] is None
+    with request_timeout(None):
+        api.get("https://dummy")
+        assert get.call_args[1]["timeout"] is None
+        api.get("https://dummy", timeout=3)
+        assert get.call_args[1]["timeout"] == 3
+    with Deadline(0.5):
+        api.get("https://dummy")
+    assert get.call_args[1]["timeout"] <= 0.5
+    with Deadline(0):
+        with pytest.raises(DeadlineExceededException):
+            api.get("https://dummy")
+
+    post = mocker.patch("requests.post", return_value=Namespace(status_code=200))
+    PlatformApi(access_token="dummy", timeout=7).post("https://dummy", data={})
+    assert post.call_args[1]["timeout"] == 7
+    with request_timeout((1, 2)):
+        PlatformApi(access_token="dummy", timeout=7).post("https://dummy", data={})
+    assert post.call_args[1]["timeout"] == (1, 2)
+
+
+def test_timeout_after_deadline(mocker):
+    """Test a request timing out after the deadline has expired."""
+
+    def slow_get(*args, **kwargs):
+        time.sleep(0.05)
+        raise requests.ReadTimeout()
+
+    mocker.patch("requests.Session.request", side_effect=slow_get)
+    api = Api(api_key="dummy")
+    with pytest.raises(requests.ReadTimeout):
+        api.get("https://dummy")
+    with Deadline(0.01):
+        with pytest.raises(DeadlineExceededException):
+            api.get("https://dummy")
+
+    mocker.patch("requests.post", side_effect=slow_get)
+    with Deadline(0.01):
+        with pytest.raises(DeadlineExceededException):
+            PlatformApi(access_token="dummy").post("https://dummy", data={})
+
+
+def test_deadline_per_call(mocker):
+    """Test a deadline passed to a method bounds its requests, also in worker threads."""
+    deadlines = []
+
+    def route(*args, **kwargs):
+        deadlines.append(current_deadline())
+        raise requests.ReadTimeout()
+
+    mocker.patch("here_location_services.routing_api.RoutingApi.route", side_effect=route)
+    ls = LS(api_key="dummy")
+    result = ls.route_many([[52.5, 13.4, 52.52, 13.42], [52.5, 13.4, 52.6, 13.5]], deadline=30)
+    assert deadlines[0].seconds == 30 and deadlines[0] is deadlines[1]
+    assert current_deadline() is None
+    assert result["error"].tolist() == ["ReadTimeout: ", "ReadTimeout: "]
+    with pytest.raises(requests.ReadTimeout):
+        ls.car_route(origin=[52.5, 13.4], destination=[52.6, 13.5], deadline=30)
+    assert deadlines[-1].seconds == 30
+
+
+def test_timeout_per_call(mocker):
+    """Test a timeout passed to a method applies to its requests, also in worker threads."""
+    request = mocker.patch(
+        "requests.Session.request",
+        return_value=Namespace(status_code=200, json=lambda: {"routes": []}),
+    )
+    ls = LS(api_key="dummy", timeout=5)
+    ls.route_many([[52.5, 13.4, 52.52, 13.42], [52.5, 13.4, 52.6, 13.5]], timeout=None)
+    assert [c[1]["timeout"] for c in request.call_args_list] == [None, None]
+    ls.geocode("berlin", timeout=(1, 2))
+    assert request.call_args[1]["timeout"] == (1, 2)
+    ls.geocode("berlin")
+    assert request.call_args[1]["timeout"] == 5
+
+
+def test_deadline_async_matrix_polling(mocker):
+    """Test async job polling stops once the deadline has expired."""
+    mocker.patch(
+        "here_location_services.matrix_routing_api.MatrixRoutingApi.matrix_route_async",
+        return_value={"statusUrl": "https://status"},
+    )
+    status = mocker.patch(
+        "here_location_services.apis.Api.get",
+        return_value=Namespace(status_code=200, json=lambda: {"status": "inProgress"}),
+    )
+    ls = LS(api_key="dummy")
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededException):
+        with Deadline(0.2):
+            ls.matrix(
+                origins=[{"lat": 1, "lng": 2}], region_definition=WorldRegion(), async_req=True
+            )
+    assert time.monotonic() - start < 1
+    assert status.call_count == 1
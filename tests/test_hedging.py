@@ -0,0 +1,120 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test hedged GET requests."""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.hedging import HedgingPolicy
+
+
+def make_response(title):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = b'{"items": [{"title": "%s"}]}' % title.encode()
+    resp._content_consumed = True
+    return resp
+
+
+def test_hedged_geocode(mocker):
+    """Test a slow geocode request is hedged and the faster response wins."""
+    calls = []
+    release = threading.Event()
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            release.wait(5)
+            return make_response("slow")
+        return make_response("fast")
+
+    mocker.patch("here_location_services.transport.Transport.request", side_effect=request)
+    close = mocker.spy(requests.Response, "close")
+    policy = HedgingPolicy(delay=0.05, budget=1.0)
+    ls = LS(api_key="dummy", hedging=policy)
+    assert ls.autosuggest_api.hedging is policy
+    assert ls.routing_api.hedging is None
+
+    start = time.monotonic()
+    resp = ls.geocode("berlin")
+    assert time.monotonic() - start < 2
+    assert resp.items[0]["title"] == "fast"
+    assert len(calls) == 2
+    assert (policy.requests, policy.hedged, policy.hedge_wins) == (1, 1, 1)
+    release.set()
+    policy._executor.shutdown(wait=True)
+    assert close.call_count == 1
+
+
+def test_hedging_delay_from_start(mocker):
+    """Test time spent waiting for a thread of the pool does not trigger a hedge."""
+    transport = mocker.patch(
+        "here_location_services.transport.Transport.request",
+        side_effect=lambda *args, **kwargs: make_response("ok"),
+    )
+    policy = HedgingPolicy(delay=0.05, budget=1.0, max_workers=1)
+    ls = LS(api_key="dummy", hedging=policy)
+    blocker = policy._submit(lambda: time.sleep(0.2))
+    ls.geocode("berlin")
+    blocker.result()
+    assert transport.call_count == 1 and policy.hedged == 0
+
+
+def test_hedged_failure(mocker):
+    """Test the duplicate response is used if the original request fails."""
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise requests.ConnectionError("reset")
+        return make_response("duplicate")
+
+    mocker.patch("here_location_services.transport.Transport.request", side_effect=request)
+    policy = HedgingPolicy(delay=0.01, budget=1.0)
+    ls = LS(api_key="dummy", hedging=policy)
+    assert ls.geocode("berlin").items[0]["title"] == "duplicate"
+    assert policy.hedge_wins == 1
+
+    policy = HedgingPolicy(delay=1, budget=1.0)
+    ls = LS(api_key="dummy", hedging=policy)
+    calls.clear()
+    with pytest.raises(requests.ConnectionError):
+        ls.geocode("berlin")
+    assert len(calls) == 1 and policy.hedged == 0
+
+
+def test_hedging_budget(mocker):
+    """Test no duplicate requests are sent beyond the budget."""
+
+    def request(method, url, **kwargs):
+        time.sleep(0.02)
+        return make_response("slow")
+
+    transport = mocker.patch(
+        "here_location_services.transport.Transport.request", side_effect=request
+    )
+    policy = HedgingPolicy(delay=0.001, budget=0.25)
+    ls = LS(api_key="dummy", hedging=policy)
+    for _ in range(8):
+        ls.geocode("berlin")
+    assert policy.requests == 8
+    assert policy.hedged == 2
+    assert transport.call_count == 10
+
+
+def test_hedging_delay_percentile():
+    """Test the delay is derived from the observed latencies."""
+    policy = HedgingPolicy(percentile=95, min_samples=10)
+    assert policy.delay is None
+    for i in range(100):
+        policy._observe(i / 1000)
+    assert policy.delay == pytest.approx(0.095)
+    assert HedgingPolicy(delay=0.2).delay == 0.2
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=100)
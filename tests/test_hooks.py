@@ -0,0 +1,112 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test request lifecycle hooks and latency histograms."""
+
+from datetime import timedelta
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.apis import Api
+from here_location_services.hooks import Histogram, endpoint_name, url_template
+
+
+def make_response(content=b'{"items": [{"title": "Berlin"}]}'):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp._content = content
+    resp._content_consumed = True
+    resp.elapsed = timedelta(0)
+    resp.request = requests.Request("GET", "https://dummy").prepare()
+    return resp
+
+
+def test_url_template():
+    """Test endpoint names and URL templates of request URLs."""
+    url = "https://matrix.router.hereapi.com/v8/matrix/3f4b6c1e-2a2b-4c5d-9e8f-0a1b2c3d4e5f/status"
+    assert url_template(url) == "https://matrix.router.hereapi.com/v8/matrix/{id}/status"
+    assert endpoint_name(url) == "matrix.status"
+    assert endpoint_name("https://geocode.search.hereapi.com/v1/geocode?q=x") == "geocode"
+
+
+def test_hooks_events(mocker):
+    """Test the events emitted for requests sent by LS methods and APIs."""
+    mocker.patch(
+        "here_location_services.transport.Transport.request", return_value=make_response()
+    )
+    ls = LS(api_key="dummy", latency_histograms=True)
+    events = []
+    for name in ("on_request", "on_response", "on_error"):
+        ls.hooks.register(name, lambda event, name=name: events.append((name, event)))
+    routing_events = []
+    ls.routing_api.hooks.on_request(routing_events.append)
+
+    ls.geocode("berlin")
+    assert [name for name, _ in events] == ["on_request", "on_response"]
+    event = events[1][1]
+    assert event is events[0][1]
+    assert (event.operation, event.endpoint, event.status_code) == ("geocode", "geocode", 200)
+    assert event.url_template == "https://geocode.search.hereapi.com/v1/geocode"
+    assert event.bytes_received == len(b'{"items": [{"title": "Berlin"}]}')
+    assert event.timings["dns"] is None
+    assert event.timings["json_parse"] >= 0
+    assert event.timings["build"] >= 0
+    assert event.timings["total"] >= event.timings["ttfb"] + event.timings["build"]
+    assert routing_events == []
+
+    events.clear()
+    ls.geo_search_api.get("https://geocode.search.hereapi.com/v1/geocode")
+    assert events[1][1].operation is None
+    assert events[1][1].timings["json_parse"] is None
+
+    summary = ls.histograms.summary()
+    assert summary["geocode"]["total"]["count"] == 2
+    assert summary["geocode"]["build"]["count"] == 1
+
+
+def test_hooks_bulk_events(mocker):
+    """Test on_response events of bulk methods are emitted while requests are sent."""
+    responses, seen = [], []
+
+    def request(*args, **kwargs):
+        seen.append(len(responses))
+        return make_response(b'{"routes": []}')
+
+    mocker.patch("here_location_services.transport.Transport.request", side_effect=request)
+    ls = LS(api_key="dummy")
+    ls.hooks.on_response(responses.append)
+    pairs = [[52.5, 13.4, 52.52 + i / 100, 13.42] for i in range(4)]
+    result = ls.route_many(pairs, concurrency=1)
+    assert list(result["error"]) == ["No route found"] * 4
+    assert seen == [0, 0, 1, 2]
+    assert len(responses) == 4
+    assert all(event.operation == "route_many" for event in responses)
+
+
+def test_hooks_on_error(mocker):
+    """Test on_error is emitted for failed requests."""
+    mocker.patch(
+        "here_location_services.transport.Transport.request",
+        side_effect=requests.ConnectionError("unreachable"),
+    )
+    api = Api(api_key="dummy")
+    errors = api.hooks.on_error(mocker.Mock())
+    with pytest.raises(requests.ConnectionError):
+        api.get("https://router.hereapi.com/v8/routes")
+    event = errors.call_args[0][0]
+    assert isinstance(event.error, requests.ConnectionError)
+    assert event.endpoint == "routes"
+    with pytest.raises(ValueError):
+        api.hooks.register("on_success", print)
+
+
+def test_histogram_quantile():
+    """Test quantiles of a histogram are estimated by bucket bounds."""
+    histogram = Histogram(buckets=(0.1, 1.0))
+    assert histogram.quantile(0.5) is None
+    for value in (0.05, 0.05, 0.5, 5):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(0.99) == float("inf")
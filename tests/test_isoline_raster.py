@@ -0,0 +1,98 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the overlay of isolines on a raster grid."""
+
+import numpy as np
+import pytest
+
+from here_location_services import LS
+from here_location_services.exceptions import ApiError
+from here_location_services.isoline_raster import RasterGrid, origin_grid, overlay
+from here_location_services.isoline_routing_api import IsolineRoutingApi
+from here_location_services.isolines import IsolineResult
+from here_location_services.responses import IsolineResponse
+from tests.test_isolines import isoline_data, make_response
+
+
+def test_raster_grid():
+    """Test the shape, transform and windows of a grid."""
+    grid = RasterGrid(13.2, 52.3, 13.8, 52.7, 0.01)
+    assert grid.shape == (40, 60)
+    assert grid.transform == (0.01, 0.0, 13.2, 0.0, -0.01, 52.7)
+    lats, lngs = grid.centers(slice(0, 2), slice(3, 4))
+    np.testing.assert_allclose(lats[:, 0], [52.695, 52.685])
+    np.testing.assert_allclose(lngs[0], [13.235])
+    assert grid.window((13.0, 52.0, 13.245, 52.68)) == (slice(2, 40), slice(0, 5))
+    assert grid.window((14.0, 52.0, 14.5, 52.5)) is None
+    assert grid.cell_areas()[0] == pytest.approx(0.751, rel=1e-3)
+    with pytest.raises(ValueError):
+        RasterGrid(13.2, 52.3, 13.8, 52.7, 0)
+
+
+def test_overlay():
+    """Test unions, intersections and overlap counts of two depots."""
+    responses = [
+        IsolineResponse.new(isoline_data(52.5, 13.4)),
+        IsolineResult((0.0, 0.0), error="400 Bad Request"),
+        IsolineResult((52.5, 13.6), IsolineResponse.new(isoline_data(52.5, 13.6))),
+    ]
+    grid = RasterGrid.covering(responses, resolution=0.01)
+    assert grid.bounds == pytest.approx((13.2, 52.3, 13.8, 52.7))
+    coverage = overlay(responses, grid)
+
+    assert coverage.responses == 2 and coverage.ranges == [600, 1200]
+    assert coverage.counts.shape == (2, 40, 60)
+    assert coverage.union(1200).sum() == 40 * 60
+    assert coverage.intersection(1200).sum() == 40 * 20
+    assert coverage.union(600).sum() == 2 * (20 * 20 - 2 * 2)
+    assert coverage.intersection(600).sum() == 0
+    assert coverage.intersection(600, min_count=1).sum() == coverage.union(600).sum()
+    assert coverage.counts[1].max() == 2
+    assert coverage.area(coverage.union(1200)) == pytest.approx(
+        0.4 * 0.6 * 111.32**2 * 0.6088, 1e-3
+    )
+    with pytest.raises(ValueError):
+        coverage.union(900)
+    with pytest.raises(ValueError):
+        RasterGrid.covering(responses[1:2], resolution=0.01)
+
+
+def test_isochrone_heat_map(mocker):
+    """Test a heat map of a grid of origins and its refinement."""
+
+    failures = [[52.4, 13.5]]
+
+    def get_isoline_routing(range, range_type, transport_mode, origin=None, **kwargs):
+        assert range == "600,1200" and range_type == "time"
+        if origin in failures:
+            failures.remove(origin)
+            raise ApiError(make_response(400, {}))
+        return make_response(200, isoline_data(*origin))
+
+    api = mocker.patch.object(
+        IsolineRoutingApi, "get_isoline_routing", side_effect=get_isoline_routing
+    )
+    ls = LS(api_key="dummy")
+    bounds = (13.2, 52.3, 13.6, 52.7)
+    assert origin_grid(bounds, 0.2) == [(52.6, 13.3), (52.6, 13.5), (52.4, 13.3), (52.4, 13.5)]
+    heat_map = ls.isochrone_heat_map(bounds, [1200, 600], resolution=0.01, spacing=0.2)
+
+    assert api.call_count == 4
+    assert heat_map.values.shape == (40, 40)
+    assert heat_map.transform == (0.01, 0.0, 13.2, 0.0, -0.01, 52.7)
+    assert heat_map.errors == {(52.4, 13.5): "400 Bad Request"}
+    assert heat_map.values[5, 5] == 600
+    assert heat_map.values[9:11, 9:11].tolist() == [[1200, 1200], [1200, 1200]]
+    assert np.isnan(heat_map.values[-1, -1])
+    assert np.nanmax(heat_map.variance()) > 0 and heat_map.variance()[0, 0] == 0
+
+    assert (52.4, 13.5) not in heat_map.origins
+
+    origins = heat_map.refinement_origins(threshold=1000, spacing=0.1)
+    assert (52.65, 13.25) in origins and (52.6, 13.3) not in origins
+    assert (52.4, 13.5) in origins
+    ls.refine_heat_map(heat_map, threshold=1000, spacing=0.1)
+    assert api.call_count == 4 + len(origins)
+    assert heat_map.errors == {} and (52.4, 13.5) in heat_map.origins
+    assert heat_map.values[9:11, 9:11].tolist() == [[600, 600], [600, 600]]
+    assert f"{3 + len(origins)} origins" in repr(heat_map)
@@ -0,0 +1,216 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the geometry and bulk calculation of isolines."""
+
+import json
+import struct
+
+import flexpolyline as fp
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.deadline import Deadline, current_deadline
+from here_location_services.exceptions import ApiError
+from here_location_services.isoline_routing_api import IsolineRoutingApi
+from here_location_services.isolines import (
+    EdgeGrid,
+    IsolineResult,
+    contains_many,
+    decode_ring,
+    ragged_array,
+    to_wkb,
+)
+from here_location_services.responses import IsolineResponse
+
+
+def make_response(status_code, data):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.reason = {200: "OK", 400: "Bad Request"}[status_code]
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+def square(lat, lng, size):
+    """Return the encoded ring of a square around ``(lat, lng)``."""
+    points = [
+        (lat - size, lng - size),
+        (lat - size, lng + size),
+        (lat + size, lng + size),
+        (lat + size, lng - size),
+    ]
+    return fp.encode(points)
+
+
+def isoline_data(lat, lng, values=(600, 1200)):
+    """Return an isoline response of squares growing with the range around a center."""
+    isolines = []
+    for number, value in enumerate(values, 1):
+        polygon = {"outer": square(lat, lng, 0.1 * number)}
+        if number == 1:
+            polygon["inner"] = [square(lat, lng, 0.01)]
+        isolines.append({"range": {"type": "time", "value": value}, "polygons": [polygon]})
+    return {"departure": {}, "isolines": isolines}
+
+
+def fake_isoline_routing(range, range_type, transport_mode, origin=None, **kwargs):
+    if origin[0] == 0:
+        raise ApiError(make_response(400, {}))
+    return make_response(200, isoline_data(*origin))
+
+
+def test_decode_ring():
+    """Test rings are decoded into (lng, lat) arrays."""
+    ring = decode_ring(fp.encode([(52.5, 13.4), (52.6, 13.5)]))
+    np.testing.assert_allclose(ring, [[13.4, 52.5], [13.5, 52.6]])
+    assert ring.flags["C_CONTIGUOUS"]
+
+
+def test_calculate_isolines_many(mocker):
+    """Test identical centers are requested once and errors are kept per center."""
+    api = mocker.patch.object(
+        IsolineRoutingApi, "get_isoline_routing", side_effect=fake_isoline_routing
+    )
+    ls = LS(api_key="dummy")
+    centers = {"a": [52.5, 13.4], "b": [0, 0], "c": [52.5, 13.4], "d": [48.1, 11.6]}
+    results = ls.calculate_isolines_many(centers, "600,1200", "time", "car", concurrency=2)
+
+    assert api.call_count == 3
+    assert list(results) == ["a", "b", "c", "d"]
+    assert results["a"] is results["c"] and results["a"].ok
+    assert results["a"].ranges == [600, 1200]
+    outer, inner = results["a"].polygons[0][0]
+    assert outer.shape == (4, 2) and inner.shape == (4, 2)
+    np.testing.assert_allclose(outer[0], [13.3, 52.4])
+    assert results["b"].error == "400 Bad Request" and results["b"].polygons == []
+    assert "error" in repr(results["b"])
+
+    frame = pd.DataFrame({"lat": [48.1], "lng": [11.6]}, index=["store-1"])
+    results = ls.calculate_isolines_many(frame, "600", "time", "car", direction="destination")
+    assert results["store-1"].center == (48.1, 11.6)
+    assert api.call_args.kwargs["destination"] == [48.1, 11.6]
+
+    with pytest.raises(ApiError):
+        ls.calculate_isolines_many([[0, 0]], "600", "time", "car", errors="raise")
+    with pytest.raises(ValueError):
+        ls.calculate_isolines_many([[0, 0]], "600", "time", "car", direction="center")
+
+
+def test_calculate_isolines_many_context(mocker):
+    """Test isolines are requested within the caller's deadline."""
+    deadlines = set()
+
+    def isoline_routing(*args, **kwargs):
+        deadlines.add(current_deadline())
+        return fake_isoline_routing(*args, **kwargs)
+
+    mocker.patch.object(IsolineRoutingApi, "get_isoline_routing", side_effect=isoline_routing)
+    ls = LS(api_key="dummy")
+    with Deadline(5) as deadline:
+        results = ls.calculate_isolines_many(
+            [[52.5, 13.4], [48.1, 11.6]], "600", "time", "car", concurrency=2
+        )
+    assert deadlines == {deadline}
+    assert all(result.ok for result in results.values())
+
+
+def test_contains():
+    """Test points are classified by the smallest isoline containing them."""
+    response = IsolineResponse.new(isoline_data(52.5, 13.4))
+    lats = np.array([52.5, 52.52, 52.68, 53.0])
+    lngs = np.array([13.4, 13.45, 13.4, 13.0])
+    np.testing.assert_array_equal(response.contains(lats, lngs), [1200, 600, 1200, np.nan])
+    assert response.contains(lats.reshape(2, 2), lngs.reshape(2, 2)).shape == (2, 2)
+
+    other = IsolineResult((52.65, 13.4), IsolineResponse.new(isoline_data(52.65, 13.4)))
+    failed = IsolineResult((0.0, 0.0), error="400 Bad Request")
+    ranges, positions = contains_many([response, failed, other], lats, lngs)
+    np.testing.assert_array_equal(ranges, [1200, 600, 600, np.nan])
+    np.testing.assert_array_equal(positions, [0, 0, 2, -1])
+
+
+def test_edge_grid_strips():
+    """Test the strips of the grid give the same result as a single strip."""
+    angles = np.linspace(0, 2 * np.pi, 500, endpoint=False)
+    radii = 1 + 0.3 * np.sin(7 * angles)
+    ring = np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+    points = np.random.default_rng(0).uniform(-1.5, 1.5, (2, 5000))
+    grid = EdgeGrid([ring])
+    assert grid.strips == 22
+    np.testing.assert_array_equal(grid.contains(*points), EdgeGrid([ring], 1).contains(*points))
+    assert not EdgeGrid([]).contains(*points).any()
+
+
+def test_isoline_geometries():
+    """Test isolines are grouped per range into multipolygons with holes."""
+    response = IsolineResponse.new(isoline_data(52.5, 13.4))
+    feature = response.to_geojson().features[0]
+    assert feature.geometry.type == "MultiPolygon"
+    assert feature.properties["range"]["value"] == 600
+    outer, inner = feature.geometry.coordinates[0]
+    assert len(outer) == len(inner) == 5 and outer[0] == outer[-1]
+
+    coordinates, (rings, polygons, geometries) = ragged_array(response.to_polygons())
+    assert coordinates.shape == (15, 2)
+    assert list(rings) == [0, 5, 10, 15]
+    assert list(polygons) == [0, 2, 3] and list(geometries) == [0, 1, 2]
+
+    wkb = response.to_wkb()
+    assert struct.unpack_from("<BII", wkb[0]) == (1, 6, 1)
+    assert struct.unpack_from("<BII", wkb[0], 9) == (1, 3, 2)
+    assert len(wkb[1]) == 9 + 9 + 4 + 5 * 16
+    assert np.frombuffer(wkb[1], "<f8", 2, 22).tolist() == coordinates[10].tolist()
+
+
+def decode_wkb(wkb):
+    """Decode a little endian WKB multipolygon into rings and their per level counts."""
+    rings, ring_counts = [], []
+    _, geometry_type, count = struct.unpack_from("<BII", wkb)
+    assert geometry_type == 6
+    position = 9
+    for _ in range(count):
+        _, polygon_type, ring_count = struct.unpack_from("<BII", wkb, position)
+        assert polygon_type == 3
+        position += 9
+        ring_counts.append(ring_count)
+        for _ in range(ring_count):
+            (size,) = struct.unpack_from("<I", wkb, position)
+            position += 4
+            rings.append(np.frombuffer(wkb, "<f8", 2 * size, position).reshape(size, 2))
+            position += 16 * size
+    assert position == len(wkb)
+    return rings, ring_counts, count
+
+
+def test_ragged_array_matches_wkb():
+    """Test the offsets of the ragged array describe the same geometries as the WKB."""
+    ring = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0]])
+    hole = np.array([[0.2, 0.2], [0.4, 0.2], [0.4, 0.4], [0.2, 0.2]])
+    geometries = [[[ring, hole], [ring + 2]], [], [[ring - 1]]]
+    coordinates, (ring_offsets, polygon_offsets, geometry_offsets) = ragged_array(geometries)
+
+    rings, ring_counts, polygon_counts = [], [], []
+    for wkb in to_wkb(geometries):
+        decoded = decode_wkb(wkb)
+        rings += decoded[0]
+        ring_counts += decoded[1]
+        polygon_counts.append(decoded[2])
+    assert np.diff(geometry_offsets).tolist() == polygon_counts == [2, 0, 1]
+    assert np.diff(polygon_offsets).tolist() == ring_counts == [2, 1, 1]
+    assert np.diff(ring_offsets).tolist() == [len(r) for r in rings] == [4, 4, 4, 4]
+    for start, end, decoded_ring in zip(ring_offsets[:-1], ring_offsets[1:], rings):
+        np.testing.assert_array_equal(coordinates[start:end], decoded_ring)
+
+
+def test_to_shapely():
+    """Test shapely multipolygons are built in bulk."""
+    shapely = pytest.importorskip("shapely")
+    response = IsolineResponse.new(isoline_data(52.5, 13.4))
+    small, large = response.to_shapely()
+    assert small.geom_type == "MultiPolygon" and len(small.geoms[0].interiors) == 1
+    assert large.area == pytest.approx(0.16)
+    assert shapely.from_wkb(response.to_wkb()[0]).equals(small)
@@ -0,0 +1,82 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the load generator."""
+
+import json
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.cassette import RecordingTransport, ReplayTransport
+from here_location_services.loadtest import LoadTest, main, percentile, read_calls
+
+
+def make_response(status_code, data):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+@pytest.fixture()
+def recorded(mocker, tmp_path):
+    """Record a successful and a throttled geocoding request and write the input file."""
+    mocker.patch(
+        "requests.Session.request",
+        side_effect=[
+            make_response(200, {"items": []}),
+            make_response(429, {"error": "Too Many Requests"}),
+        ],
+    )
+    cassette = str(tmp_path / "traffic.jsonl")
+    transport = RecordingTransport(cassette)
+    ls = LS(api_key="dummy", transport=transport)
+    ls.geocode("berlin")
+    with pytest.raises(Exception):
+        ls.geocode("paris")
+    transport.close()
+
+    path = tmp_path / "calls.jsonl"
+    path.write_text(
+        "\n".join(
+            json.dumps({"operation": "geocode", "kwargs": {"query": query}})
+            for query in ("berlin", "berlin", "berlin", "paris")
+        )
+    )
+    return str(path), cassette
+
+
+def test_loadtest_cli(recorded, capsys):
+    """Test a load test at a target rate against a replayed cassette."""
+    path, cassette = recorded
+    assert main([path, "--cassette", cassette, "--rate", "200", "--requests", "20", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["requests"] == 20
+    assert report["error_rate"] == report["throttle_rate"] == 0.25
+    assert report["errors"] == {"ApiError": 5}
+    assert report["latency"]["p50"] <= report["latency"]["p99"] <= report["latency"]["max"]
+    assert report["cpu_per_request"] > 0
+
+    main([path, "--cassette", cassette, "--requests", "4"])
+    assert "throttle rate   25.00%" in capsys.readouterr().out
+
+
+def test_loadtest_concurrency(recorded, tmp_path):
+    """Test concurrent workers and the validation of inputs."""
+    path, cassette = recorded
+    ls = LS(api_key="dummy", transport=ReplayTransport(cassette))
+    test = LoadTest(ls, read_calls(path)[:1], concurrency=4, duration=0.2)
+    report = test.run()
+    assert report["requests"] > 0
+    assert report["error_rate"] == 0.0
+
+    with pytest.raises(ValueError):
+        LoadTest(ls, read_calls(path))
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text(json.dumps({"operation": "_decode"}))
+    with pytest.raises(ValueError):
+        read_calls(str(bad))
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert percentile([], 99) is None
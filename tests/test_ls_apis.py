@@ -169,7 +169,7 @@ def test_mock_api_error(mocker):
     """Mock Test for geocoding api."""
     mock_response = Namespace(status_code=300)
     mocker.patch(
-        "here_location_services.matrix_routing_api.requests.post",
+        "here_location_services.transport.Transport.request",
         return_value=mock_response,
     )
     origins = [
@@ -0,0 +1,118 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test matrices of many departure times."""
+
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from here_location_services import LS
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.deadline import Deadline, current_deadline
+from here_location_services.exceptions import ApiError
+from here_location_services.matrix_cube import allocate, tiles
+from here_location_services.responses import MatrixRoutingResponse
+
+
+def fake_matrix(origins, destinations, departure_time, matrix_attributes, **kwargs):
+    """Return travel times of ``origin + destination + hour``, failing for zeros."""
+    assert kwargs["async_req"] and kwargs["stream"]
+    values = np.array(
+        [[o["lat"] + d["lat"] + departure_time.hour for d in destinations] for o in origins]
+    )
+    matrix = {
+        "numOrigins": len(origins),
+        "numDestinations": len(destinations),
+        matrix_attributes[0]: values.ravel(),
+        "errorCodes": (values == departure_time.hour).astype("int64").ravel(),
+    }
+    return MatrixRoutingResponse.new({"matrix": matrix})
+
+
+def test_matrix_cube_tiles(mocker):
+    """Test tiles of all departure times are assembled into one array."""
+    matrix = mocker.patch.object(LS, "matrix", side_effect=fake_matrix)
+    ls = LS(api_key="dummy")
+    origins = [{"lat": float(i), "lng": 13.4} for i in range(5)]
+    destinations = [{"lat": 10.0 * i, "lng": 13.4} for i in range(3)]
+    departures = [datetime(2021, 6, 1, hour, tzinfo=timezone.utc) for hour in (8, 9)]
+    cube = ls.matrix_cube(origins, destinations, departures, WorldRegion(), tile_size=(2, 2))
+
+    assert cube.shape == (2, 5, 3)
+    assert matrix.call_count == 2 * 3 * 2
+    assert cube[1, 4, 2] == 4 + 20 + 9
+    assert np.isnan(cube[0, 0, 0]) and np.isnan(cube[1, 0, 0])
+    assert not np.isnan(cube[:, 1:, :]).any()
+
+    quadratic = ls.matrix_cube(origins, None, departures[:1], WorldRegion(), tile_size=(5, 5))
+    assert quadratic.shape == (1, 5, 5) and quadratic[0, 2, 3] == 13
+
+
+def test_matrix_cube_context(mocker):
+    """Test the tiles are calculated within the caller's deadline."""
+    deadlines = set()
+
+    def matrix(*args, **kwargs):
+        deadlines.add(current_deadline())
+        return fake_matrix(*args, **kwargs)
+
+    mocker.patch.object(LS, "matrix", side_effect=matrix)
+    ls = LS(api_key="dummy")
+    origins = [{"lat": float(i), "lng": 13.4} for i in range(1, 5)]
+    departures = [datetime(2021, 6, 1, 8, tzinfo=timezone.utc)]
+    with Deadline(5) as deadline:
+        ls.matrix_cube(origins, None, departures, WorldRegion(), tile_size=(2, 2), concurrency=4)
+    assert deadlines == {deadline}
+
+
+def test_matrix_cube_memmap_and_errors(mocker, tmp_path):
+    """Test large cubes are memory-mapped and failed requests raise."""
+    mocker.patch.object(LS, "matrix", side_effect=fake_matrix)
+    ls = LS(api_key="dummy")
+    origins = [{"lat": 1.0, "lng": 13.4}, {"lat": 2.0, "lng": 13.4}]
+    departures = [datetime(2021, 6, 1, 8, tzinfo=timezone.utc)]
+    path = str(tmp_path / "cube.npy")
+    cube = ls.matrix_cube(origins, None, departures, WorldRegion(), path=path, dtype="float32")
+    assert isinstance(cube, np.memmap)
+    np.testing.assert_array_equal(np.load(path), [[[10, 11], [11, 12]]])
+
+    temporary = allocate((1, 2, 2), memmap_threshold=16)
+    assert isinstance(temporary, np.memmap) and np.isnan(temporary).all()
+    os.remove(temporary.filename)
+    assert list(tiles(3, 2, (2, 5))) == [(slice(0, 2), slice(0, 2)), (slice(2, 3), slice(0, 2))]
+
+    mocker.patch.object(LS, "matrix", side_effect=ApiError(None))
+    with pytest.raises(ApiError):
+        ls.matrix_cube(origins, None, departures, WorldRegion())
+    mkstemp = mocker.spy(tempfile, "mkstemp")
+    with pytest.raises(ApiError):
+        ls.matrix_cube(origins, None, departures, WorldRegion(), memmap_threshold=16)
+    assert not os.path.exists(mkstemp.spy_return[1])
+    with pytest.raises(ValueError):
+        ls.matrix_cube(origins, None, departures, WorldRegion(), matrix_attribute="errorCodes")
+
+
+def test_matrix_cube_path_cleanup(mocker, tmp_path):
+    """Test the file of a failed cube is removed only if the call created it."""
+
+    def matrix(departure_time, **kwargs):
+        if departure_time.hour == 9:
+            raise ApiError(None)
+        return fake_matrix(departure_time=departure_time, **kwargs)
+
+    mocker.patch.object(LS, "matrix", side_effect=matrix)
+    ls = LS(api_key="dummy")
+    origins = [{"lat": 1.0, "lng": 13.4}]
+    departures = [datetime(2021, 6, 1, hour, tzinfo=timezone.utc) for hour in (8, 9, 10)]
+    path = str(tmp_path / "cube.npy")
+    with pytest.raises(ApiError):
+        ls.matrix_cube(origins, None, departures, WorldRegion(), path=path, concurrency=1)
+    assert not os.path.exists(path)
+
+    np.save(path, np.zeros(1))
+    with pytest.raises(ApiError):
+        ls.matrix_cube(origins, None, departures, WorldRegion(), path=path, concurrency=1)
+    assert os.path.exists(path)
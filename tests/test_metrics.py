@@ -0,0 +1,88 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the Prometheus metrics exporter."""
+
+from datetime import timedelta
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.exceptions import ApiError, TooManyRequestsException
+from here_location_services.metrics import CONTENT_TYPE, Metrics
+
+
+def make_response(status_code, content=b'{"items": []}'):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = content
+    resp._content_consumed = True
+    resp.elapsed = timedelta(milliseconds=10)
+    return resp
+
+
+@pytest.fixture()
+def metrics(mocker):
+    responses = [
+        make_response(200),
+        make_response(429),
+        requests.ConnectionError("unreachable"),
+        make_response(200, b'{"status": "inProgress"}'),
+    ]
+    mocker.patch("here_location_services.transport.Transport.request", side_effect=responses)
+    ls = LS(api_key="dummy")
+    metrics = Metrics()
+    metrics.attach(ls, service="checkout")
+    ls.geocode("berlin")
+    with pytest.raises((ApiError, TooManyRequestsException)):
+        ls.geocode("berlin")
+    with pytest.raises(requests.ConnectionError):
+        ls.reverse_geocode(52.5, 13.4)
+    ls.matrix_routing_api.get_async_matrix_route_status(
+        "https://matrix.router.hereapi.com/v8/matrix/0123456789abcdef0123/status"
+    )
+    metrics.record_cache_hit("geocode", service="checkout")
+    return metrics
+
+
+def test_metrics_render(metrics):
+    """Test counters and histograms in the Prometheus text format."""
+    text = metrics.render()
+    prefix = "here_location_services"
+    assert f"# TYPE {prefix}_requests_total counter" in text
+    assert (
+        f'{prefix}_requests_total{{endpoint="geocode",method="GET",service="checkout"}} 2' in text
+    )
+    assert f'{prefix}_errors_total{{endpoint="geocode",service="checkout",status="429"}} 1' in text
+    assert (
+        f'{prefix}_errors_total{{endpoint="revgeocode",service="checkout",'
+        f'status="ConnectionError"}} 1' in text
+    )
+    assert f'{prefix}_throttles_total{{endpoint="geocode",service="checkout"}} 1' in text
+    assert f'{prefix}_cache_hits_total{{endpoint="geocode",service="checkout"}} 1' in text
+    assert f'{prefix}_async_polls_total{{endpoint="matrix.status",service="checkout"}} 1' in text
+    assert f"# TYPE {prefix}_request_duration_seconds histogram" in text
+    assert (
+        f'{prefix}_request_duration_seconds_bucket{{endpoint="geocode",service="checkout",'
+        f'le="+Inf"}} 2' in text
+    )
+    assert f'{prefix}_response_size_bytes_count{{endpoint="geocode",service="checkout"}} 2' in text
+
+
+def test_metrics_write_and_serve(metrics, tmp_path):
+    """Test metrics are written to a file and served over HTTP."""
+    path = tmp_path / "ls.prom"
+    metrics.write(str(path))
+    assert path.read_text() == metrics.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["ls.prom"]
+
+    server = metrics.serve(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        resp = requests.get(f"{url}/metrics")
+        assert resp.headers["Content-Type"] == CONTENT_TYPE
+        assert resp.text == metrics.render()
+        assert requests.get(f"{url}/other").status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
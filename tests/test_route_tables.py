@@ -0,0 +1,97 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test the columnar tables of routing responses."""
+
+import flexpolyline as fp
+import numpy as np
+import pytest
+
+from here_location_services.responses import RoutingResponse
+from here_location_services.route_tables import snake_case
+
+
+def make_section(number, points):
+    return {
+        "id": f"s{number}",
+        "type": "vehicle",
+        "departure": {
+            "time": "2021-06-01T10:00:00+02:00",
+            "place": {"type": "place", "location": {"lat": points[0][0], "lng": points[0][1]}},
+        },
+        "arrival": {
+            "time": "2021-06-01T10:05:00+02:00",
+            "place": {"type": "place", "location": {"lat": points[-1][0], "lng": points[-1][1]}},
+        },
+        "summary": {"duration": 300, "length": 2000, "baseDuration": 250},
+        "polyline": fp.encode(points, third_dim=fp.ALTITUDE),
+        "spans": [
+            {"offset": 0, "speedLimit": 13.9, "names": [{"value": "Main St", "language": "en"}]},
+            {"offset": 1, "speedLimit": 8.3, "functionalClass": 4},
+        ],
+        "actions": [
+            {"action": "depart", "duration": 100, "length": 800, "instruction": "Go", "offset": 0},
+            {"action": "arrive", "duration": 0, "length": 0, "instruction": "Stop", "offset": 2},
+        ],
+        "transport": {"mode": "car"},
+    }
+
+
+@pytest.fixture()
+def response():
+    first = [(52.5, 13.4, 30), (52.51, 13.41, 31), (52.52, 13.42, 32)]
+    second = [(52.52, 13.42, 32), (52.53, 13.43, 33)]
+    routes = [
+        {"id": "r0", "sections": [make_section(0, first), make_section(1, second)]},
+        {"id": "r1", "sections": [make_section(2, second)]},
+    ]
+    return RoutingResponse.new({"routes": routes})
+
+
+def test_sections_frame(response):
+    """Test the typed table of sections."""
+    sections = response.to_frame()
+    assert list(sections["route_id"]) == [0, 0, 1]
+    assert list(sections["section_id"]) == [0, 1, 0]
+    assert str(sections.dtypes["route_id"]) == "int32"
+    assert str(sections.dtypes["transport_mode"]) == "category"
+    assert str(sections["departure_time"][0]) == "2021-06-01 08:00:00+00:00"
+    assert sections["duration"].sum() == 900.0
+    assert sections["typical_duration"].isna().all()
+    assert list(sections["span_count"]) == [2, 2, 2]
+    assert sections.loc[2, "arrival_lng"] == 13.43
+
+    with pytest.raises(ValueError):
+        response.to_frame("legs")
+
+
+def test_spans_and_actions_frames(response):
+    """Test spans and actions with keys and snake case columns of their fields."""
+    spans = response.to_frame("spans")
+    assert len(spans) == 6 and list(spans["span_id"][:2]) == [0, 1]
+    assert spans["speed_limit"].dtype == "float64"
+    assert spans.loc[1, "functional_class"] == 4 and np.isnan(spans.loc[0, "functional_class"])
+    assert spans.loc[0, "names"][0]["value"] == "Main St"
+    actions = response.to_frame("actions")
+    assert list(actions["action"].cat.categories) == ["arrive", "depart"]
+    assert actions.loc[5, "instruction"] == "Stop" and actions.loc[5, "section_id"] == 0
+    assert snake_case("baseDuration") == "base_duration"
+
+
+def test_coordinates(response):
+    """Test the coordinates of all sections share one array with offsets."""
+    coordinates, offsets = response.to_coordinates()
+    assert coordinates.shape == (7, 3)
+    assert list(offsets) == [0, 3, 5, 7]
+    np.testing.assert_allclose(coordinates[offsets[1] : offsets[2]][0], [13.42, 52.52, 32])
+
+
+def test_to_arrow(response):
+    """Test the Arrow tables with the geometry as list arrays."""
+    pytest.importorskip("pyarrow")
+    table = response.to_arrow()
+    assert table.num_rows == 3
+    line = table.column("geometry")[1].as_py()
+    assert line == [[13.42, 52.52, 32.0], [13.43, 52.53, 33.0]]
+    assert "geometry" not in response.to_arrow(geometry=False).column_names
+    spans = response.to_arrow("spans")
+    assert spans.column("speed_limit").to_pylist()[:2] == [13.9, 8.3]
@@ -0,0 +1,83 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test coalescing of identical concurrent requests."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.singleflight import SingleFlight, request_key
+
+
+def wait_for(condition, timeout=5):
+    start = time.monotonic()
+    while not condition():
+        assert time.monotonic() - start < timeout
+        time.sleep(0.001)
+
+
+def test_request_key():
+    """Test keys of requests only differing in the order of params are equal."""
+    assert request_key("GET", "https://a", {"q": "x", "at": "1,2"}) == request_key(
+        "GET", "https://a", {"at": "1,2", "q": "x"}
+    )
+    assert request_key("GET", "https://a", {"q": "x"}) != request_key(
+        "GET", "https://a", {"q": "y"}
+    )
+    assert request_key("POST", "https://a", data={"a": 1}) != request_key(
+        "POST", "https://a", data={"a": 2}
+    )
+
+
+def test_coalesce_geocode(mocker):
+    """Test concurrent identical geocode calls share one request."""
+    release = threading.Event()
+
+    def slow_request(method, url, **kwargs):
+        release.wait(5)
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = b'{"items": [{"title": "%s"}]}' % kwargs["params"]["q"].encode()
+        return resp
+
+    request = mocker.patch(
+        "here_location_services.transport.Transport.request", side_effect=slow_request
+    )
+    ls = LS(api_key="dummy", coalesce=True)
+    assert all(api.single_flight is ls.single_flight for api in ls.apis)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = [executor.submit(ls.geocode, "berlin") for _ in range(8)]
+        futures += [executor.submit(ls.geocode, "paris") for _ in range(2)]
+        wait_for(lambda: ls.single_flight.shared == 8)
+        release.set()
+        results = [future.result().items[0]["title"] for future in futures]
+    assert results == ["berlin"] * 8 + ["paris"] * 2
+    assert request.call_count == 2
+    # The body of the shared response is decoded once.
+    assert futures[0].result().items is futures[7].result().items
+
+    ls.geocode("berlin")
+    assert request.call_count == 3
+
+
+def test_coalesce_errors():
+    """Test waiting callers receive the error of the leading call."""
+    group = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise requests.ConnectionError("failed")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(group.do, "key", fail) for _ in range(3)]
+        wait_for(lambda: group.shared == 2)
+        release.set()
+        for future in futures:
+            with pytest.raises(requests.ConnectionError):
+                future.result()
+    assert group.do("key", lambda: 1) == 1
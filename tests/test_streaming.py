@@ -0,0 +1,143 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test incremental parsing of large responses."""
+
+import json
+from argparse import Namespace
+
+import numpy as np
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.responses import MatrixRoutingResponse
+from here_location_services.streaming import (
+    iter_json_items,
+    iter_matrix_chunks,
+    iter_tour_stops,
+    iter_tours,
+    read_matrix_result,
+)
+from here_location_services.tour_planning_api import TourPlanningApi
+
+TOUR_SOLUTION = {
+    "problemId": "p1",
+    "statistic": {"cost": 12.5, "times": {"driving": 10}},
+    "tours": [
+        {
+            "vehicleId": f"vehicle_{i}",
+            "stops": [
+                {"location": {"lat": 52.5, "lng": 13.4}, "activities": [{"jobId": 'j"]}{'}]}
+                for _ in range(3)
+            ],
+        }
+        for i in range(4)
+    ],
+    "unassigned": [{"jobId": "j2", "reasons": [{"code": "NO_REASON", "description": "]"}]}],
+}
+
+MATRIX_RESULT = {
+    "matrixId": "m1",
+    "matrix": {
+        "numOrigins": 2,
+        "numDestinations": 3,
+        "travelTimes": [0, 10, 20, 30, 40, 50],
+        "distances": [0, 1, 2, 3, 4, 5],
+    },
+    "regionDefinition": {"type": "world"},
+}
+
+
+def chunked(doc, size):
+    text = json.dumps(doc, indent=2, ensure_ascii=False)
+    data = text.encode("utf-8")
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 16, 100000])
+def test_iter_tours(size):
+    """Test tours are yielded one at a time for any chunk boundaries."""
+    tours = list(iter_tours(chunked(TOUR_SOLUTION, size)))
+    assert tours == TOUR_SOLUTION["tours"]
+    stops = list(iter_tour_stops(chunked(TOUR_SOLUTION, size)))
+    assert len(stops) == 12
+    assert stops[0][0] == "vehicle_0"
+
+
+def test_iter_json_items_unicode_and_errors():
+    """Test multi-byte characters split over chunks and truncated documents."""
+    doc = {"items": [{"title": "Köln 東京"}, 1, "two", None]}
+    assert list(iter_json_items(chunked(doc, 1), ("items",))) == doc["items"]
+    assert list(iter_json_items(chunked(doc, 1), ("missing",))) == []
+    with pytest.raises(ValueError):
+        list(iter_json_items(chunked(doc, 5)[:-2], ("items",)))
+
+
+@pytest.mark.parametrize("size", [1, 7, 100000])
+def test_read_matrix_result(size):
+    """Test matrix arrays are parsed into flat numpy arrays."""
+    result = read_matrix_result(chunked(MATRIX_RESULT, size))
+    assert result["matrixId"] == "m1"
+    assert "regionDefinition" not in result
+    matrix = result["matrix"]
+    assert isinstance(matrix["travelTimes"], np.ndarray)
+    np.testing.assert_array_equal(matrix["travelTimes"], MATRIX_RESULT["matrix"]["travelTimes"])
+    chunks = list(iter_matrix_chunks(chunked(MATRIX_RESULT, size), "distances"))
+    np.testing.assert_array_equal(np.concatenate(chunks), MATRIX_RESULT["matrix"]["distances"])
+    response = MatrixRoutingResponse.new(result)
+    assert response.to_travel_times_matrix().shape == (2, 3)
+    assert response.to_distnaces_matrix()[2][1] == 5
+    assert json.loads(response.as_json_string())["matrix"]["distances"][5] == 5
+
+
+def test_ls_matrix_stream(mocker):
+    """Test streamed results of async matrix routing."""
+    status = Namespace(status_code=303, json=lambda: {"resultUrl": "https://result"})
+    result = mocker.Mock(spec=requests.Response, status_code=200)
+    result.iter_content.return_value = chunked(MATRIX_RESULT, 4)
+    mocker.patch(
+        "here_location_services.matrix_routing_api.MatrixRoutingApi.matrix_route_async",
+        return_value={"statusUrl": "https://status"},
+    )
+    mocker.patch("here_location_services.apis.Api.get", side_effect=[status, result])
+    ls = LS(api_key="dummy")
+    with pytest.raises(ValueError):
+        ls.matrix(origins=[{"lat": 1, "lng": 2}], region_definition=WorldRegion(), stream=True)
+    resp = ls.matrix(
+        origins=[{"lat": 1, "lng": 2}],
+        region_definition=WorldRegion(),
+        async_req=True,
+        stream=True,
+    )
+    assert resp.matrix["numOrigins"] == 2
+    assert resp.matrix["travelTimes"].tolist() == MATRIX_RESULT["matrix"]["travelTimes"]
+    result.close.assert_called_once()
+
+
+def test_ls_tour_planning_stream(mocker):
+    """Test streamed solutions of sync and async tour planning."""
+    result = mocker.Mock(spec=requests.Response, status_code=200)
+    result.iter_content.return_value = chunked(TOUR_SOLUTION, 8)
+    solve = mocker.patch.object(TourPlanningApi, "solve_tour_planning", return_value=result)
+    ls = LS(api_key="dummy")
+    tours = ls.solve_tour_planning(fleet=None, plan=None, stream=True)
+    assert solve.call_args.kwargs["stream"] is True
+    assert next(tours) == TOUR_SOLUTION["tours"][0]
+    assert len(list(tours)) == 3
+    result.close.assert_called_once()
+
+    job = Namespace(status_code=202, json=lambda: {"href": "https://status"})
+    status = Namespace(
+        status_code=200,
+        json=lambda: {"status": "success", "resource": {"href": "https://result"}},
+    )
+    solve.return_value = job
+    mocker.patch.object(TourPlanningApi, "get_async_tour_planning_status", return_value=status)
+    result.iter_content.return_value = chunked(TOUR_SOLUTION, 8)
+    results = mocker.patch.object(
+        TourPlanningApi, "get_async_tour_planning_results", return_value=result
+    )
+    tours = ls.solve_tour_planning(fleet=None, plan=None, is_async=True, stream=True)
+    assert [tour["vehicleId"] for tour in tours] == [f"vehicle_{i}" for i in range(4)]
+    results.assert_called_once_with("https://result", stream=True)
@@ -0,0 +1,213 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test sharing a single LS instance across many threads and processes."""
+
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from here_location_services import LS
+from here_location_services.accounting import Ledger
+from here_location_services.apis import Api
+from here_location_services.circuit_breaker import CircuitBreaker
+from here_location_services.hooks import LatencyHistograms
+from here_location_services.metrics import Metrics
+from here_location_services.platform.auth import Auth
+from here_location_services.platform.credentials import PlatformCredentials
+from here_location_services.singleflight import SingleFlight
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Respond with the relevant parts of the received request."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _echo(self, body=None):
+        self.server.clients.add(self.client_address)
+        data = json.dumps(
+            {
+                "method": self.command,
+                "query": parse_qs(urlparse(self.path).query),
+                "content_type": self.headers.get("Content-Type"),
+                "authorization": self.headers.get("Authorization"),
+                "body": body,
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._echo()
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self._echo(json.loads(self.rfile.read(length)))
+
+    def log_message(self, *args):
+        pass
+
+
+class EchoServer(ThreadingHTTPServer):
+    """A threading HTTP server accepting many concurrent connections."""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+
+@pytest.fixture()
+def echo_url():
+    server = EchoServer(("127.0.0.1", 0), EchoHandler)
+    server.clients = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", server
+    server.shutdown()
+    server.server_close()
+
+
+class StaticAuth:
+    """An auth stub handing out a fixed token."""
+
+    token = "token"
+
+
+def test_shared_ls_across_threads(echo_url):
+    """Test one LS instance serves a 64 thread executor without sharing request state."""
+    url, server = echo_url
+    ls = LS(api_key="dummy")
+    token_api = Api(auth=StaticAuth(), transport=ls.transport)
+
+    def call(i):
+        if i % 3 == 0:
+            resp = ls.geo_search_api.get(f"{url}/get", params={"i": str(i)}).json()
+            assert resp["method"] == "GET"
+            assert resp["content_type"] is None
+            assert resp["query"] == {"i": [str(i)], "apiKey": ["dummy"]}
+        elif i % 3 == 1:
+            resp = ls.matrix_routing_api.post(f"{url}/post", data={"i": i}).json()
+            assert resp["method"] == "POST"
+            assert resp["content_type"] == "application/json"
+            assert resp["body"] == {"i": i}
+            assert resp["authorization"] is None
+        else:
+            resp = token_api.get(f"{url}/get", params={"i": str(i)}).json()
+            assert resp["authorization"] == "Bearer token"
+            assert resp["content_type"] is None
+            assert resp["query"] == {"i": [str(i)]}
+        return i
+
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        results = list(executor.map(call, range(2000)))
+    assert results == list(range(2000))
+    assert ls.geo_search_api.headers == {}
+    assert ls.matrix_routing_api.headers == {}
+    assert len(server.clients) <= ls.transport.pool_maxsize
+
+
+def test_params_are_not_modified():
+    """Test query params passed by callers are not modified."""
+    api = Api(api_key="dummy")
+    params = {"q": "berlin"}
+    assert api._build_params(params) == {"q": "berlin", "apiKey": "dummy"}
+    assert params == {"q": "berlin"}
+    assert api._build_headers() == {}
+    assert api._build_headers("application/json") == {"Content-Type": "application/json"}
+    assert api.headers == {}
+
+
+_worker_ls = None
+
+
+def _init_worker(ls):
+    global _worker_ls
+    _worker_ls = ls
+
+
+def _worker_call(url):
+    resp = _worker_ls.geo_search_api.get(url, params={"pid": str(os.getpid())}).json()
+    return resp["query"]["pid"][0], resp["authorization"]
+
+
+class CountingAuth(Auth):
+    """An auth stub counting generated tokens."""
+
+    def __init__(self, credentials, aaa_oauth2_api):
+        super().__init__(credentials=credentials, aaa_oauth2_api=aaa_oauth2_api)
+        self.generated = 0
+
+    def generate_token(self):
+        self.generated += 1
+        self._token = f"token-{os.getpid()}-{self.generated}"
+        self._token_expires_at = datetime.now() + timedelta(hours=1)
+
+
+@pytest.fixture()
+def token_ls(mocker, monkeypatch):
+    """An LS instance authenticating with tokens of a :class:`CountingAuth`."""
+    monkeypatch.delenv("LS_API_KEY", raising=False)
+    mocker.patch("here_location_services.ls.Auth", CountingAuth)
+    credentials = PlatformCredentials({"endpoint": "https://account.api.here.com/oauth2/token"})
+    ls = LS(platform_credentials=credentials)
+    assert isinstance(ls.auth, CountingAuth) and ls.geo_search_api.auth is ls.auth
+    return ls
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_forked_children_rebuild_transport(echo_url, token_ls):
+    """Test forked children use their own connection pools and keep a valid token."""
+    url, server = echo_url
+    ls = token_ls
+    parent_session = ls.transport.session
+    token = ls.auth.token
+    assert ls.geo_search_api.get(f"{url}/get").json()["authorization"] == f"Bearer {token}"
+
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(4, initializer=_init_worker, initargs=(ls,)) as pool:
+        results = pool.map(_worker_call, [f"{url}/get"] * 40)
+    assert str(os.getpid()) not in {pid for pid, _ in results}
+    assert all(authorization == f"Bearer {token}" for _, authorization in results)
+    assert ls.auth.generated == 1
+    assert ls.transport.session is parent_session
+    assert len(server.clients) > 1
+
+
+@pytest.mark.skipif(not hasattr(os, "register_at_fork"), reason="requires os.register_at_fork")
+def test_forked_children_reset_locks():
+    """Test locks held by another thread at the time of a fork are usable in the child."""
+    objects = [SingleFlight(), CircuitBreaker(), LatencyHistograms(), Metrics(), Ledger()]
+    for obj in objects:
+        obj._lock.acquire()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if all(obj._lock.acquire(timeout=1) for obj in objects) else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        for obj in objects:
+            obj._lock.release()
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_pickle_ls(token_ls):
+    """Test an LS instance can be pickled without its sessions and locks."""
+    ls = token_ls
+    token = ls.auth.token
+    session = ls.transport.session
+    clone = pickle.loads(pickle.dumps(ls))
+    assert clone.transport._session is None
+    assert clone.transport.session is not session
+    assert clone.geo_search_api.transport is clone.transport
+    assert clone.geo_search_api.auth is clone.auth
+    assert clone.auth.token == token
+    assert clone.auth.generated == 1
@@ -0,0 +1,84 @@
+# Copyright (C) 2019-2021 HERE Europe B.V.
+# SPDX-License-Identifier: Apache-2.0
+"""This module will test tracing spans around client operations."""
+
+import json
+
+import pytest
+import requests
+
+from here_location_services import LS
+from here_location_services.config.matrix_routing_config import WorldRegion
+from here_location_services.exceptions import ApiError
+from here_location_services.tracing import InMemoryExporter, Tracer, current_span, span
+
+
+def make_response(status_code, data):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(data).encode()
+    resp._content_consumed = True
+    return resp
+
+
+def test_trace_async_matrix(mocker):
+    """Test spans of an async matrix calculation with polling."""
+    mocker.patch("here_location_services.ls.wait")
+    mocker.patch(
+        "here_location_services.transport.Transport.request",
+        side_effect=[
+            make_response(
+                202, {"statusUrl": "https://matrix.router.hereapi.com/v8/matrix/1/status"}
+            ),
+            make_response(200, {"status": "inProgress"}),
+            make_response(303, {"resultUrl": "https://aws.com/results/1"}),
+            make_response(200, {"matrix": {"numOrigins": 1, "travelTimes": [0]}}),
+        ],
+    )
+    exporter = InMemoryExporter()
+    ls = LS(api_key="dummy", tracer=Tracer(exporter))
+    ls.matrix(origins=[{"lat": 1, "lng": 2}], region_definition=WorldRegion(), async_req=True)
+
+    names = [s.name for s in exporter.spans]
+    assert names == [
+        "HTTP POST",
+        "HTTP GET",
+        "LS.poll",
+        "HTTP GET",
+        "LS.poll",
+        "HTTP GET",
+        "LS.decode",
+        "LS.matrix",
+    ]
+    root = exporter.find("LS.matrix")[0]
+    assert root.parent_id is None
+    assert all(s.trace_id == root.trace_id for s in exporter.spans)
+    polls = exporter.find("LS.poll")
+    assert [s.attributes["iteration"] for s in polls] == [0, 1]
+    assert all(s.parent_id == root.span_id for s in polls)
+    assert exporter.spans[1].parent_id == polls[0].span_id
+    assert exporter.spans[1].attributes["http.status_code"] == 200
+    assert exporter.spans[1].attributes["http.url"] == (
+        "https://matrix.router.hereapi.com/v8/matrix/{id}/status"
+    )
+    assert exporter.find("LS.decode")[0].attributes["response_type"] == "MatrixRoutingResponse"
+    assert root.duration >= sum(s.duration for s in polls)
+
+
+def test_trace_errors(mocker):
+    """Test failed operations are recorded and no spans exist without tracer."""
+    mocker.patch(
+        "here_location_services.transport.Transport.request",
+        return_value=make_response(500, {"error": "failed"}),
+    )
+    exporter = InMemoryExporter()
+    ls = LS(api_key="dummy", tracer=Tracer(exporter))
+    with pytest.raises(ApiError):
+        ls.geocode("berlin")
+    root = exporter.find("LS.geocode")[0]
+    assert root.status == "error"
+    assert root.attributes["exception.type"] == "ApiError"
+    assert current_span() is None
+
+    with span("untraced") as untraced:
+        assert untraced is None